@@ -0,0 +1,125 @@
+"""Boundary-layer atmosphere profiles for batches of scenarios.
+
+The generalization of Panel B of figures4.create_figure4(): a well-mixed
+layer with lapse rate Γ up to the mixing height z_i, an optional capping
+inversion (a warming of ΔT over inversion_depth above z_i) and a stable
+lapse rate Γ_s aloft:
+
+    T(z) = T_s - Γ min(z, z_i) - Γ_s max(z - z_i, 0) + ΔT clip((z - z_i) / d, 0, 1)
+
+Pressure follows from hydrostatic balance of dry air,
+ln p(z) = ln p_s - g / R_d ∫ dz / T, integrated with the trapezoidal rule;
+density from the ideal gas law and the refractive index from
+
+    n - 1 = 7.76e-5 · p[hPa] / T[K]
+
+Every scenario parameter may be a scalar or a 1D array of scenarios, so a
+whole climatology is one call: profiles() returns (n_scenarios, n_heights)
+arrays together with the vertical gradients.
+"""
+import numpy as np
+
+G = 9.80665          # m/s²
+R_DRY = 287.05       # J/(kg K)
+REFRACTIVITY = 7.76e-5  # K/hPa
+
+# name -> default, and (low, high) range used by sample_scenarios()
+SCENARIO_DEFAULTS = {
+    'surface_temperature': 20.0,  # °C
+    'lapse_rate': 6.5e-3,         # K/m in the mixed layer
+    'mixing_height': 1000.0,      # m
+    'inversion_strength': 0.0,    # K
+    'inversion_depth': 100.0,     # m
+    'stable_lapse_rate': 2e-3,    # K/m above the mixing layer
+    'surface_pressure': 101325.0,  # Pa
+}
+SCENARIO_RANGES = {
+    'surface_temperature': (-10.0, 40.0),
+    'lapse_rate': (4e-3, 9.8e-3),
+    'mixing_height': (200.0, 2500.0),
+    'inversion_strength': (0.0, 8.0),
+    'inversion_depth': (20.0, 300.0),
+    'stable_lapse_rate': (-2e-3, 6.5e-3),
+    'surface_pressure': (98000.0, 104000.0),
+}
+
+
+def sample_scenarios(n, ranges=SCENARIO_RANGES, rng=None):
+    """n scenarios drawn uniformly from ranges (missing parameters keep their defaults)"""
+    rng = np.random.default_rng(rng)
+    return {name: rng.uniform(lo, hi, n) for name, (lo, hi) in ranges.items()}
+
+
+def _column(value):
+    # Scenario parameters vary along axis 0, heights along axis 1
+    return np.asarray(value, dtype=float).reshape(-1, 1)
+
+
+def temperature_profile(height, surface_temperature=20.0, lapse_rate=6.5e-3, mixing_height=1000.0,
+                        inversion_strength=0.0, inversion_depth=100.0, stable_lapse_rate=2e-3):
+    """Air temperature in °C, shape (n_scenarios, len(height))"""
+    z = np.asarray(height, dtype=float)[None, :]
+    zi = _column(mixing_height)
+    above = np.maximum(z - zi, 0.0)
+    T = _column(surface_temperature) - _column(lapse_rate) * np.minimum(z, zi)
+    T -= _column(stable_lapse_rate) * above
+    T += _column(inversion_strength) * np.clip(above / _column(inversion_depth), 0.0, 1.0)
+    return T
+
+
+def profiles(height, **scenario):
+    """Temperature, pressure, density and refractive index profiles with their gradients
+
+    height: 1D increasing heights above ground in m.  scenario: any of
+    SCENARIO_DEFAULTS, as scalars or equal-length 1D arrays.
+    Returns a dict of (n_scenarios, n_heights) arrays: 'temperature' (°C),
+    'pressure' (Pa), 'density' (kg/m³), 'refractive_index', and the
+    gradients 'dT_dz' (K/m), 'drho_dz' (kg/m⁴) and 'dn_dz' (1/m), plus
+    'height'.
+    """
+    unknown = set(scenario) - set(SCENARIO_DEFAULTS)
+    if unknown:
+        raise ValueError(f'Unknown scenario parameters {sorted(unknown)}, use {list(SCENARIO_DEFAULTS)}')
+    params = {**SCENARIO_DEFAULTS, **scenario}
+    height = np.asarray(height, dtype=float)
+    surface_pressure = params.pop('surface_pressure')
+
+    T = temperature_profile(height, **params)
+    T_kelvin = T + 273.15
+    # Hydrostatic balance: cumulative trapezoid of 1/T along height
+    inv_T = 1.0 / T_kelvin
+    integral = np.zeros_like(T_kelvin)
+    np.cumsum(0.5 * (inv_T[:, 1:] + inv_T[:, :-1]) * np.diff(height), axis=1, out=integral[:, 1:])
+    p = _column(surface_pressure) * np.exp(-G / R_DRY * integral)
+    rho = p / (R_DRY * T_kelvin)
+    n = 1.0 + REFRACTIVITY * (p / 100.0) * inv_T
+
+    gradient = (lambda a: np.gradient(a, height, axis=1)) if len(height) > 1 else np.zeros_like
+    return {
+        'height': height,
+        'temperature': T,
+        'pressure': p,
+        'density': rho,
+        'refractive_index': n,
+        'dT_dz': gradient(T),
+        'drho_dz': gradient(rho),
+        'dn_dz': gradient(n),
+    }
+
+
+if __name__ == '__main__':
+    import time
+
+    height = np.linspace(0, 3000, 601)
+    scenarios = sample_scenarios(10_000, rng=0)
+    start = time.perf_counter()
+    result = profiles(height, **scenarios)
+    elapsed = time.perf_counter() - start
+    print(f"{result['temperature'].size / 1e6:.0f} M (scenario x height) points in {elapsed:.2f} s")
+
+    # Strongest refractive-index gradient of each profile and where it sits
+    strongest = np.abs(result['dn_dz']).argmax(axis=1)
+    peak = np.abs(result['dn_dz'])[np.arange(len(strongest)), strongest]
+    at_inversion = np.abs(height[strongest] - scenarios['mixing_height']) <= scenarios['inversion_depth']
+    print(f'max |dn/dz|: median {np.median(peak):.2e} 1/m, 95th percentile {np.percentile(peak, 95):.2e} 1/m; '
+          f'{at_inversion.mean():.0%} of profiles peak in the capping inversion')
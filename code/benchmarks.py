@@ -0,0 +1,468 @@
+"""Benchmarks for the figure functions and the numerical kernels, with history.
+
+Figures: every create_* function found by build_figures.discover_figures(),
+plus research.create_all_figures, is timed in three phases:
+
+    build    calling the function (data generation and artist construction)
+    draw     fig.canvas.draw() on the Agg canvas at the savefig dpi (layout and
+             rasterization)
+    savefig  fig.savefig() of the drawn figure to an in-memory PNG (savefig
+             renders the figure again before encoding it, so this is
+             render + encode)
+
+research.create_all_figures saves its own figures, so there the Agg draws
+and savefig calls are timed as they happen: draw is the time spent
+rendering (mostly inside savefig), savefig the rest of the savefig calls
+(encoding and writing) and build everything else.
+
+Kernels: the numerical functions behind the figures (seawater equation of
+state, tables, synthetic schlieren, ray tracing, Poisson integration, BOS
+correlation) are timed over a range of input sizes.  Each one is called
+enough times for a stable timing and the best of `repeat` rounds is kept.
+
+Peak memory is measured in a separate run of each case, since measuring
+slows the timed runs down.  For kernels it is the tracemalloc peak: numpy
+reports its array buffers to tracemalloc, so the peak includes the arrays a
+case allocates.  Figures spend most of their memory in Agg's C++ raster
+buffers, which tracemalloc cannot see (a 300 dpi figure4 canvas alone is
+about 50 MB), so a figure is run once more in a fresh process and its
+peak resident set size (ru_maxrss) is recorded.  That includes the
+interpreter and the imported libraries, about the same for every figure.
+Where the resource module is missing (Windows) figures fall back to
+tracemalloc and the report says so.
+
+Results are stored in .benchmarks/<commit>.json (commit plus '-dirty' for
+uncommitted changes).  --compare reports every case that got slower or
+used more memory than in the previous stored commit (or a given one):
+
+    python benchmarks.py                       # everything, saved for HEAD
+    python benchmarks.py --kernels 'seawater*' # kernels whose name matches
+    python benchmarks.py --compare             # run, save and compare with the previous commit
+    python benchmarks.py --compare abc1234 --check   # exit status 1 on regressions
+"""
+import argparse
+import fnmatch
+import gc
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DIR = os.path.join(CODE_DIR, '.benchmarks')
+
+# Ratio to the reference above which a case counts as a regression
+TIME_TOLERANCE = 1.25
+MEMORY_TOLERANCE = 1.10
+
+
+# --- Kernels: name -> (setup(size) -> callable, sizes) ---
+
+def _seawater_inputs(n):
+    rng = np.random.default_rng(0)
+    return rng.uniform(30, 38, n), rng.uniform(-2, 30, n)
+
+
+def _figures2_density(n):
+    import figures2
+    S, T = _seawater_inputs(n)
+    return lambda: figures2.calculate_seawater_density_ies80_simplified(S, T)
+
+
+def _figures2_refractive_index(n):
+    import figures2
+    S, T = _seawater_inputs(n)
+    return lambda: figures2.calculate_refractive_index_seawater(S, T)
+
+
+def _eos_density(n):
+    import seawater_eos
+    S, T = _seawater_inputs(n)
+    p = np.linspace(0, 5000, n)
+    return lambda: seawater_eos.density(S, T, p)
+
+
+def _eos_refractive_index(n):
+    import seawater_eos
+    S, T = _seawater_inputs(n)
+    return lambda: seawater_eos.refractive_index(S, T)
+
+
+def _table_density(n):
+    import seawater_tables
+    table = seawater_tables.build_table('density')
+    S, T = _seawater_inputs(n)
+    return lambda: seawater_tables.interpolate(table, S, T)
+
+
+def _schlieren_image(n):
+    import synthetic_schlieren
+    x = np.linspace(-0.01, 0.01, n)
+    field = synthetic_schlieren.plume_density_field(x, x)
+    return lambda: synthetic_schlieren.schlieren_image(field, x[1] - x[0], kind='density')
+
+
+def _trace_rays(n):
+    import raytrace
+    x, y = np.linspace(0, 10, 200), np.linspace(0, 8, 160)
+    field = raytrace.gaussian_index_field(x, y)
+    y0 = np.linspace(1, 7, n)
+    return lambda: raytrace.trace_rays(field, x, y, y0)
+
+
+def _poisson(n):
+    import poisson
+    y, x = np.mgrid[0:1:n * 1j, 0:1:n * 1j]
+    gy, gx = np.gradient(np.sin(6 * x) * np.cos(4 * y), 1 / (n - 1))
+    return lambda: poisson.integrate_gradient(gx, gy, 1 / (n - 1), 1 / (n - 1))
+
+
+def _bos(n):
+    import bos
+    ref = bos.random_dot_background((n, n))
+    test = np.roll(ref, (1, 2), axis=(0, 1))
+    return lambda: bos.bos_displacement(ref, test)
+
+
+KERNELS = {
+    'figures2.seawater_density': (_figures2_density, (10**4, 10**5, 10**6)),
+    'figures2.refractive_index': (_figures2_refractive_index, (10**4, 10**5, 10**6)),
+    'seawater_eos.density': (_eos_density, (10**4, 10**5, 10**6)),
+    'seawater_eos.refractive_index': (_eos_refractive_index, (10**4, 10**5, 10**6)),
+    'seawater_tables.interpolate': (_table_density, (10**4, 10**5, 10**6)),
+    'synthetic_schlieren.schlieren_image': (_schlieren_image, (128, 512, 1024)),
+    'raytrace.trace_rays': (_trace_rays, (100, 1000, 10000)),
+    'poisson.integrate_gradient': (_poisson, (128, 512, 1024)),
+    'bos.bos_displacement': (_bos, (256, 512, 1024)),
+}
+
+
+def _best_time(func, repeat, min_time=0.2):
+    """Best per-call time of `repeat` rounds, each long enough to be measurable"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= max(2, min(10, int(min_time / max(elapsed, 1e-9))))
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _peak_memory(func):
+    """Peak traced memory in bytes allocated while func runs"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_kernel(name, size, repeat=3):
+    setup, _ = KERNELS[name]
+    func = setup(size)
+    func()  # warm-up: imports, caches, table builds
+    return {'time_s': _best_time(func, repeat), 'peak_bytes': _peak_memory(func)}
+
+
+# --- Figures ---
+
+def _figure_phases(module, func_name):
+    """Time build, draw and savefig of one figure; returns the phase times"""
+    import matplotlib.pyplot as plt
+
+    import build_figures
+
+    mod = build_figures._load_module(module)
+    start = time.perf_counter()
+    fig = getattr(mod, func_name)()
+    built = time.perf_counter()
+    # Draw at the resolution savefig renders at, not the screen dpi
+    fig.set_dpi(build_figures.SAVEFIG_KWARGS['dpi'])
+    fig.canvas.draw()
+    drawn = time.perf_counter()
+    fig.savefig(io.BytesIO(), **build_figures.SAVEFIG_KWARGS)
+    saved = time.perf_counter()
+    plt.close('all')
+    return {'build_s': built - start, 'draw_s': drawn - built, 'savefig_s': saved - drawn}
+
+
+def _all_figures_phases():
+    """research.create_all_figures writes its PNGs to the working directory; run it in a scratch one"""
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    import build_figures
+
+    mod = build_figures._load_module('research')
+    # Draws inside savefig are booked as draw, not savefig
+    spent = {'draw': 0.0, 'savefig': 0.0}
+    saving = []
+    draw, savefig = FigureCanvasAgg.draw, Figure.savefig
+
+    def timed(func, phase):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            saving.append(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                saving.pop()
+                elapsed = time.perf_counter() - start
+                spent[phase] += elapsed
+                if phase == 'draw' and 'savefig' in saving:
+                    spent['savefig'] -= elapsed
+        return wrapper
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        FigureCanvasAgg.draw, Figure.savefig = timed(draw, 'draw'), timed(savefig, 'savefig')
+        try:
+            start = time.perf_counter()
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    mod.create_all_figures()
+                finally:
+                    sys.stdout = stdout
+            elapsed = time.perf_counter() - start
+        finally:
+            FigureCanvasAgg.draw, Figure.savefig = draw, savefig
+            os.chdir(cwd)
+    plt.close('all')
+    return {'build_s': elapsed - spent['draw'] - spent['savefig'], 'draw_s': spent['draw'],
+            'savefig_s': spent['savefig']}
+
+
+def figure_cases():
+    """{name: callable returning phase times} for every figure function"""
+    import build_figures
+
+    cases = {f'{module}.{func_name}': (lambda m=module, f=func_name: _figure_phases(m, f))
+             for module, func_name, _ in build_figures.discover_figures()}
+    cases['research.create_all_figures'] = _all_figures_phases
+    return cases
+
+
+def _figure_peak_rss(name):
+    """Run one figure case in this (fresh) process; returns its peak RSS in bytes"""
+    import resource
+
+    figure_cases()[name]()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KiB elsewhere
+
+
+def _peak_rss(name):
+    """Peak RSS of a figure case run in a new process, or None without the resource module"""
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        return None
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(_figure_peak_rss, name).result()
+
+
+def bench_figure(run, repeat=1, name=None):
+    """Phase timings and peak memory of a figure case (name: its figure_cases() key, for the RSS run)"""
+    run()  # warm-up: module imports, font cache
+    rounds = [run() for _ in range(repeat)]
+    record = {phase: min(r[phase] for r in rounds) for phase in rounds[0]}
+    record['time_s'] = min(sum(r.values()) for r in rounds)
+    rss = _peak_rss(name) if name else None
+    if rss is None:
+        record['peak_bytes'], record['memory'] = _peak_memory(run), 'tracemalloc'
+    else:
+        record['peak_bytes'], record['memory'] = rss, 'rss'
+    return record
+
+
+# --- History ---
+
+def git_commit():
+    """Current commit hash, with '-dirty' if code/ has uncommitted changes (None outside git)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short=12', 'HEAD'], cwd=CODE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=CODE_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def _environment():
+    from importlib import metadata
+    versions = {}
+    for package in ('numpy', 'scipy', 'matplotlib'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'processor': platform.processor(), 'cpus': os.cpu_count(), 'packages': versions}
+
+
+def save_results(results, commit, history_dir=HISTORY_DIR):
+    """Merge results into the record for commit; cases not rerun keep their stored values"""
+    os.makedirs(history_dir, exist_ok=True)
+    path = os.path.join(history_dir, f'{commit or "unknown"}.json')
+    record = load_results(commit, history_dir) or {'commit': commit, 'results': {}}
+    record['results'].update(results)
+    record['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    record['environment'] = _environment()
+    fd, tmp = tempfile.mkstemp(dir=history_dir, suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    return path
+
+
+def load_results(commit, history_dir=HISTORY_DIR):
+    path = os.path.join(history_dir, f'{commit}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve_commit(ref, history_dir=HISTORY_DIR):
+    """Stored record name for a git ref or (abbreviated) commit; ref itself if nothing matches"""
+    if os.path.exists(os.path.join(history_dir, f'{ref}.json')):
+        return ref
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short=12', ref], cwd=CODE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ref
+    return commit
+
+
+def previous_commit(commit, history_dir=HISTORY_DIR):
+    """Most recent stored commit in the git history before commit (or the newest stored record)"""
+    stored = {os.path.basename(p)[:-len('.json')] for p in glob.glob(os.path.join(history_dir, '*.json'))}
+    stored.discard(commit)
+    try:
+        log = subprocess.run(['git', 'log', '--format=%h', '--abbrev=12', '-n', '500'], cwd=CODE_DIR,
+                             capture_output=True, text=True, check=True).stdout.split()
+    except (OSError, subprocess.CalledProcessError):
+        log = []
+    for candidate in log:
+        if candidate in stored:
+            return candidate
+    # Not in the log (other branch, or no git): newest file
+    by_time = sorted(stored, key=lambda c: os.path.getmtime(os.path.join(history_dir, c + '.json')))
+    return by_time[-1] if by_time else None
+
+
+def compare(results, reference):
+    """Cases slower than TIME_TOLERANCE or above MEMORY_TOLERANCE times the reference"""
+    regressions = []
+    for name, new in sorted(results.items()):
+        old = reference.get(name)
+        if old is None:
+            continue
+        for key, tolerance in (('time_s', TIME_TOLERANCE), ('peak_bytes', MEMORY_TOLERANCE)):
+            if key == 'peak_bytes' and old.get('memory') != new.get('memory'):
+                continue  # measured differently (tracemalloc vs RSS)
+            if old[key] > 0 and new[key] / old[key] > tolerance:
+                regressions.append((name, key, old[key], new[key]))
+    return regressions
+
+
+def _format(key, value):
+    if key == 'peak_bytes':
+        return f'{value / 2**20:.1f} MiB'
+    return f'{value * 1e3:.2f} ms' if value < 1 else f'{value:.2f} s'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--figures', nargs='*', metavar='PATTERN', default=None,
+                        help="only figures matching these 'module.function' patterns (no pattern: all)")
+    parser.add_argument('--kernels', nargs='*', metavar='PATTERN', default=None,
+                        help='only kernels matching these patterns (no pattern: all)')
+    parser.add_argument('--sizes', choices=['small', 'all'], default='all',
+                        help='small: only the smallest input size of each kernel')
+    parser.add_argument('--repeat', type=int, default=3, help='timing rounds per kernel (figures: 1)')
+    parser.add_argument('--compare', nargs='?', const='previous', default=None, metavar='COMMIT',
+                        help='compare with a stored commit (default: the previous stored one)')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on regressions')
+    parser.add_argument('--no-save', action='store_true', help='do not store the results')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    if CODE_DIR not in sys.path:
+        sys.path.insert(0, CODE_DIR)
+    # Neither option given: run both suites
+    run_figures = args.figures is not None or args.kernels is None
+    run_kernels = args.kernels is not None or args.figures is None
+    matches = lambda name, patterns: not patterns or any(fnmatch.fnmatchcase(name, p) for p in patterns)
+
+    results = {}
+    if run_kernels:
+        print(f"{'kernel':<40} {'size':>9} {'time':>12} {'peak memory':>12}")
+        for name, (_, sizes) in KERNELS.items():
+            if not matches(name, args.kernels):
+                continue
+            for size in sizes[:1] if args.sizes == 'small' else sizes:
+                record = bench_kernel(name, size, args.repeat)
+                results[f'{name}[{size}]'] = record
+                print(f"{name:<40} {size:>9} {_format('time_s', record['time_s']):>12} "
+                      f"{_format('peak_bytes', record['peak_bytes']):>12}")
+    if run_figures:
+        print(f"\n{'figure':<56} {'build':>8} {'draw':>8} {'savefig':>8} {'peak memory':>12}")
+        for name, run in figure_cases().items():
+            if not matches(name, args.figures):
+                continue
+            record = bench_figure(run, name=name)
+            results[name] = record
+            method = 'RSS' if record['memory'] == 'rss' else 'traced, no renderer'
+            print(f"{name:<56} {record['build_s']:8.2f} {record['draw_s']:8.2f} "
+                  f"{record['savefig_s']:8.2f} {_format('peak_bytes', record['peak_bytes']):>12} ({method})")
+
+    commit = git_commit()
+    if not args.no_save:
+        print(f'\nSaved to {os.path.relpath(save_results(results, commit))}')
+
+    if args.compare:
+        reference = previous_commit(commit) if args.compare == 'previous' else resolve_commit(args.compare)
+        stored = load_results(reference) if reference else None
+        if stored is None:
+            print(f'No stored results for {args.compare} to compare with')
+            return 0
+        regressions = compare(results, stored['results'])
+        print(f'\nCompared with {reference}: {len(regressions)} regression(s)')
+        for name, key, old, new in regressions:
+            print(f'  {name:<56} {key:<10} {_format(key, old):>10} -> {_format(key, new):>10} '
+                  f'({new / old:.2f}x)')
+        if regressions and args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
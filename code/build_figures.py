@@ -0,0 +1,345 @@
+"""Headless figure build for the research.py and figures*.py scripts.
+
+Every top-level ``create_*`` function in the figure modules is found by
+parsing the source (so nothing is executed until a figure needs it) and
+rendered with the Agg backend, across a process pool or, with -j 1, in
+this process.  Figure modules import the simulation modules only inside
+the functions that use them (and take their colors from palettes.py rather
+than seaborn), so selecting one figure does not pay for the others.
+
+    python build_figures.py                 # all figures, one worker per core
+    python build_figures.py -j 4 -o out/    # 4 workers, write PNGs into out/
+    python build_figures.py figure3 'figures5.*' -j 1   # selected figures, in-process
+    python build_figures.py --manifest      # rebuild the stale paper figures (figure_manifest.py)
+    python build_figures.py --manifest --force   # ... including outputs that were never stamped
+    python build_figures.py --format pdf    # vector PDFs with dense layers rasterized
+
+Unchanged figures are copied from the render cache (see render_cache.py)
+instead of being redrawn; pass --no-cache to force a full rebuild.
+"""
+import argparse
+import ast
+import fnmatch
+import importlib
+import os
+import sys
+import time
+
+import render_cache
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FIGURE_MODULES = ['research', 'figures', 'figures2', 'figures3', 'figures4',
+                  'figures5', 'figures5b', 'figures6']
+
+# Aggregators that call other create_* functions (and save/show themselves)
+SKIP_FUNCTIONS = {('research', 'create_all_figures')}
+
+# Output names used by each script's own __main__ block; anything not listed
+# here is saved as <function name without "create_">.png
+OUTPUT_NAMES = {
+    ('research', 'create_light_deflection_principle'): 'schlieren_light_deflection_principle.png',
+    ('research', 'create_classical_schlieren'): 'classical_schlieren_system.png',
+    ('research', 'create_rainbow_schlieren'): 'rainbow_schlieren_system.png',
+    ('research', 'create_bos_system'): 'bos_system.png',
+    ('research', 'create_comparison_table'): 'schlieren_methods_comparison.png',
+    ('research', 'create_schlieren_summary'): 'schlieren_complete_overview.png',
+    ('figures', 'create_figure5_corrected'): 'figure5_biomimetic_schlieren_corrected.png',
+    ('figures2', 'create_figure7_revised_for_detects'): 'figure7_detectability_pycnoclines_final.png',
+    ('figures3', 'create_figure3'): 'figure3_model_validation.png',
+    ('figures4', 'create_figure4'): 'figure4_environmental_applications.png',
+    ('figures5', 'create_figure_1_schlieren_principle'): 'figure_1_schlieren_principles.png',
+    ('figures5', 'create_figure_2_sensitivity_analysis'): 'figure_2_schlieren_analysis.png',
+    ('figures5', 'create_figure_3_applications'): 'figure_3_schlieren_applications.png',
+    ('figures6', 'create_figure_sp2_natural_schlieren_effects'): 'figure_sp2_natural_schlieren_effects.png',
+}
+
+SAVEFIG_KWARGS = {'dpi': 300, 'bbox_inches': 'tight', 'facecolor': 'white', 'edgecolor': 'none'}
+
+
+def discover_figures(modules=FIGURE_MODULES):
+    """Return (module, function, filename) for every renderable create_* function"""
+    jobs = []
+    for module in modules:
+        with open(os.path.join(CODE_DIR, module + '.py'), encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if not (isinstance(node, ast.FunctionDef) and node.name.startswith('create_')):
+                continue
+            if (module, node.name) in SKIP_FUNCTIONS:
+                continue
+            # Only functions that can be called without arguments
+            if len(node.args.args) > len(node.args.defaults) or node.args.posonlyargs:
+                continue
+            filename = OUTPUT_NAMES.get((module, node.name), node.name[len('create_'):] + '.png')
+            jobs.append((module, node.name, filename))
+    return jobs
+
+
+def select_figures(jobs, patterns):
+    """Jobs matching any of the shell-style patterns
+
+    A pattern is matched against 'module.function', the function name with
+    and without 'create_', the output path, and its file name with and
+    without the extension.
+    """
+    if not patterns:
+        return list(jobs)
+    selected = []
+    for job in jobs:
+        module, func_name, filename = job
+        basename = os.path.basename(filename)
+        names = (f'{module}.{func_name}', func_name, func_name[len('create_'):],
+                 filename, basename, os.path.splitext(basename)[0])
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns for name in names):
+            selected.append(job)
+    return selected
+
+
+def _load_module(module):
+    """Import a figure module with the Agg backend and rcParams reset to the defaults"""
+    import matplotlib
+    matplotlib.use('Agg')
+    matplotlib.rcdefaults()
+    if CODE_DIR not in sys.path:
+        sys.path.insert(0, CODE_DIR)
+    return importlib.import_module(module)
+
+
+def render_figure(module, func_name, out_path, savefig_kwargs=None,
+                  cache_dir=render_cache.DEFAULT_CACHE_DIR):
+    """Render one figure to out_path and return its timings in seconds
+
+    With a cache_dir, a figure whose source, parameters, rcParams and library
+    versions are unchanged is copied from the cache instead of being drawn.
+    Vector outputs (PDF, SVG) are saved with the output policy of
+    output_policy.py, which rasterizes their dense layers.
+    """
+    import matplotlib.pyplot as plt
+
+    import output_policy
+
+    savefig_kwargs = savefig_kwargs or SAVEFIG_KWARGS
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    mod = _load_module(module)
+    t_import = time.perf_counter()
+
+    key = None
+    ext = os.path.splitext(out_path)[1]
+    if cache_dir:
+        params = {'savefig': savefig_kwargs, 'ext': ext}
+        if ext.lower() in output_policy.VECTOR_FORMATS:
+            params['policy'] = output_policy.policy_for(f'{module}.{func_name}')
+        key = render_cache.cache_key(mod.__file__, func_name, params)
+        if render_cache.fetch(key, ext, out_path, cache_dir):
+            t_done = time.perf_counter()
+            return {
+                'figure': f'{module}.{func_name}',
+                'path': out_path,
+                'cached': True,
+                'import_s': t_import - start,
+                'build_s': 0.0,
+                'save_s': t_done - t_import,
+                'total_s': t_done - start,
+                'cpu_s': time.process_time() - cpu_start,
+                'size_bytes': os.path.getsize(out_path),
+            }
+
+    fig = getattr(mod, func_name)()
+    t_build = time.perf_counter()
+    saved = output_policy.save_figure(fig, out_path, f'{module}.{func_name}', **savefig_kwargs)
+    t_save = time.perf_counter()
+    plt.close('all')
+    if key:
+        render_cache.store(key, ext, out_path, cache_dir)
+    return {
+        'figure': f'{module}.{func_name}',
+        'path': out_path,
+        'cached': False,
+        'import_s': t_import - start,
+        'build_s': t_build - t_import,
+        'save_s': t_save - t_build,
+        'total_s': t_save - start,
+        'cpu_s': time.process_time() - cpu_start,
+        'size_bytes': saved['size_bytes'],
+        'rasterized': saved['rasterized'],
+    }
+
+
+def _limit_worker_threads():
+    # One BLAS/OpenMP thread per worker; the pool provides the parallelism
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(var, '1')
+    os.environ['MPLBACKEND'] = 'Agg'
+
+
+def _report(record):
+    status = 'cached' if record['cached'] else 'drawn '
+    print(f"  {record['total_s']:7.2f} s  {status} {record['figure']} -> {record['path']} "
+          f"({record['size_bytes'] / 1e3:.0f} kB)")
+
+
+def _run(tasks, workers):
+    """Call render_figure(*task) for each task, in this process for one worker,
+    otherwise across a process pool; yields the records as they complete"""
+    _limit_worker_threads()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield task, render_figure(*task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = {pool.submit(render_figure, *task): task for task in tasks}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def build_all(jobs, out_dir='.', workers=None, savefig_kwargs=None,
+              cache_dir=render_cache.DEFAULT_CACHE_DIR):
+    """Render all jobs, in this process for one worker, otherwise across a process pool
+
+    Returns the per-figure timing records.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(module, func_name, os.path.join(out_dir, filename), savefig_kwargs, cache_dir)
+             for module, func_name, filename in jobs]
+    results = []
+    for _, record in _run(tasks, workers):
+        _report(record)
+        results.append(record)
+    return results
+
+
+def build_manifest(patterns=(), workers=None, savefig_kwargs=None,
+                   cache_dir=render_cache.DEFAULT_CACHE_DIR, dry_run=False, force=False):
+    """Rebuild the stale outputs of figure_manifest.FIGURES (all of them, or those matching patterns)
+
+    Each function is rendered once and copied to its other outputs; stamps are
+    recorded as renders complete, so an interrupted build resumes where it
+    stopped.  Existing outputs without a stamp are left alone unless force.
+    Returns the timing records (an empty list for a dry run).
+    """
+    import shutil
+
+    import figure_manifest
+
+    savefig_kwargs = savefig_kwargs or SAVEFIG_KWARGS
+    figures = figure_manifest.FIGURES
+    if patterns:
+        listed = [(*entry['function'].split('.'), output) for output, entry in figures.items()]
+        figures = {output: figures[output] for _, _, output in select_figures(listed, patterns)}
+    stamps = figure_manifest.load_stamps()
+    stale = figure_manifest.stale_outputs(savefig_kwargs, figures, stamps)
+    print(f'{len(stale)} of {len(figures)} outputs are out of date')
+    for output in sorted(stale):
+        print(f'  {stale[output][0]:<9} {output}  ({figures[output]["function"]})')
+    unstamped = sorted(output for output, (reason, _) in stale.items() if reason == 'no stamp')
+    if unstamped and not force:
+        print(f'{len(unstamped)} existing output(s) have no stamp and are not overwritten '
+              f'(pass --force to replace them with fresh renders)')
+        stale = {output: value for output, value in stale.items() if output not in unstamped}
+    if dry_run or not stale:
+        return []
+
+    tasks, extra_outputs = [], {}
+    for module, func_name, out_path, extra, overrides in figure_manifest.render_jobs(stale, figures):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        tasks.append((module, func_name, out_path, dict(savefig_kwargs, **overrides), cache_dir))
+        extra_outputs[out_path] = extra
+    results = []
+    for task, record in _run(tasks, workers):
+        _report(record)
+        results.append(record)
+        for path in [task[2]] + extra_outputs[task[2]]:
+            if path != task[2]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.copyfile(task[2], path)
+            output = os.path.relpath(path, figure_manifest.REPO_DIR).replace(os.sep, '/')
+            stamps[output] = stale[output][1]
+        figure_manifest.save_stamps(stamps)
+    return results
+
+
+def print_report(results, wall_time):
+    """Print a per-figure timing table and the wall and CPU time of the build
+
+    Per-figure times are wall times inside the worker, which stretch when
+    workers compete for cores, so their sum is not a serial baseline.  The
+    CPU time of the render tasks (time.process_time) is what a serial
+    build would need, short of its I/O waits; CPU / wall is the number of
+    cores kept busy on average.
+    """
+    print(f"\n{'figure':<60} {'build':>8} {'savefig':>8} {'total':>8} {'size kB':>9}")
+    for r in sorted(results, key=lambda r: -r['total_s']):
+        print(f"{r['figure']:<60} {r['build_s']:8.2f} {r['save_s']:8.2f} {r['total_s']:8.2f} "
+              f"{r['size_bytes'] / 1e3:9.0f}")
+    cpu = sum(r['cpu_s'] for r in results)
+    hits = sum(r['cached'] for r in results)
+    print(f"\n{len(results)} figures ({hits} from cache) in {wall_time:.2f} s wall, "
+          f"{cpu:.2f} s CPU in the render tasks ({cpu / max(wall_time, 1e-9):.1f} cores busy on average)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('figures', nargs='*', metavar='NAME',
+                        help="figures to build, as shell-style patterns matched against 'module.function', "
+                             "the function name (with or without create_) or the output file name "
+                             '(default: all)')
+    parser.add_argument('-o', '--out-dir', default='.', help='directory for the rendered figures')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--dpi', type=int, default=SAVEFIG_KWARGS['dpi'],
+                        help='resolution of raster outputs (vector outputs choose the dpi of their '
+                             'rasterized layers, see output_policy.py)')
+    parser.add_argument('--format', choices=['png', 'pdf', 'svg'], default=None,
+                        help='output format (default: the extension of each output name, png)')
+    parser.add_argument('--cache-dir', default=render_cache.DEFAULT_CACHE_DIR,
+                        help='render cache location (default: code/.figure_cache)')
+    parser.add_argument('--no-cache', action='store_true', help='redraw every figure')
+    parser.add_argument('--clear-cache', action='store_true', help='empty the render cache first')
+    parser.add_argument('--list', action='store_true', help='list the discovered figures and exit')
+    parser.add_argument('--manifest', action='store_true',
+                        help='rebuild the stale paper figures listed in figure_manifest.py (ignores -o)')
+    parser.add_argument('-n', '--dry-run', action='store_true',
+                        help='with --manifest: list the stale outputs without rendering')
+    parser.add_argument('--force', action='store_true',
+                        help='with --manifest: also overwrite existing outputs that have no stamp')
+    args = parser.parse_args(argv)
+
+    if args.clear_cache:
+        render_cache.clear(args.cache_dir)
+    cache_dir = None if args.no_cache else args.cache_dir
+    savefig_kwargs = dict(SAVEFIG_KWARGS, dpi=args.dpi)
+
+    if args.manifest:
+        start = time.perf_counter()
+        results = build_manifest(args.figures, args.jobs, savefig_kwargs, cache_dir, args.dry_run,
+                                 args.force)
+        if results:
+            print_report(results, time.perf_counter() - start)
+        return 0
+
+    jobs = select_figures(discover_figures(), args.figures)
+    if args.format:
+        jobs = [(module, func_name, os.path.splitext(filename)[0] + '.' + args.format)
+                for module, func_name, filename in jobs]
+    if not jobs:
+        parser.error(f'no figure matches {args.figures}; see --list')
+    if args.list:
+        for module, func_name, filename in jobs:
+            print(f'{module}.{func_name} -> {filename}')
+        return 0
+
+    print(f'Rendering {len(jobs)} figures into {args.out_dir}')
+    start = time.perf_counter()
+    results = build_all(jobs, args.out_dir, args.jobs, savefig_kwargs, cache_dir)
+    print_report(results, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    # Never open a GUI window, even if a display is available
+    os.environ['MPLBACKEND'] = 'Agg'
+    sys.exit(main())
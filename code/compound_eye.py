@@ -0,0 +1,163 @@
+"""Compound-eye sampling of schlieren images and deflection fields.
+
+Panel C of figures3.create_figure3() reduces resolution to
+constant / sqrt(unit_density).  Here an eye is an explicit hexagonal lattice
+of sensing units (ommatidia) with interommatidial angle Δφ.  Each unit has
+a Gaussian acceptance function of half-width Δρ (FWHM, degrees), placed
+over an image that covers the eye's field of view.  The standard compound-eye
+description uses Δρ ≈ Δφ; smaller Δρ/Δφ aliases, larger blurs.
+
+The response of every unit is the acceptance-weighted mean of the image.  The
+weights form a sparse (n_units, ny * nx) matrix, so sampling a frame, or a
+whole stack of frames, is one sparse-matrix product.  Weights are built
+once per eye geometry: they are memoized in-process and stored as .npz
+files in a cache directory.
+
+Angles are treated as flat coordinates over the field of view (adequate for
+the ≤ 90° patches simulated here).
+"""
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(CODE_DIR, '.eye_cache')
+
+FWHM_TO_SIGMA = 1 / (2 * np.sqrt(2 * np.log(2)))
+
+
+def make_eye(field_of_view=(60.0, 60.0), delta_phi=1.0, delta_rho=None, image_shape=(512, 512)):
+    """Eye geometry: (horizontal, vertical) field of view and Δφ, Δρ in degrees
+
+    delta_rho defaults to delta_phi.  image_shape is the (ny, nx) of the
+    frames the eye will look at, spanning the field of view.
+    """
+    fov_x, fov_y = (float(v) for v in np.broadcast_to(field_of_view, 2))
+    eye = {
+        'field_of_view': (fov_x, fov_y),
+        'delta_phi': float(delta_phi),
+        'delta_rho': float(delta_phi if delta_rho is None else delta_rho),
+        'image_shape': tuple(int(n) for n in image_shape),
+    }
+    eye['centers'] = hex_lattice(eye['field_of_view'], eye['delta_phi'])
+    return eye
+
+
+def hex_lattice(field_of_view, spacing):
+    """(n, 2) unit directions (x, y in degrees, origin at the centre) on a hexagonal lattice"""
+    fov_x, fov_y = field_of_view
+    row_step = spacing * np.sqrt(3) / 2
+    rows = np.arange(-(fov_y / 2 // row_step), fov_y / 2 // row_step + 1)
+    cols = np.arange(-(fov_x / 2 // spacing) - 1, fov_x / 2 // spacing + 1)
+    r, c = np.meshgrid(rows, cols, indexing='ij')
+    x = (c + 0.5 * (r % 2)) * spacing  # every other row shifted by half a spacing
+    y = r * row_step
+    inside = (np.abs(x) <= fov_x / 2) & (np.abs(y) <= fov_y / 2)
+    return np.column_stack([x[inside], y[inside]])
+
+
+def _build_weights(field_of_view, delta_phi, delta_rho, image_shape, truncate):
+    centers = hex_lattice(field_of_view, delta_phi)
+    ny, nx = image_shape
+    pixel = np.array([field_of_view[0] / nx, field_of_view[1] / ny])
+    sigma = delta_rho * FWHM_TO_SIGMA
+    # Every unit sees the same window of pixels around its nearest pixel
+    radius = np.ceil(truncate * sigma / pixel).astype(int)
+    oy, ox = np.mgrid[-radius[1]:radius[1] + 1, -radius[0]:radius[0] + 1]
+    # Fractional pixel index; image row 0 is the bottom of the field of view (origin='lower')
+    position = (centers + np.array(field_of_view) / 2) / pixel - 0.5
+    nearest = np.rint(position).astype(int)
+    px = nearest[:, 0:1] + ox.ravel()
+    py = nearest[:, 1:2] + oy.ravel()
+    d2 = (((px - position[:, 0:1]) * pixel[0])**2 + ((py - position[:, 1:2]) * pixel[1])**2)
+    weights = np.exp(-d2 / (2 * sigma**2))
+    valid = (px >= 0) & (px < nx) & (py >= 0) & (py < ny) & (d2 <= (truncate * sigma)**2)
+    weights = np.where(valid, weights, 0.0)
+    weights /= weights.sum(axis=1, keepdims=True)
+    counts = valid.sum(axis=1)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return sparse.csr_matrix((weights[valid].astype(np.float32), (py * nx + px)[valid], indptr),
+                             shape=(len(centers), ny * nx))
+
+
+def _read_only(weights):
+    # The memoized matrix is shared by every caller with the same eye
+    for arr in (weights.data, weights.indices, weights.indptr):
+        arr.flags.writeable = False
+    return weights
+
+
+@lru_cache(maxsize=16)
+def _cached_weights(field_of_view, delta_phi, delta_rho, image_shape, truncate, cache_dir):
+    if cache_dir is None:
+        return _read_only(_build_weights(field_of_view, delta_phi, delta_rho, image_shape, truncate))
+    payload = {'field_of_view': field_of_view, 'delta_phi': delta_phi, 'delta_rho': delta_rho,
+               'image_shape': image_shape, 'truncate': truncate}
+    key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:20]
+    path = os.path.join(cache_dir, f'eye-{key}.npz')
+    if os.path.exists(path):
+        return _read_only(sparse.load_npz(path))
+    weights = _build_weights(field_of_view, delta_phi, delta_rho, image_shape, truncate)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.npz')
+    os.close(fd)
+    sparse.save_npz(tmp, weights)
+    os.replace(tmp, path)
+    return _read_only(weights)
+
+
+def sampling_weights(eye, truncate=3.0, cache_dir=DEFAULT_CACHE_DIR):
+    """Sparse (n_units, ny * nx) float32 matrix of normalized acceptance weights
+
+    Units are in the order of eye['centers'].  cache_dir=None skips the
+    on-disk cache (weights are still memoized in-process).  The memoized
+    matrix is shared between calls, so its arrays are read-only; use
+    .copy() to modify it.
+    """
+    return _cached_weights(eye['field_of_view'], eye['delta_phi'], eye['delta_rho'],
+                           eye['image_shape'], float(truncate), cache_dir)
+
+
+def sample(eye, frames, weights=None):
+    """Unit responses to a frame (ny, nx) or stack of frames (..., ny, nx) -> (..., n_units)"""
+    weights = sampling_weights(eye) if weights is None else weights
+    frames = np.asarray(frames, dtype=np.float32)
+    if frames.shape[-2:] != eye['image_shape']:
+        raise ValueError(f"Frames of shape {frames.shape[-2:]} do not match the eye's "
+                         f"image_shape {eye['image_shape']}")
+    lead = frames.shape[:-2]
+    flat = frames.reshape(-1, frames.shape[-2] * frames.shape[-1])
+    return (weights @ flat.T).T.reshape(lead + (weights.shape[0],))
+
+
+def unit_density(eye, eye_radius_mm=1.0):
+    """Units per mm² of eye surface for an eye of the given radius (Panel C's x-axis)"""
+    solid_angle = np.radians(eye['delta_phi'])**2 * np.sqrt(3) / 2  # hexagonal cell
+    return 1 / (solid_angle * eye_radius_mm**2)
+
+
+if __name__ == '__main__':
+    import time
+
+    from schlieren_animation import rising_plumes
+    from synthetic_schlieren import schlieren_image
+
+    shape = (1024, 1024)
+    frames = np.stack([schlieren_image(f, 0.02 / 1024, path_length=0.05, focal_length=0.5, source='gaussian')
+                       for f in rising_plumes(30, shape=shape)])
+    for delta_phi in (1.0, 0.5, 0.25):
+        eye = make_eye((60, 60), delta_phi, image_shape=shape)
+        start = time.perf_counter()
+        weights = sampling_weights(eye, cache_dir=None)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        responses = sample(eye, frames, weights)
+        elapsed = time.perf_counter() - start
+        print(f"Δφ={delta_phi:4.2f}°: {len(eye['centers']):6d} units, {weights.nnz / 1e6:5.1f} M weights "
+              f"(built in {built:.2f} s); {len(frames) / elapsed:5.0f} frames/s, "
+              f'response range {responses.min():.2f} - {responses.max():.2f}')
@@ -0,0 +1,207 @@
+"""Multi-objective design exploration for biomimetic schlieren sensors.
+
+A candidate design is (n_layers, path_length_mm, unit_density, delta_theta_min).
+Its objectives, all minimized, use the relations of figures3.create_figure3():
+
+  delta_rho_min  Δθ_min / (K · A · L) with A the traced amplification of an
+                 n_layers stack at normal incidence                     (Panels A, B)
+  resolution     efficiency · 20 / sqrt(unit_density) · (1 + L / 2 mm)   (Panel C; longer
+                 optical paths spread the deflected beam over neighbouring units)
+  energy         unit_density / 100 · (1 + n_layers · L[mm] / 25) · (1e-5 / Δθ_min)^0.25
+                 (more units, more optical structure and finer mechanoreception cost more)
+
+explore() samples millions of designs within an organism's bounds in
+vectorized batches and keeps the non-dominated set, merging batch fronts as
+it goes.  Fronts are found by sorting: a cumulative minimum for two
+objectives, and a sweep over a bisect-maintained staircase for three
+(O(n log n) comparisons instead of O(n²) pairwise tests; the staircase is
+kept in bounded chunks so that updating it never shifts more than one chunk).  knee_point()
+picks the operating point closest to the ideal point after normalization.
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+from multilayer_optics import axial_amplification
+
+K_GLADSTONE_DALE = 2.3e-4  # m³/kg, air (figures3, Panel B)
+RESOLUTION_CONSTANT = 20.0  # degrees · sqrt(units/mm²) (figures3, Panel C)
+BLUR_LENGTH_MM = 2.0
+
+# Design bounds and Panel C resolution efficiency of each organism model
+ORGANISMS = {
+    'insect': {'n_layers': (5, 50), 'path_length_mm': (0.1, 1.0), 'unit_density': (100, 1000),
+               'delta_theta_min': (1e-6, 1e-4), 'efficiency': 1.0},
+    'amphibian': {'n_layers': (2, 20), 'path_length_mm': (0.5, 5.0), 'unit_density': (10, 300),
+                  'delta_theta_min': (1e-7, 1e-5), 'efficiency': 1.5},
+    'bird': {'n_layers': (5, 30), 'path_length_mm': (0.3, 3.0), 'unit_density': (50, 600),
+             'delta_theta_min': (5e-7, 5e-5), 'efficiency': 1.2},
+}
+
+OBJECTIVES = ('delta_rho_min', 'resolution', 'energy')
+
+
+def sample_designs(n, organism='insect', rng=None):
+    """n random designs within the organism's bounds (log-uniform density and Δθ_min)"""
+    rng = np.random.default_rng(rng)
+    b = ORGANISMS[organism]
+    log_uniform = lambda lo, hi: np.exp(rng.uniform(np.log(lo), np.log(hi), n))
+    return {
+        'n_layers': rng.integers(b['n_layers'][0], b['n_layers'][1] + 1, n),
+        'path_length_mm': rng.uniform(*b['path_length_mm'], n),
+        'unit_density': log_uniform(*b['unit_density']),
+        'delta_theta_min': log_uniform(*b['delta_theta_min']),
+    }
+
+
+def evaluate_designs(designs, organism='insect', objectives=OBJECTIVES):
+    """(n, len(objectives)) array of objective values, all to be minimized"""
+    L = designs['path_length_mm']
+    layers = designs['n_layers']
+    values = {}
+    if 'delta_rho_min' in objectives:
+        # A does not depend on L (multilayer_optics.py); stacks lost to TIR detect nothing
+        A = np.nan_to_num(axial_amplification(layers), nan=0.0)
+        with np.errstate(divide='ignore'):
+            values['delta_rho_min'] = designs['delta_theta_min'] / (K_GLADSTONE_DALE * A * L * 1e-3)
+    if 'resolution' in objectives:
+        values['resolution'] = (ORGANISMS[organism]['efficiency'] * RESOLUTION_CONSTANT
+                                / np.sqrt(designs['unit_density']) * (1 + L / BLUR_LENGTH_MM))
+    if 'energy' in objectives:
+        values['energy'] = (designs['unit_density'] / 100 * (1 + layers * L / 25)
+                            * (1e-5 / designs['delta_theta_min'])**0.25)
+    return np.column_stack([values[name] for name in objectives])
+
+
+def _front_2d(f):
+    order = np.lexsort((f[:, 1], f[:, 0]))
+    g = f[order, 1]
+    # Non-dominated iff strictly better in the second objective than everything before it
+    best_before = np.minimum.accumulate(np.r_[np.inf, g[:-1]])
+    return order[g < best_before]
+
+
+def _front_3d(f, chunk=512):
+    order = np.lexsort((f[:, 2], f[:, 1], f[:, 0]))
+    # Staircase of the (f1, f2) values kept so far: f1 ascending, f2 descending,
+    # stored as consecutive chunks so inserts and deletes shift one chunk at most
+    heads, ys, zs = [], [], []  # first f1 of each chunk, chunks of f1, chunks of f2
+    keep = []
+    for idx, y, z in zip(order, f[order, 1].tolist(), f[order, 2].tolist()):
+        c = bisect_right(heads, y) - 1
+        if c < 0:
+            c = i = 0
+        else:
+            i = bisect_right(ys[c], y)
+            if zs[c][i - 1] <= z:
+                continue  # dominated by an earlier point
+        keep.append(idx)
+        if not heads:
+            heads, ys, zs = [y], [[y]], [[z]]
+            continue
+        # Remove staircase points this one dominates (they follow contiguously,
+        # possibly into the next chunks); each point is removed at most once
+        j = i
+        chunk_z = zs[c]
+        while j < len(chunk_z) and chunk_z[j] >= z:
+            j += 1
+        if j == len(chunk_z):
+            k = c + 1
+            while k < len(zs) and zs[k][-1] >= z:
+                k += 1
+            del heads[c + 1:k], ys[c + 1:k], zs[c + 1:k]
+            if c + 1 < len(zs):
+                n = 0
+                while zs[c + 1][n] >= z:
+                    n += 1
+                del ys[c + 1][:n], zs[c + 1][:n]
+                heads[c + 1] = ys[c + 1][0]
+        ys[c][i:j] = [y]
+        zs[c][i:j] = [z]
+        heads[c] = ys[c][0]
+        if len(ys[c]) > 2 * chunk:
+            heads.insert(c + 1, ys[c][chunk])
+            ys.insert(c + 1, ys[c][chunk:])
+            zs.insert(c + 1, zs[c][chunk:])
+            del ys[c][chunk:], zs[c][chunk:]
+    return np.array(keep, dtype=np.intp)
+
+
+def pareto_front(f):
+    """Indices of the non-dominated rows of f (n, 2) or (n, 3), minimizing every column
+
+    Duplicated points are kept once.
+    """
+    f = np.asarray(f, dtype=float)
+    if f.ndim != 2 or f.shape[1] not in (2, 3):
+        raise ValueError(f'Expected 2 or 3 objectives, got shape {f.shape}')
+    if len(f) == 0:
+        return np.array([], dtype=np.intp)
+    if f.shape[1] == 2:
+        return _front_2d(f)
+    # Cheap vectorized prefilter: drop points dominated by a few weighted-sum optima
+    # (each of which is itself non-dominated)
+    scale = f.max(axis=0) - f.min(axis=0)
+    norm = (f - f.min(axis=0)) / np.where(scale > 0, scale, 1)
+    weights = np.random.default_rng(0).dirichlet(np.ones(3), 16)
+    anchors = np.unique(np.argmin(norm @ weights.T, axis=0))
+    cols = [np.ascontiguousarray(f[:, j]) for j in range(3)]
+    dominated = np.zeros(len(f), dtype=bool)
+    for a in f[anchors]:
+        dominated |= (cols[0] >= a[0]) & (cols[1] >= a[1]) & (cols[2] >= a[2])
+    dominated[anchors] = False
+    candidates = np.flatnonzero(~dominated)
+    return candidates[_front_3d(f[candidates])]
+
+
+def knee_point(f):
+    """Index of the front point closest to the ideal point, objectives scaled to [0, 1]"""
+    f = np.asarray(f, dtype=float)
+    scale = f.max(axis=0) - f.min(axis=0)
+    norm = (f - f.min(axis=0)) / np.where(scale > 0, scale, 1)
+    return int(np.argmin(np.hypot.reduce(norm, axis=1) if norm.shape[1] > 1 else norm[:, 0]))
+
+
+def explore(organism='insect', n_designs=1_000_000, batch_size=250_000,
+            objectives=OBJECTIVES, seed=0):
+    """Non-dominated designs among n_designs random candidates for one organism
+
+    Returns a dict with the front's design parameters, its 'objectives'
+    (sorted by the first objective), the 'knee' index into the front and
+    the number of designs evaluated.
+    """
+    if organism not in ORGANISMS:
+        raise ValueError(f"Unknown organism '{organism}', use one of {sorted(ORGANISMS)}")
+    rng = np.random.default_rng(seed)
+    front_designs, front_values = None, None
+    for lo in range(0, n_designs, batch_size):
+        designs = sample_designs(min(batch_size, n_designs - lo), organism, rng)
+        values = evaluate_designs(designs, organism, objectives)
+        if front_values is not None:
+            designs = {k: np.concatenate([front_designs[k], v]) for k, v in designs.items()}
+            values = np.concatenate([front_values, values])
+        keep = pareto_front(values)
+        front_designs = {k: v[keep] for k, v in designs.items()}
+        front_values = values[keep]
+
+    order = np.argsort(front_values[:, 0], kind='stable')
+    result = {k: v[order] for k, v in front_designs.items()}
+    result['objectives'] = front_values[order]
+    result['objective_names'] = tuple(objectives)
+    result['knee'] = knee_point(result['objectives'])
+    result['n_evaluated'] = n_designs
+    return result
+
+
+if __name__ == '__main__':
+    import time
+
+    for organism in ORGANISMS:
+        start = time.perf_counter()
+        result = explore(organism, n_designs=2_000_000)
+        elapsed = time.perf_counter() - start
+        k = result['knee']
+        print(f"{organism:9s}: {len(result['objectives']):5d} non-dominated of {result['n_evaluated']:,} "
+              f"designs in {elapsed:.2f} s; knee: {result['n_layers'][k]} layers, "
+              f"L={result['path_length_mm'][k]:.2f} mm, {result['unit_density'][k]:.0f} units/mm², "
+              f"Δθ_min={result['delta_theta_min'][k]:.1e} rad")
@@ -0,0 +1,136 @@
+"""Manifest of the rendered figure set and make-style staleness checks.
+
+FIGURES maps each output file (relative to the repository root) to the
+create_* function that draws it.  It can also list input data files
+('inputs', repository-relative paths or glob patterns) and savefig
+options ('savefig', merged over build_figures.SAVEFIG_KWARGS).
+
+An output is stale when it is missing, or when its stamp no longer matches.
+An existing output without a stamp was not made by this build (or predates
+it) and is only overwritten on request (build_figures.py --force).
+The stamp is a hash of the function's source signature (render_cache.py:
+the function, the helpers it calls, its module's top-level statements and
+every sibling module it imports), the contents of its inputs and its
+savefig options.  Stamps are recorded in STAMP_FILE after each successful
+render.  Editing one figure's code therefore rebuilds only the outputs of
+that figure, however recently the other files were touched.
+
+    python build_figures.py --manifest            # rebuild stale outputs in parallel
+    python build_figures.py --manifest --dry-run  # list stale outputs and why
+    python build_figures.py --manifest --force    # also overwrite outputs that have no stamp
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+import render_cache
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(CODE_DIR)
+STAMP_FILE = os.path.join(REPO_DIR, 'papers', 'SCH', 'figure_stamps.json')
+
+_DRAFTS = 'papers/SCH/drafts/figures_test'
+
+# Not listed, because no function draws them as they are:
+#  * older drafts in figures_test (figure5_biomimetic_schlieren.png,
+#    figure7_detectability_pycnoclines_improved.png,
+#    figure_sp1_schlieren_fundamentals.png) have no generating function any more;
+#  * the three images in paper/figures were edited after rendering:
+#    classical_schlieren_system.png stacks the classical, rainbow and BOS
+#    diagrams, figure5_biomimetic_schlieren_corrected.png is the top row of
+#    figures.create_figure5_corrected, and figure4_environmental_applications.png
+#    (3469 x 2602) does not match what figures4.create_figure4 draws (4235 x 3034).
+#    Rebuilding them would replace the paper's images with different ones.
+FIGURES = {
+    f'{_DRAFTS}/schlieren_light_deflection_principle.png': {'function': 'research.create_light_deflection_principle'},
+    f'{_DRAFTS}/classical_schlieren_system.png': {'function': 'research.create_classical_schlieren'},
+    f'{_DRAFTS}/rainbow_schlieren_system.png': {'function': 'research.create_rainbow_schlieren'},
+    f'{_DRAFTS}/bos_system.png': {'function': 'research.create_bos_system'},
+    f'{_DRAFTS}/schlieren_methods_comparison.png': {'function': 'research.create_comparison_table'},
+    f'{_DRAFTS}/schlieren_complete_overview.png': {'function': 'research.create_schlieren_summary'},
+    f'{_DRAFTS}/figure3_model_validation.png': {'function': 'figures3.create_figure3'},
+    f'{_DRAFTS}/figure4_environmental_applications.png': {'function': 'figures4.create_figure4'},
+    f'{_DRAFTS}/figure5_biomimetic_schlieren_corrected.png': {'function': 'figures.create_figure5_corrected'},
+    f'{_DRAFTS}/figure7_detectability_pycnoclines_final.png': {'function': 'figures2.create_figure7_revised_for_detects'},
+    f'{_DRAFTS}/figure_1_schlieren_principles.png': {'function': 'figures5.create_figure_1_schlieren_principle'},
+    f'{_DRAFTS}/figure_2_schlieren_analysis.png': {'function': 'figures5.create_figure_2_sensitivity_analysis'},
+    f'{_DRAFTS}/figure_3_schlieren_applications.png': {'function': 'figures5.create_figure_3_applications'},
+    f'{_DRAFTS}/figure_sp2_natural_schlieren_effects.png': {'function': 'figures6.create_figure_sp2_natural_schlieren_effects'},
+}
+
+
+def _input_files(entry):
+    files = []
+    for pattern in entry.get('inputs', ()):
+        matches = sorted(glob.glob(os.path.join(REPO_DIR, pattern), recursive=True))
+        if not matches:
+            raise FileNotFoundError(f'Input {pattern!r} matches no files')
+        files.extend(matches)
+    return files
+
+
+def stamp(entry, savefig_kwargs):
+    """Hash of everything an output depends on (see the module docstring)"""
+    module, func_name = entry['function'].split('.')
+    inputs = {}
+    for path in _input_files(entry):
+        with open(path, 'rb') as f:
+            inputs[os.path.relpath(path, REPO_DIR)] = hashlib.sha256(f.read()).hexdigest()
+    payload = {
+        'source': render_cache.source_signature(os.path.join(CODE_DIR, module + '.py'), func_name),
+        'inputs': inputs,
+        'savefig': dict(savefig_kwargs, **entry.get('savefig', {})),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def load_stamps(path=STAMP_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_stamps(stamps, path=STAMP_FILE):
+    """Write the stamp file atomically"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(stamps, f, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def stale_outputs(savefig_kwargs, figures=FIGURES, stamps=None):
+    """{output: (reason, new stamp)} for every output that must be rebuilt"""
+    stamps = load_stamps() if stamps is None else stamps
+    stale = {}
+    for output, entry in figures.items():
+        new = stamp(entry, savefig_kwargs)
+        if not os.path.exists(os.path.join(REPO_DIR, output)):
+            stale[output] = ('missing', new)
+        elif output not in stamps:
+            stale[output] = ('no stamp', new)
+        elif stamps[output] != new:
+            stale[output] = ('changed', new)
+    return stale
+
+
+def render_jobs(stale, figures=FIGURES):
+    """Group stale outputs into render jobs: one render per function and savefig options
+
+    Returns a list of (module, function, first output path, extra output
+    paths, savefig overrides), with absolute paths.
+    """
+    groups = {}
+    for output in sorted(stale):
+        entry = figures[output]
+        overrides = entry.get('savefig', {})
+        key = (entry['function'], os.path.splitext(output)[1], json.dumps(overrides, sort_keys=True))
+        groups.setdefault(key, (overrides, []))[1].append(os.path.join(REPO_DIR, output))
+    jobs = []
+    for (function, _, _), (overrides, outputs) in groups.items():
+        module, func_name = function.split('.')
+        jobs.append((module, func_name, outputs[0], outputs[1:], overrides))
+    return jobs
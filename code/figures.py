@@ -2,28 +2,35 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.gridspec import GridSpec
-import seaborn as sns
-
-# Set style for scientific figures
-plt.style.use('default') # Using a default style that should be widely available
-sns.set_palette("viridis") # A perceptually uniform colormap
-plt.rcParams.update({
-    'font.size': 10, # Adjusted for clarity in a multi-panel figure
-    'axes.labelsize': 11,
-    'axes.titlesize': 12,
-    'xtick.labelsize': 10,
-    'ytick.labelsize': 10,
-    'legend.fontsize': 9,
-    'figure.titlesize': 14,
-    'lines.linewidth': 2,
-    'axes.grid': True,
-    'grid.alpha': 0.4,
-    'patch.edgecolor': 'black', # Ensure patches have edges
-    'figure.constrained_layout.use': True # Helps with layout
-})
+
+from palettes import color_cycle
+
+def _set_style():
+    """Apply the figure style (called by the create_* functions, not at import)"""
+    # Set style for scientific figures
+    plt.style.use('default') # Using a default style that should be widely available
+    plt.rcParams['axes.prop_cycle'] = color_cycle('viridis') # A perceptually uniform colormap
+    plt.rcParams.update({
+        'font.size': 10, # Adjusted for clarity in a multi-panel figure
+        'axes.labelsize': 11,
+        'axes.titlesize': 12,
+        'xtick.labelsize': 10,
+        'ytick.labelsize': 10,
+        'legend.fontsize': 9,
+        'figure.titlesize': 14,
+        'lines.linewidth': 2,
+        'axes.grid': True,
+        'grid.alpha': 0.4,
+        'patch.edgecolor': 'black', # Ensure patches have edges
+        'figure.constrained_layout.use': True # Helps with layout
+    })
 
 # Figure 5: Biomimetic Implementation Strategies and Evolution
 def create_figure5_corrected():
+    from amphibian_lens import trace_lens
+    from hill_response import MODEL_PARAMETERS, hill_response
+
+    _set_style()
     fig = plt.figure(figsize=(14, 8)) # Adjusted for better layout
     gs = GridSpec(2, 3, figure=fig, hspace=0.4, wspace=0.3)
 
@@ -86,11 +93,14 @@ def create_figure5_corrected():
     sensor_x = np.linspace(-0.7, 0.7, 5)
     ax2.scatter(sensor_x, np.full_like(sensor_x, sensor_y_position), s=40, c='red', marker='s', label='Pressure Sensors', zorder=5)
 
-    # Incident and bent light (adjust arrows if needed for new shape)
-    ax2.arrow(0, 0.6, 0, -(0.6 - np.max(membrane_top) -0.05), head_width=0.05, head_length=0.1, fc='yellow', ec='black', linewidth=1, length_includes_head=True)
-    # Simple representation of bending
-    bent_light_y_end = sensor_y_position + 0.1 # Aim towards general sensor area
-    ax2.arrow(0, np.max(membrane_top)-0.05, 0.15, bent_light_y_end - (np.max(membrane_top)-0.05), head_width=0.05, head_length=0.1, fc='orange', ec='black', linewidth=1, linestyle='--', label='Bent Light', length_includes_head=True)
+    # Incident and bent light: parallel rays traced through the chamber (amphibian_lens.py)
+    rays = trace_lens(np.linspace(-0.8, 0.8, 9), edge=half_thickness_at_edge, bulge=central_bulge_factor,
+                      sensor_gap=-sensor_y_position - (half_thickness_at_edge + central_bulge_factor))
+    for n, i in enumerate(np.flatnonzero(rays['valid'][0])):
+        ax2.plot([rays['entry_x'][0, i]] * 2, [0.6, rays['entry_y'][0, i]], color='gold', linewidth=1)
+        ax2.plot([rays['entry_x'][0, i], rays['exit_x'][0, i], rays['sensor_x'][0, i]],
+                 [rays['entry_y'][0, i], rays['exit_y'][0, i], sensor_y_position],
+                 color='orange', linewidth=1, linestyle='--', label='Bent Light' if n == 0 else None)
     ax2.text(0, 0.65, "Incident Light", ha='center', va='bottom', fontsize=8) # Adjusted y for visibility
 
     ax2.set_xlim(-1.2, 1.2)
@@ -137,12 +147,9 @@ def create_figure5_corrected():
     ax4 = fig.add_subplot(gs[1, :2])
     gradient_magnitude = np.logspace(-3, 1, 100)  # Arbitrary units of density gradient strength
 
-    def model_response(x, k_half, n_hill):
-        return (x**n_hill) / (k_half**n_hill + x**n_hill)
-
-    insect_sensitivity = model_response(gradient_magnitude, k_half=0.1, n_hill=1.5)
-    amphibian_sensitivity = model_response(gradient_magnitude, k_half=0.03, n_hill=2.0)
-    bird_sensitivity = model_response(gradient_magnitude, k_half=0.06, n_hill=1.8)
+    insect_sensitivity = hill_response(gradient_magnitude, **MODEL_PARAMETERS['insect'])
+    amphibian_sensitivity = hill_response(gradient_magnitude, **MODEL_PARAMETERS['amphibian'])
+    bird_sensitivity = hill_response(gradient_magnitude, **MODEL_PARAMETERS['bird'])
 
     ax4.semilogx(gradient_magnitude, insect_sensitivity, label='Insect Model', linewidth=2.5)
     ax4.semilogx(gradient_magnitude, amphibian_sensitivity, label='Amphibian Model', linewidth=2.5)
@@ -1,25 +1,28 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
-import seaborn as sns
-
-# Set style for scientific figures
-plt.style.use('default')
-sns.set_palette("viridis")
-plt.rcParams.update({
-    'font.size': 10,
-    'axes.labelsize': 11,
-    'axes.titlesize': 13,
-    'xtick.labelsize': 10,
-    'ytick.labelsize': 10,
-    'legend.fontsize': 8, # Adjusted for potentially more items in Panel D legend
-    'figure.titlesize': 16,
-    'lines.linewidth': 2,
-    'axes.grid': True,
-    'grid.linestyle': ':',
-    'grid.alpha': 0.7,
-    'figure.constrained_layout.use': True
-})
+
+from palettes import color_cycle
+
+def _set_style():
+    """Apply the figure style (called by the create_* functions, not at import)"""
+    # Set style for scientific figures
+    plt.style.use('default')
+    plt.rcParams['axes.prop_cycle'] = color_cycle('viridis')
+    plt.rcParams.update({
+        'font.size': 10,
+        'axes.labelsize': 11,
+        'axes.titlesize': 13,
+        'xtick.labelsize': 10,
+        'ytick.labelsize': 10,
+        'legend.fontsize': 8, # Adjusted for potentially more items in Panel D legend
+        'figure.titlesize': 16,
+        'lines.linewidth': 2,
+        'axes.grid': True,
+        'grid.linestyle': ':',
+        'grid.alpha': 0.7,
+        'figure.constrained_layout.use': True
+    })
 
 # --- Constants for Seawater Properties (using the same simplified functions) ---
 RHO_COEFFS = [9.9983952e+02, 6.793952e-02, -9.095290e-03, 1.001685e-04, -1.120083e-06, 6.536332e-09]
@@ -27,14 +30,27 @@ A_COEFFS = [8.24493e-1, -4.0899e-3, 7.6438e-5, -8.2467e-7, 5.3875e-9]
 B_COEFFS = [-5.72466e-3, 1.0227e-4, -1.6546e-6]
 C_COEFF = 4.8314e-4
 
-def calculate_seawater_density_ies80_simplified(S, T):
+def _check_table(table, quantity):
+    if table['quantity'] != quantity:
+        raise ValueError(f"Expected a '{quantity}' table, got '{table['quantity']}'")
+    return table
+
+def calculate_seawater_density_ies80_simplified(S, T, table=None):
+    # Optional tabulated backend: a seawater_tables.build_table('figures2_density') table
+    if table is not None:
+        from seawater_tables import interpolate
+        return interpolate(_check_table(table, 'figures2_density'), S, T)
     T_poly = np.polyval(RHO_COEFFS[::-1], T)
     A_S = (A_COEFFS[0] + (A_COEFFS[1] + (A_COEFFS[2] + (A_COEFFS[3] + A_COEFFS[4]*T)*T)*T)*T)
     B_S_sqrt = (B_COEFFS[0] + (B_COEFFS[1] + B_COEFFS[2]*T)*T)
     density = T_poly + A_S*S + B_S_sqrt*(S**1.5) + C_COEFF*(S**2)
     return density
 
-def calculate_refractive_index_seawater(S, T, wavelength_nm=532):
+def calculate_refractive_index_seawater(S, T, wavelength_nm=532, table=None):
+    # Optional tabulated backend: a seawater_tables.build_table('figures2_refractive_index') table
+    if table is not None:
+        from seawater_tables import interpolate
+        return interpolate(_check_table(table, 'figures2_refractive_index'), S, T)
     n0 = 1.33374
     nS_coeff = 1.831e-4
     nT_coeff = -2.105e-6
@@ -44,6 +60,7 @@ def calculate_refractive_index_seawater(S, T, wavelength_nm=532):
 
 # Figure 7: Detectability of Oceanic Pycnoclines by Biomimetic Schlieren Vision
 def create_figure7_revised_for_detects():
+    _set_style()
     fig = plt.figure(figsize=(14, 10))
     gs = GridSpec(2, 2, figure=fig, hspace=0.4, wspace=0.3) # Adjusted spacing
 
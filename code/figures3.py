@@ -1,83 +1,81 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
-import seaborn as sns
-
-# Set style for scientific figures
-# plt.style.use('seaborn-v0_8-whitegrid') # A good seaborn style
-plt.style.use('default') # Using a default style that should be widely available
-sns.set_palette("husl") # A colorblind-friendly palette
-plt.rcParams.update({
-    'font.size': 10,
-    'axes.labelsize': 11,
-    'axes.titlesize': 12,
-    'xtick.labelsize': 10,
-    'ytick.labelsize': 10,
-    'legend.fontsize': 9,
-    'figure.titlesize': 14,
-    'lines.linewidth': 2,
-    'axes.grid': True,
-    'grid.alpha': 0.5, # Make grid lines slightly more prominent
-    'figure.constrained_layout.use': True # Helps with layout
-})
+
+from palettes import color_cycle, color_palette
+
+def _set_style():
+    """Apply the figure style (called by the create_* functions, not at import)"""
+    # Set style for scientific figures
+    # plt.style.use('seaborn-v0_8-whitegrid') # A good seaborn style
+    plt.style.use('default') # Using a default style that should be widely available
+    plt.rcParams['axes.prop_cycle'] = color_cycle('husl') # A colorblind-friendly palette
+    plt.rcParams.update({
+        'font.size': 10,
+        'axes.labelsize': 11,
+        'axes.titlesize': 12,
+        'xtick.labelsize': 10,
+        'ytick.labelsize': 10,
+        'legend.fontsize': 9,
+        'figure.titlesize': 14,
+        'lines.linewidth': 2,
+        'axes.grid': True,
+        'grid.alpha': 0.5, # Make grid lines slightly more prominent
+        'figure.constrained_layout.use': True # Helps with layout
+    })
 
 # Figure 3: Mathematical Model Validation and Sensitivity Analysis
 def create_figure3():
+    from design_pareto import explore, knee_point
+    from multilayer_optics import amplification_sweep
+
+    _set_style()
     fig = plt.figure(figsize=(15, 11)) # Adjusted figure size
     gs = GridSpec(3, 2, figure=fig, hspace=0.45, wspace=0.3) # Adjusted grid: 3 rows, 2 cols
 
     # --- Panel A: Amplification factor vs. structural parameters ---
     ax1 = fig.add_subplot(gs[0, 0])
-    L_values = np.linspace(0.1, 5.0, 50)  # Path length in mm (L from paper)
-    n_layers_options = np.array([5, 10, 20, 50])  # Number of layers (conceptual)
-    delta_n_per_layer_eff = 0.0005  # Effective refractive index change *per layer* contributing to bending
-
-    # A = N_layers * delta_n_eff * L (Conceptual amplification factor related to cumulative bending)
-    # This is a simplified model for A based on the idea that more layers and longer path length increase effect.
-    # The actual formula for 'A' would be specific to the optical physics of the layered structure.
-    # For illustration, let A ~ N_layers * L * (effective_gradient_per_layer_unit_length)
-    # Or simply, A increases with N and L.
-    # Let's use the paper's formula style: A represents the ratio of final to initial angular deflection.
-    # Assuming the paper's A is more abstract, we can plot a relationship where A grows with parameters.
-    # Let's define A = (Path Length * Number of Layers * Layer_Factor) / Reference_Deflection
-    # Or for the graph, A = L_values * n_layers * constant_factor.
-    # A = (K * L * N_layers * delta_n_per_layer) / delta_theta_min_ref , or just plot a representation
-    # From paper draft: A is a general amplification factor. The plot should show A increasing with L and number of layers.
-    # The previous A = n * delta_n * L_values * 1000 was an interpretation.
-    # Let's plot a plausible relationship where A grows, e.g., A = c1 * L + c2 * N_layers
-    # Or more likely A proportional to L * N_layers * (some optical efficiency)
-    
-    amplification_base = 0.5 # Base amplification per mm per layer (arbitrary unit for illustration)
-    
-    colors_A = sns.color_palette("viridis", n_colors=len(n_layers_options))
+    # Angular amplification A = dθ_out/dθ_in of chitin/hemolymph stacks with
+    # interfaces tilted by multilayer_optics.INTERFACE_TILT, traced with Snell's
+    # law; one batch over 2001 incidence angles x 1-50 layers.  A does not
+    # depend on the path length L, which only sets the walk-off lever arm.
+    incidence_deg = np.linspace(-10, 10, 2001)
+    n_layers_options = np.array([5, 10, 20, 50])  # Number of layers
+    sweep = amplification_sweep(np.radians(incidence_deg), np.arange(1, 51))
+
+    colors_A = color_palette("viridis", n_colors=len(n_layers_options))
 
     for i, n_layers in enumerate(n_layers_options):
-        # Simplified A = L_values (mm) * n_layers * amplification_base_factor
-        A = L_values * n_layers * amplification_base
-        ax1.plot(L_values, A, color=colors_A[i], label=f'{n_layers} layers', linewidth=2)
+        A = sweep['amplification'][:, n_layers - 1]
+        ax1.plot(incidence_deg, A, color=colors_A[i], label=f'{n_layers} layers', linewidth=2)
 
-    ax1.set_xlabel('Path Length (L, mm)')
+    ax1.set_xlabel('Incidence Angle (degrees)')
     ax1.set_ylabel('Amplification Factor (A)')
-    ax1.set_title('A) Amplification vs. Path Length & Layers')
+    ax1.set_title('A) Amplification vs. Incidence & Layers')
     ax1.legend(title="# Layers")
-    ax1.set_xlim(0, 5)
-    ax1.set_ylim(bottom=0) # Ensure A starts from 0 or slightly above if baseline exists
+    ax1.set_xlim(-10, 10)
+    ax1.set_yscale('log') # A diverges towards total internal reflection
+    ax1.set_ylim(0.8, 100)
 
     # --- Panel B: Detection threshold vs. mechanoreceptor sensitivity ---
     # Formula from paper: Δρ_min ≈ (Δθ_min) / (K * A * L)
     ax2 = fig.add_subplot(gs[0, 1])
     delta_theta_min_values = np.logspace(-7, -4, 50)  # Min. detectable angular deflection in radians (sensitive range)
     K_gladstone_dale = 2.3e-4  # Gladstone-Dale constant for air (m^3/kg)
-    A_fixed = 50          # Fixed general amplification factor (from Panel A range)
     L_fixed_m = 2.0 / 1000 # Fixed path length in meters (e.g., 2mm)
+    normal = np.argmin(np.abs(incidence_deg))
 
-    # Δρ_min in kg/m³
-    delta_rho_min_values = (delta_theta_min_values) / (K_gladstone_dale * A_fixed * L_fixed_m)
-
-    ax2.loglog(delta_theta_min_values * 1e6, delta_rho_min_values * 1000, 'b-', linewidth=2) # Δθ in μrad, Δρ in g/m³
+    for i, n_layers in enumerate(n_layers_options):
+        # Traced A of the Panel A stacks at normal incidence
+        A = sweep['amplification'][normal, n_layers - 1]
+        # Δρ_min in kg/m³
+        delta_rho_min_values = (delta_theta_min_values) / (K_gladstone_dale * A * L_fixed_m)
+        ax2.loglog(delta_theta_min_values * 1e6, delta_rho_min_values * 1000, color=colors_A[i],
+                   linewidth=2, label=f'{n_layers} layers (A = {A:.1f})') # Δθ in μrad, Δρ in g/m³
     ax2.set_xlabel('Min. Detectable Angle (Δθ$_{min}$, μrad)')
     ax2.set_ylabel('Min. Detectable Density Change (Δρ$_{min}$, g/m³)')
     ax2.set_title('B) Detection Threshold vs. Sensor Sensitivity')
+    ax2.legend(title='L = 2 mm')
     ax2.grid(True, which="both", ls=":", alpha=0.7) # Grid for log-log
 
     # --- Panel C: Spatial resolution vs. sensing unit density ---
@@ -126,43 +124,27 @@ def create_figure3():
 
     # --- Panel D: Trade-off curves (Sensitivity vs. Resolution) ---
     ax4 = fig.add_subplot(gs[1, 1])
-    # Illustrative trade-off: higher sensitivity often means compromises in resolution.
-    # Example: larger sensors for sensitivity might be less dense for resolution.
-    # Let relative_sensitivity be on x-axis.
-    relative_sensitivity_pts = np.linspace(1, 10, 100) # Arbitrary units
-    # Assume angular_resolution = Base_Res + (Max_Impact / relative_sensitivity_pts)
-    # Or a curve like Res = k / Sensitivity^alpha
-    base_resolution = 0.5 # degrees (best possible)
-    trade_off_factor = 10
-    angular_resolution_tradeoff = base_resolution + trade_off_factor / relative_sensitivity_pts
-
-    ax4.plot(relative_sensitivity_pts, angular_resolution_tradeoff, 'r-', linewidth=2.5, label='Sensitivity-Resolution Frontier')
-
-    # Hypothetical positions of the models on this trade-off curve
+    # Non-dominated (Δρ_min, resolution) designs of each model among random
+    # candidates within its design bounds (design_pareto.py); the marker is the
+    # knee of each frontier (in log objectives), the most balanced operating point.
     model_names = ['Insect', 'Amphibian', 'Bird']
-    # Relative sensitivity (arbitrary units, consistent with x-axis)
-    model_sensitivity_tradeoff = {'Insect': 4, 'Amphibian': 8, 'Bird': 6}
-    # Corresponding resolution from the trade-off curve
-    model_resolution_tradeoff = {
-        name: base_resolution + trade_off_factor / sens
-        for name, sens in model_sensitivity_tradeoff.items()
-    }
-    
-    colors_D = sns.color_palette("Set2", n_colors=len(model_names))
+    colors_D = color_palette("Set2", n_colors=len(model_names))
 
     for i, name in enumerate(model_names):
-        ax4.scatter(model_sensitivity_tradeoff[name], model_resolution_tradeoff[name],
-                    s=150, color=colors_D[i], label=name, zorder=5, edgecolors='k')
-        ax4.text(model_sensitivity_tradeoff[name], model_resolution_tradeoff[name] + 0.2, name,
-                 ha='center', va='bottom', fontsize=9)
-
-
-    ax4.set_xlabel('Relative Sensitivity (Arbitrary Units)')
+        front = explore(name.lower(), n_designs=200_000, objectives=('delta_rho_min', 'resolution'))
+        sensitivity = 1 / front['objectives'][:, 0]  # m³/kg
+        resolution = front['objectives'][:, 1]
+        k = knee_point(np.log10(front['objectives']))  # Δρ_min spans decades
+        ax4.plot(sensitivity, resolution, '-', color=colors_D[i], linewidth=2, label=f'{name} Frontier')
+        ax4.scatter(sensitivity[k], resolution[k], s=150, color=colors_D[i], zorder=5, edgecolors='k')
+        ax4.text(sensitivity[k], resolution[k] * 1.08, name, ha='center', va='bottom', fontsize=9)
+
+    ax4.set_xscale('log')
+    ax4.set_xlabel('Sensitivity 1/Δρ_min (m³/kg)')
     ax4.set_ylabel('Angular Resolution (degrees)') # Smaller is better
     ax4.set_title('D) Sensitivity-Resolution Trade-off')
     ax4.legend()
-    ax4.set_ylim(0, max(angular_resolution_tradeoff) * 1.1)
-    ax4.set_xlim(0, 11)
+    ax4.set_ylim(bottom=0)
 
 
     # --- Panel E: Cost vs Performance (Energy Cost vs. Overall System Performance) ---
@@ -179,17 +161,12 @@ def create_figure3():
     ax5.plot(performance_metric, cost_amphibian, label='Amphibian Model', linewidth=2, color=colors_D[1])
     ax5.plot(performance_metric, cost_bird, label='Bird Model', linewidth=2, color=colors_D[2])
 
-    # Illustrative optimal operating points (where benefits justify costs for each model type)
-    optimal_perf_insect = 60
-    optimal_perf_amphibian = 80
-    optimal_perf_bird = 70
-
-    ax5.scatter(optimal_perf_insect, 0.1 * optimal_perf_insect**1.5,
-                s=100, marker='*', color=colors_D[0], label='Optimal Insect', zorder=5, edgecolors='k')
-    ax5.scatter(optimal_perf_amphibian, 0.05 * optimal_perf_amphibian**1.2,
-                s=100, marker='*', color=colors_D[1], label='Optimal Amphibian', zorder=5, edgecolors='k')
-    ax5.scatter(optimal_perf_bird, 0.08 * optimal_perf_bird**1.3,
-                s=100, marker='*', color=colors_D[2], label='Optimal Bird', zorder=5, edgecolors='k')
+    # Optimal operating points: knee of each (performance, cost) curve, where
+    # further performance starts to cost disproportionately more
+    for i, (name, cost) in enumerate(zip(model_names, (cost_insect, cost_amphibian, cost_bird))):
+        k = knee_point(np.column_stack([-performance_metric, cost]))
+        ax5.scatter(performance_metric[k], cost[k],
+                    s=100, marker='*', color=colors_D[i], label=f'Optimal {name}', zorder=5, edgecolors='k')
 
     ax5.set_xlabel('System Performance (Arbitrary Units %)')
     ax5.set_ylabel('Relative Energy Cost (Arbitrary Units)')
@@ -1,28 +1,35 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
-import seaborn as sns
-
-# Set style for scientific figures
-plt.style.use('default')
-sns.set_palette("muted") # A slightly desaturated palette
-plt.rcParams.update({
-    'font.size': 10,
-    'axes.labelsize': 11,
-    'axes.titlesize': 12,
-    'xtick.labelsize': 10,
-    'ytick.labelsize': 10,
-    'legend.fontsize': 9,
-    'figure.titlesize': 14,
-    'lines.linewidth': 2,
-    'axes.grid': True,
-    'grid.linestyle': ':', # Dotted grid lines
-    'grid.alpha': 0.6,
-    'figure.constrained_layout.use': True # Helps with layout
-})
+
+from palettes import color_cycle
+
+def _set_style():
+    """Apply the figure style (called by the create_* functions, not at import)"""
+    # Set style for scientific figures
+    plt.style.use('default')
+    plt.rcParams['axes.prop_cycle'] = color_cycle('muted') # A slightly desaturated palette
+    plt.rcParams.update({
+        'font.size': 10,
+        'axes.labelsize': 11,
+        'axes.titlesize': 12,
+        'xtick.labelsize': 10,
+        'ytick.labelsize': 10,
+        'legend.fontsize': 9,
+        'figure.titlesize': 14,
+        'lines.linewidth': 2,
+        'axes.grid': True,
+        'grid.linestyle': ':', # Dotted grid lines
+        'grid.alpha': 0.6,
+        'figure.constrained_layout.use': True # Helps with layout
+    })
 
 # Figure 4: Environmental Applications and Selective Advantages
 def create_figure4():
+    from atmosphere import profiles
+    from navigation import navigation_cost, plan_routes
+
+    _set_style()
     fig = plt.figure(figsize=(14, 10)) # Adjusted for better layout
     gs = GridSpec(2, 2, figure=fig, hspace=0.4, wspace=0.3)
 
@@ -84,27 +91,13 @@ def create_figure4():
     axB = fig.add_subplot(gs[0, 1])
     height_air = np.linspace(0, 2000, 200)  # meters
 
-    # Simulated atmospheric temperature profile (e.g., ISA principles, boundary layer effects)
-    T_surface_air = 20  # °C (ground level)
-    lapse_rate_std = 6.5 / 1000  # °C/m (standard lapse rate in troposphere)
+    # Simulated atmospheric profile (ISA-like lapse rate in the mixing layer, stable layer above;
+    # hydrostatic pressure, see atmosphere.py)
     mixing_layer_height = 1000 # meters
-    temp_air_profile = np.zeros_like(height_air)
-    # Simplified boundary layer: constant lapse rate up to mixing height, then stable
-    for i, h_val in enumerate(height_air):
-        if h_val <= mixing_layer_height:
-            temp_air_profile[i] = T_surface_air - lapse_rate_std * h_val
-        else: # Simplified inversion or stable layer above mixing height
-            temp_air_profile[i] = T_surface_air - lapse_rate_std * mixing_layer_height - 0.002 * (h_val - mixing_layer_height)
-
-
-    # Air density (simplified ideal gas law: rho ~ P / T; P decreases with height)
-    # For illustration, focus on temperature effect primarily at lower altitudes
-    # rho = rho0 * (T0 / T)
-    rho0_air = 1.225 # kg/m^3 at sea level, 15°C
-    T0_kelvin = 273.15 + 15
-    density_air = rho0_air * (T0_kelvin / (temp_air_profile + 273.15))
-    # Add a slight decrease with height to simulate pressure effect
-    density_air *= np.exp(-height_air / 8000) # Scale height ~8km
+    air = profiles(height_air, surface_temperature=20, lapse_rate=6.5 / 1000,
+                   mixing_height=mixing_layer_height, stable_lapse_rate=0.002)
+    temp_air_profile = air['temperature'][0]
+    density_air = air['density'][0]
 
     axB.plot(density_air, height_air, 'g-', linewidth=2.5, label='Air Density (kg/m³)')
     axB.set_xlabel('Air Density (kg/m³)')
@@ -176,22 +169,25 @@ def create_figure4():
                        0.3 * np.sin(Y_nav * 1.5) * np.cos(X_nav * 0.3)
     contour = axD.contourf(X_nav, Y_nav, density_features, levels=15, cmap='coolwarm', alpha=0.7)
 
-    # Illustrative navigation paths
-    # Schlieren-guided path (exploiting density features)
-    optimal_x = [1, 2.5, 4.5, 6, 7.5, 9]
-    optimal_y = [1, 2,   1.5, 3, 5.5, 8] # Path that might follow a feature
-    axD.plot(optimal_x, optimal_y, 'g-', linewidth=3, marker='o', markersize=5, label='Schlieren-guided Path')
+    # Navigation paths: cost-optimal route over the feature field (following strong
+    # density gradients is cheaper, see navigation.py) vs. the straight line
+    start_xy, target_xy = (1, 1), (9, 8)
+    to_cell = lambda xy: (int(np.argmin(np.abs(y_nav - xy[1]))), int(np.argmin(np.abs(x_nav - xy[0]))))
+    spacing_nav = x_nav[1] - x_nav[0]
+    route = plan_routes(navigation_cost(density_features, spacing_nav), [to_cell(start_xy)],
+                        to_cell(target_xy), spacing=spacing_nav)[0]
+    axD.plot(x_nav[route['path'][:, 1]], y_nav[route['path'][:, 0]], 'g-', linewidth=3,
+             label=f"Schlieren-guided Path (cost {route['cost']:.1f})")
 
-    # Traditional path (more direct, less informed by subtle density cues)
-    traditional_x = [1, 3, 5, 7, 9]
-    traditional_y = [1, 2.5, 4, 5.5, 7]
-    axD.plot(traditional_x, traditional_y, 'k--', linewidth=2.5, label='Traditional Path')
+    # Traditional path (direct, uninformed by subtle density cues)
+    axD.plot(*zip(start_xy, target_xy), 'k--', linewidth=2.5,
+             label=f"Traditional Path (cost {route['straight_cost']:.1f})")
 
     # Start and End points
-    axD.scatter([1, 9], [1, max(optimal_y[-1], traditional_y[-1])], s=100, c=['limegreen', 'red'],
+    axD.scatter(*zip(start_xy, target_xy), s=100, c=['limegreen', 'red'],
                 marker='*', zorder=5, edgecolors='black', linewidth=1)
-    axD.text(1, 0.5, 'Start', ha='center', va='top', fontweight='bold')
-    axD.text(9, max(optimal_y[-1], traditional_y[-1]) + 0.5, 'Target', ha='center', va='bottom', fontweight='bold')
+    axD.text(start_xy[0], start_xy[1] - 0.5, 'Start', ha='center', va='top', fontweight='bold')
+    axD.text(target_xy[0], target_xy[1] + 0.5, 'Target', ha='center', va='bottom', fontweight='bold')
 
     axD.set_xlabel('X Coordinate (Arbitrary Units)')
     axD.set_ylabel('Y Coordinate (Arbitrary Units)')
@@ -2,26 +2,33 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.gridspec import GridSpec
-import seaborn as sns
 
-# Set style for scientific figures
-plt.style.use('default')
-sns.set_palette("muted")
-plt.rcParams.update({
-    'font.size': 10,
-    'axes.labelsize': 11,
-    'axes.titlesize': 12,
-    'xtick.labelsize': 9,
-    'ytick.labelsize': 9,
-    'legend.fontsize': 9,
-    'figure.titlesize': 14,
-    'lines.linewidth': 1.5,
-    'axes.grid': False,
-    'figure.constrained_layout.use': True
-})
+from palettes import color_cycle
+
+def _set_style():
+    """Apply the figure style (called by the create_* functions, not at import)"""
+    # Set style for scientific figures
+    plt.style.use('default')
+    plt.rcParams['axes.prop_cycle'] = color_cycle('muted')
+    plt.rcParams.update({
+        'font.size': 10,
+        'axes.labelsize': 11,
+        'axes.titlesize': 12,
+        'xtick.labelsize': 9,
+        'ytick.labelsize': 9,
+        'legend.fontsize': 9,
+        'figure.titlesize': 14,
+        'lines.linewidth': 1.5,
+        'axes.grid': False,
+        'figure.constrained_layout.use': True
+    })
 
 def create_figure_1_schlieren_principle():
     """Figure 1: Physical principles of schlieren imaging"""
+    from raytrace import trace_rays
+    from synthetic_schlieren import schlieren_image
+
+    _set_style()
     fig = plt.figure(figsize=(14, 10))
     gs = GridSpec(2, 2, figure=fig, hspace=0.3, wspace=0.3)
 
@@ -42,19 +49,14 @@ def create_figure_1_schlieren_principle():
     cbar = plt.colorbar(im, ax=axA, shrink=0.8)
     cbar.set_label('Refractive Index', fontsize=9)
     
-    # Add light rays with proper deflection
-    y_rays = [2, 3, 4, 5, 6]
-    for i, y_start in enumerate(y_rays):
-        # Calculate ray path through gradient field
-        x_ray = np.linspace(0, 10, 50)
-        y_ray = np.full_like(x_ray, y_start)
-        
-        # Apply deflection based on gradient (simplified)
-        for j in range(1, len(x_ray)):
-            if 3 < x_ray[j] < 7:  # In gradient region
-                gradient_y = -(Y[int(y_ray[j-1]*10), int(x_ray[j]*10)] - 4) * 0.1
-                y_ray[j] = y_ray[j-1] + gradient_y * 0.1
-        
+    # Add light rays traced through the gradient field
+    y_rays = np.array([2, 3, 4, 5, 6], dtype=float)
+    _, _, (x_path, y_paths) = trace_rays(n_field, x, y, y_rays, return_paths=True)
+    # Real deflections are ~1e-3 mm over the field; exaggerate them for display
+    exaggeration = 300
+    y_paths = y_rays + exaggeration * (y_paths - y_rays)
+    for i in range(len(y_rays)):
+        x_ray, y_ray = x_path, y_paths[:, i]
         axA.plot(x_ray, y_ray, 'b-', linewidth=2, alpha=0.8)
         axA.arrow(x_ray[-2], y_ray[-2], x_ray[-1]-x_ray[-2], y_ray[-1]-y_ray[-2], 
                  head_width=0.1, head_length=0.2, fc='blue', ec='blue')
@@ -169,8 +171,12 @@ def create_figure_1_schlieren_principle():
     density_gradient = np.exp(-((X_img)**2 + (Y_img+2)**2) / 4) - \
                       np.exp(-((X_img)**2 + (Y_img-2)**2) / 4)
     
-    # Convert to grayscale intensity (knife edge effect)
-    intensity = 0.5 + 0.3 * np.tanh(2 * density_gradient)
+    # Convert to grayscale intensity (knife edge effect): horizontal knife edge,
+    # 50 mm deep test section, f = 0.5 m, 2.5 mm Gaussian source image
+    n_plume = 1.0003 + 0.0002 * density_gradient
+    intensity = schlieren_image(n_plume, dx=(x_img[1] - x_img[0]) * 1e-3, path_length=0.05,
+                                focal_length=0.5, cutoff=0.5, orientation=np.pi / 2,
+                                source_size=2.5e-3, source='gaussian')
     
     im_schlieren = axD.imshow(intensity, extent=[-5, 5, -5, 5], 
                              cmap='gray', origin='lower')
@@ -187,6 +193,7 @@ def create_figure_1_schlieren_principle():
 
 def create_figure_2_sensitivity_analysis():
     """Figure 2: Sensitivity and optical setup variations"""
+    _set_style()
     fig = plt.figure(figsize=(12, 8))
     gs = GridSpec(2, 2, figure=fig, hspace=0.3, wspace=0.3)
 
@@ -272,6 +279,7 @@ def create_figure_2_sensitivity_analysis():
 
 def create_figure_3_applications():
     """Figure 3: Schlieren imaging applications"""
+    _set_style()
     fig = plt.figure(figsize=(12, 10))
     gs = GridSpec(2, 3, figure=fig, hspace=0.3, wspace=0.3)
 
@@ -2,25 +2,29 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.gridspec import GridSpec
-import seaborn as sns
-
-# Set style for scientific figures (can reuse from SP1 or define again)
-plt.style.use('default')
-sns.set_palette("pastel") # Using a softer palette for "natural" scenes
-plt.rcParams.update({
-    'font.size': 10,
-    'axes.labelsize': 11,
-    'axes.titlesize': 12,
-    'xtick.labelsize': 9,
-    'ytick.labelsize': 9,
-    'legend.fontsize': 9,
-    'figure.titlesize': 14,
-    'lines.linewidth': 1.5,
-    'axes.grid': False,
-    'figure.constrained_layout.use': True
-})
+
+from palettes import color_cycle
+
+def _set_style():
+    """Apply the figure style (called by the create_* functions, not at import)"""
+    # Set style for scientific figures (can reuse from SP1 or define again)
+    plt.style.use('default')
+    plt.rcParams['axes.prop_cycle'] = color_cycle('pastel') # Using a softer palette for "natural" scenes
+    plt.rcParams.update({
+        'font.size': 10,
+        'axes.labelsize': 11,
+        'axes.titlesize': 12,
+        'xtick.labelsize': 9,
+        'ytick.labelsize': 9,
+        'legend.fontsize': 9,
+        'figure.titlesize': 14,
+        'lines.linewidth': 1.5,
+        'axes.grid': False,
+        'figure.constrained_layout.use': True
+    })
 
 def create_figure_sp2_natural_schlieren_effects():
+    _set_style()
     fig = plt.figure(figsize=(10, 6)) # Adjusted for 2 panels
     gs = GridSpec(1, 2, figure=fig, wspace=0.25)
 
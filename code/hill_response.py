@@ -0,0 +1,178 @@
+"""Hill-type sensory response of the schlieren vision models (figures.py, Panel D).
+
+    R(x) = x^n / (k^n + x^n)
+
+x: density-gradient stimulus, k: half-saturation constant, n: Hill
+coefficient.  Derived quantities:
+
+    sensitivity     dR/dx = n R (1 - R) / x
+    dynamic range   log10(x_90 / x_10) = 2 log10(9) / n   (decades from 10% to 90%)
+
+A model also has an optical gain: the stimulus it actually receives is
+gain * x.  evaluate_grid() evaluates these over the full product of stimulus
+values, gain, k_half and n_hill, or over stimulus values x named models
+(models=), chunk by chunk so memory stays bounded, optionally writing into an
+on-disk array store that open_store() maps back in.
+"""
+import json
+import os
+
+import numpy as np
+from scipy.special import expit
+
+# (k_half, n_hill, gain) of the three models drawn in Figure 5; Panel D
+# plots them against the same stimulus axis, i.e. at unit optical gain
+MODEL_PARAMETERS = {
+    'insect': {'k_half': 0.1, 'n_hill': 1.5, 'gain': 1.0},
+    'amphibian': {'k_half': 0.03, 'n_hill': 2.0, 'gain': 1.0},
+    'bird': {'k_half': 0.06, 'n_hill': 1.8, 'gain': 1.0},
+}
+
+QUANTITIES = ('response', 'sensitivity')
+
+
+def hill_response(x, k_half, n_hill, gain=1.0):
+    """Normalized response to stimulus gain * x; broadcasts over all arguments"""
+    # Logistic form: stable for large n and for x far from k_half
+    with np.errstate(divide='ignore'):
+        return expit(n_hill * (np.log(gain) + np.log(x) - np.log(k_half)))
+
+
+def hill_sensitivity(x, k_half, n_hill, gain=1.0):
+    """dR/dx, the change of response per unit stimulus"""
+    r = hill_response(x, k_half, n_hill, gain)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return n_hill * r * (1 - r) / x
+
+
+def dynamic_range(n_hill, low=0.1, high=0.9):
+    """Decades of stimulus between the low and high response levels (independent of k_half)"""
+    return (np.log10(high / (1 - high)) - np.log10(low / (1 - low))) / np.asarray(n_hill, dtype=float)
+
+
+def evaluate_grid(x, k_half=None, n_hill=None, gain=(1.0,), models=None, quantities=QUANTITIES,
+                  store=None, chunk_elements=1 << 22, dtype=np.float32):
+    """Evaluate the model over gain x k_half x n_hill x x, or over models x x
+
+    Without models, arrays for each quantity have shape
+    (len(gain), len(k_half), len(n_hill), len(x)).  models: names from
+    MODEL_PARAMETERS (or True for all of them); each model contributes one
+    row with its own (k_half, n_hill, gain), arrays have shape
+    (len(models), len(x)), and k_half, n_hill and gain must not be given.
+    The grid is filled chunk_elements values at a time.  store: None for
+    in-memory arrays, or a directory where the arrays are created as .npy
+    memory maps (with the axes), so grids larger than memory can be filled
+    and later reopened with open_store().
+    Returns a dict with the quantity arrays, 'dynamic_range' (per n_hill,
+    or per model) and the axes ('model' holds the model names).
+    """
+    unknown = set(quantities) - set(QUANTITIES)
+    if unknown:
+        raise ValueError(f'Unknown quantities {sorted(unknown)}, use {QUANTITIES}')
+    if models is not None:
+        if k_half is not None or n_hill is not None or tuple(np.atleast_1d(gain)) != (1.0,):
+            raise ValueError('models= takes k_half, n_hill and gain from MODEL_PARAMETERS')
+        models = list(MODEL_PARAMETERS) if models is True else list(models)
+        unknown = set(models) - set(MODEL_PARAMETERS)
+        if unknown:
+            raise ValueError(f'Unknown models {sorted(unknown)}, use {list(MODEL_PARAMETERS)}')
+        axes = {'model': np.array(models)}
+        axes.update({name: np.array([MODEL_PARAMETERS[m][name] for m in models], dtype=float)
+                     for name in ('gain', 'k_half', 'n_hill')})
+        axes['x'] = np.atleast_1d(np.asarray(x, dtype=float))
+        shape = (len(models), len(axes['x']))
+        # One row per model
+        row_offset = np.log(axes['gain']) - np.log(axes['k_half'])
+        row_n = axes['n_hill']
+    else:
+        if k_half is None or n_hill is None:
+            raise ValueError('Give k_half and n_hill, or models')
+        axes = {name: np.atleast_1d(np.asarray(values, dtype=float))
+                for name, values in (('gain', gain), ('k_half', k_half), ('n_hill', n_hill), ('x', x))}
+        shape = tuple(len(a) for a in axes.values())
+        # One row per (gain, k_half, n_hill) combination
+        offset = np.log(axes['gain'])[:, None] - np.log(axes['k_half'])[None, :]
+        row_offset = np.repeat(offset.ravel(), shape[2])
+        row_n = np.tile(axes['n_hill'], shape[0] * shape[1])
+
+    if store is not None:
+        os.makedirs(store, exist_ok=True)
+        np.savez(os.path.join(store, 'axes.npz'), **axes)
+        result = {q: np.lib.format.open_memmap(os.path.join(store, q + '.npy'), mode='w+',
+                                               dtype=dtype, shape=shape) for q in quantities}
+    else:
+        result = {q: np.empty(shape, dtype=dtype) for q in quantities}
+
+    log_x = np.log(axes['x']).astype(dtype)
+    inv_x = (1 / axes['x']).astype(dtype)
+    n_x = shape[-1]
+    n_rows = len(row_n)
+    row_offset, row_n = row_offset.astype(dtype), row_n.astype(dtype)
+    rows_per_chunk = max(1, chunk_elements // n_x)
+    flat = {q: arr.reshape(n_rows, n_x) for q, arr in result.items()}
+    for lo in range(0, n_rows, rows_per_chunk):
+        rows = slice(lo, min(lo + rows_per_chunk, n_rows))
+        n = row_n[rows, None]
+        r = log_x[None, :] + row_offset[rows, None]
+        r *= n
+        expit(r, out=r)
+        if 'response' in flat:
+            flat['response'][rows] = r
+        if 'sensitivity' in flat:
+            r *= 1 - r
+            r *= n
+            r *= inv_x
+            flat['sensitivity'][rows] = r
+
+    result['dynamic_range'] = dynamic_range(axes['n_hill'])
+    result.update(axes)
+    if store is not None:
+        for arr in result.values():
+            if isinstance(arr, np.memmap):
+                arr.flush()
+        np.save(os.path.join(store, 'dynamic_range.npy'), result['dynamic_range'])
+        with open(os.path.join(store, 'store.json'), 'w') as f:
+            json.dump({'quantities': list(quantities), 'shape': shape, 'dtype': np.dtype(dtype).name}, f)
+    return result
+
+
+def open_store(store):
+    """Reopen a grid written by evaluate_grid(store=...) with memory-mapped arrays"""
+    with open(os.path.join(store, 'store.json')) as f:
+        meta = json.load(f)
+    result = {q: np.load(os.path.join(store, q + '.npy'), mmap_mode='r') for q in meta['quantities']}
+    result['dynamic_range'] = np.load(os.path.join(store, 'dynamic_range.npy'))
+    with np.load(os.path.join(store, 'axes.npz')) as axes:
+        result.update({name: axes[name] for name in axes.files})
+    return result
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    # 4 gains x 200 k_half x 200 n_hill x 500 stimulus values = 80 million combinations
+    x = np.logspace(-3, 1, 500)
+    k_half = np.logspace(-2.5, 0, 200)
+    n_hill = np.linspace(0.5, 4.0, 200)
+    gain = [0.5, 1.0, 2.0, 4.0]
+
+    with tempfile.TemporaryDirectory() as store:
+        start = time.perf_counter()
+        grid = evaluate_grid(x, k_half, n_hill, gain, store=store)
+        elapsed = time.perf_counter() - start
+        size = grid['response'].size
+        print(f'{size / 1e6:.0f} M combinations in {elapsed:.2f} s ({size / elapsed / 1e6:.0f} M/s) -> {store}')
+
+        reopened = open_store(store)
+        # Which (k_half, n_hill) give the steepest response at x = 0.05 for unit gain?
+        i = np.argmin(np.abs(x - 0.05))
+        best = np.unravel_index(np.argmax(reopened['sensitivity'][1, :, :, i]), (len(k_half), len(n_hill)))
+        print(f'Max sensitivity at x=0.05: k_half={k_half[best[0]]:.3f}, n_hill={n_hill[best[1]]:.2f}')
+
+    # The Figure 5 models, each with its own (k_half, n_hill, gain)
+    models = evaluate_grid(x, models=True)
+    for name, response, decades in zip(models['model'], models['response'], models['dynamic_range']):
+        params = MODEL_PARAMETERS[name]
+        assert np.allclose(response, hill_response(x, **params), atol=1e-6)
+        print(f"{name:9s} x_50 = {params['k_half'] / params['gain']:.3f}, dynamic range {decades:.2f} decades")
@@ -0,0 +1,140 @@
+"""Ray optics of layered chitin stacks (Panel A of figures3.create_figure3).
+
+A stack of n_layers alternates chitin (n_high) and hemolymph (n_low) layers
+of equal thickness, path_length / n_layers, between two half-spaces of
+n_outside.  Parallel planar interfaces cannot amplify deflections, since
+n sin θ is conserved across them.  So each chitin-to-hemolymph interface is
+tilted by `tilt` (a sawtooth of thin prisms, INTERFACE_TILT by default)
+while the other interfaces and the entry and exit faces are flat.  A ray entering at angle θ_in to the
+stack axis is refracted at every interface by Snell's law, with angles
+measured from the local normal:
+
+    n_a sin(θ - α) = n_b sin(θ' - α)
+
+Each interface scales small angular changes by n_a cos θ_i / (n_b cos θ_t).
+The angular amplification A = dθ_out/dθ_in is the product of these factors.
+It grows with the number of layers as the ray is bent toward grazing
+incidence, until total internal reflection (TIR) cuts the stack off.  Ray
+angles and A do not depend on the path length; only the lateral walk-off
+of the ray and its sensitivity dx/dθ_in (the lever arm seen by receptors at
+the exit face) do, in proportion to it.
+
+trace_stack() broadcasts incidence angle, layer count and path length
+against each other.  Ray angles do not depend on the layer thickness, and a
+stack of n layers is a prefix of a deeper one.  So each distinct incidence
+angle is traced once through the deepest stack; every configuration is then
+a gather, and the walk-off scales with the layer thickness.  A sweep of
+millions of configurations is one call.
+"""
+import numpy as np
+
+N_CHITIN = 1.56
+N_HEMOLYMPH = 1.35
+# Tilt of the chitin-to-hemolymph interfaces.  An assumed value, not a
+# measured one: the paper gives no interface geometry.  At 10° stacks of up
+# to 53 layers still transmit at normal incidence (A ≈ 6.6 there), which
+# covers the 50-layer upper bound of the insect designs in design_pareto.py.
+INTERFACE_TILT = np.radians(10.0)
+
+
+def _refract(theta, n_a, n_b, alpha):
+    """Angle after the interface (global frame) and the small-angle gain; NaN beyond TIR"""
+    incidence = theta - alpha
+    s = n_a / n_b * np.sin(incidence)
+    with np.errstate(invalid='ignore'):
+        transmitted = np.arcsin(np.where(np.abs(s) <= 1, s, np.nan))
+        gain = n_a * np.cos(incidence) / (n_b * np.cos(transmitted))
+    return transmitted + alpha, gain
+
+
+def _layer_states(theta_in, max_layers, n_high, n_low, n_outside, tilt):
+    """Per-layer ray state for 1D incidence angles, (M, max_layers) arrays
+
+    Angles only depend on the incidence angle and the layer index, so every
+    prefix of one deep stack is also the answer for a shallower stack.
+    """
+    theta, amplification = _refract(theta_in, n_outside, n_high, 0.0)
+    states = {name: np.empty((len(theta_in), max_layers))
+              for name in ('walk', 'walk_gain', 'theta_out', 'amplification')}
+    walk = np.zeros_like(theta)
+    walk_gain = np.zeros_like(theta)
+    for k in range(max_layers):
+        chitin = k % 2 == 0
+        n_a = n_high if chitin else n_low
+        # Walk through layer k per unit thickness
+        walk += np.tan(theta)
+        walk_gain += amplification / np.cos(theta)**2
+        states['walk'][:, k] = walk
+        states['walk_gain'][:, k] = walk_gain
+        # If layer k is the last one: leave through the flat exit face
+        exit_theta, exit_gain = _refract(theta, n_a, n_outside, 0.0)
+        states['theta_out'][:, k] = exit_theta
+        states['amplification'][:, k] = amplification * exit_gain
+        # Otherwise: on into layer k + 1
+        theta, gain = _refract(theta, n_a, n_low if chitin else n_high, tilt if chitin else 0.0)
+        amplification = amplification * gain
+    return states
+
+
+def trace_stack(theta_in, n_layers, path_length, n_high=N_CHITIN, n_low=N_HEMOLYMPH,
+                n_outside=N_HEMOLYMPH, tilt=INTERFACE_TILT):
+    """Trace rays through layered stacks; theta_in, n_layers and path_length broadcast
+
+    theta_in: incidence angle in radians to the stack axis; n_layers: number
+    of layers (≥ 1, starting with chitin); path_length: total stack
+    thickness (any length unit, used for the walk-off); tilt: tilt in
+    radians of the chitin-to-hemolymph interfaces.
+    Returns a dict of broadcast arrays: 'theta_out', 'amplification'
+    (dθ_out/dθ_in), 'displacement' (lateral exit offset), 'displacement_gain'
+    (d displacement / dθ_in) and 'transmitted' (False where a ray is
+    totally internally reflected; the other outputs are NaN there).
+    """
+    theta_in, n_layers, path_length = np.broadcast_arrays(
+        np.asarray(theta_in, dtype=float), np.asarray(n_layers, dtype=int),
+        np.asarray(path_length, dtype=float))
+    if n_layers.size and n_layers.min() < 1:
+        raise ValueError('n_layers must be at least 1')
+    # Trace each distinct incidence angle once through the deepest stack
+    angles, which = np.unique(theta_in, return_inverse=True)
+    states = _layer_states(angles, int(n_layers.max(initial=1)), n_high, n_low, n_outside, tilt)
+    index = (which.reshape(theta_in.shape), n_layers - 1)
+    thickness = path_length / n_layers
+    theta_out = states['theta_out'][index]
+    return {
+        'theta_out': theta_out,
+        'amplification': states['amplification'][index],
+        'displacement': thickness * states['walk'][index],
+        'displacement_gain': thickness * states['walk_gain'][index],
+        'transmitted': np.isfinite(theta_out),
+    }
+
+
+def amplification_sweep(theta_in, n_layers, path_length=1.0, **stack):
+    """trace_stack() over the full grid theta_in x n_layers (1D inputs)
+
+    path_length (a scalar) only scales 'displacement' and 'displacement_gain'.
+    """
+    grid = np.ix_(np.atleast_1d(theta_in), np.atleast_1d(n_layers))
+    return trace_stack(*grid, path_length, **stack)
+
+
+def axial_amplification(n_layers, **stack):
+    """A at normal incidence of stacks with n_layers layers (any shape); NaN beyond TIR"""
+    return trace_stack(0.0, n_layers, 1.0, **stack)['amplification']
+
+
+if __name__ == '__main__':
+    import time
+
+    theta_in = np.radians(np.linspace(-10, 10, 20001))
+    n_layers = np.arange(1, 101)
+    start = time.perf_counter()
+    sweep = amplification_sweep(theta_in, n_layers, path_length=5.0)  # mm
+    elapsed = time.perf_counter() - start
+    size = sweep['amplification'].size
+    print(f'{size / 1e6:.1f} M configurations in {elapsed:.2f} s')
+    for n in (5, 10, 20, 50, 100):
+        a = sweep['amplification'][10000, n - 1]
+        ok = sweep['transmitted'][:, n - 1].mean()
+        print(f'{n:3d} layers: A = {a:6.2f} at normal incidence, {ok:5.1%} of incidence angles transmitted, '
+              f"dx/dθ = {sweep['displacement_gain'][10000, n - 1]:.2f} mm/rad at L = 5 mm")
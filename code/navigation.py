@@ -0,0 +1,188 @@
+"""Cost-optimal routes over density-cue fields (figures4.create_figure4, Panel D).
+
+An animal with schlieren vision can follow density features (currents,
+thermal streets) instead of flying or swimming blind.  navigation_cost()
+turns a feature field into a travel cost per unit length that is lower
+where the feature gradient is strong:
+
+    cost = 1 / (1 + w · |∇f| / max|∇f|)
+
+so cost 1 is plain travel and following the strongest gradients costs
+1 / (1 + w).  Non-finite features (land, obstacles) are impassable.
+
+Routes are shortest paths on the 8-connected grid, where an edge costs its
+length times the mean cost of its two cells.  They are found with Dijkstra
+(scipy.sparse.csgraph) run once from the goal.  Every start in a batch is
+then traced back through the same predecessor tree.  Grids larger than
+max_coarse cells per side are first solved on a block-averaged coarse grid.
+The full-resolution search is then restricted to a corridor around the
+coarse routes, so a 4096 x 4096 field is planned in about a second.
+"""
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# (d_row, d_col) of the edges stored per cell; the graph is undirected
+_OFFSETS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def navigation_cost(features, spacing=1.0, gradient_weight=4.0):
+    """Travel cost per unit length, lower along strong feature gradients"""
+    features = np.asarray(features, dtype=float)
+    gy, gx = np.gradient(features, spacing)
+    magnitude = np.hypot(gx, gy)
+    magnitude[~np.isfinite(magnitude)] = 0.0  # next to obstacles: no usable cue
+    peak = magnitude.max()
+    if peak > 0:
+        magnitude /= peak
+    cost = 1.0 / (1.0 + gradient_weight * magnitude)
+    cost[~np.isfinite(features)] = np.inf
+    return cost
+
+
+def _grid_graph(cost, spacing, mask=None):
+    """Sparse graph over the passable (and masked) cells; returns (graph, node index grid)"""
+    passable = np.isfinite(cost)
+    if mask is not None:
+        passable &= mask
+    node = np.full(cost.shape, -1, dtype=np.int64)
+    node[passable] = np.arange(passable.sum())
+    rows, cols, weights = [], [], []
+    n_rows, n_cols = cost.shape
+    for dr, dc in _OFFSETS:
+        # Cells (a) and their neighbours (b) at this offset
+        a = (slice(0, n_rows - dr), slice(max(-dc, 0), n_cols - max(dc, 0)))
+        b = (slice(dr, n_rows), slice(max(dc, 0), n_cols - max(-dc, 0)))
+        both = passable[a] & passable[b]
+        rows.append(node[a][both])
+        cols.append(node[b][both])
+        weights.append(0.5 * np.hypot(dr, dc) * spacing * (cost[a][both] + cost[b][both]))
+    n = int(passable.sum())
+    graph = coo_matrix((np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))),
+                       shape=(n, n)).tocsr()
+    return graph, node
+
+
+def distance_field(cost, goal, spacing=1.0, mask=None):
+    """Cost-to-goal of every cell (inf where unreachable) and the predecessor tree
+
+    goal is a (row, col) cell index.  Returns a dict with 'distance' (grid
+    shaped), 'predecessors' (per graph node), the 'node' index grid and
+    the flat grid index of every node ('cells').
+    """
+    cost = np.asarray(cost, dtype=float)
+    graph, node = _grid_graph(cost, spacing, mask)
+    goal_node = node[tuple(goal)]
+    if goal_node < 0:
+        raise ValueError(f'Goal {tuple(goal)} is not passable')
+    dist, pred = dijkstra(graph, directed=False, indices=goal_node, return_predecessors=True)
+    distance = np.full(cost.shape, np.inf)
+    distance[node >= 0] = dist
+    return {'distance': distance, 'predecessors': pred, 'node': node,
+            'cells': np.flatnonzero(node.ravel() >= 0)}
+
+
+def trace_path(field, start):
+    """(k, 2) array of (row, col) cells from start to the goal of a distance_field()"""
+    node, pred = field['node'], field['predecessors']
+    current = node[tuple(start)]
+    if current < 0 or not np.isfinite(field['distance'][tuple(start)]):
+        raise ValueError(f'Start {tuple(start)} cannot reach the goal')
+    path = [current]
+    while pred[current] >= 0:
+        current = pred[current]
+        path.append(current)
+    return np.column_stack(np.unravel_index(field['cells'][path], node.shape))
+
+
+def straight_path_cost(cost, start, goal, spacing=1.0):
+    """Cost of the straight line from start to goal (inf if it crosses an obstacle)"""
+    start, goal = np.asarray(start, dtype=float), np.asarray(goal, dtype=float)
+    length = np.hypot(*(goal - start))
+    if length == 0:
+        return 0.0
+    t = np.linspace(0, 1, int(np.ceil(length)) * 2 + 1)
+    cells = np.rint(start + t[:, None] * (goal - start)).astype(int)
+    samples = np.asarray(cost)[cells[:, 0], cells[:, 1]]
+    # Trapezoidal rule over equally spaced samples
+    return float((samples.sum() - 0.5 * (samples[0] + samples[-1])) / (len(t) - 1) * length * spacing)
+
+
+def _block_mean(cost, factor):
+    """Coarse cost grid (mean over passable cells of each factor x factor block)"""
+    pad = [(0, -n % factor) for n in cost.shape]
+    padded = np.pad(cost, pad, constant_values=np.inf)
+    shape = (padded.shape[0] // factor, factor, padded.shape[1] // factor, factor)
+    blocks = padded.reshape(shape)
+    finite = np.isfinite(blocks)
+    count = finite.sum(axis=(1, 3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coarse = np.where(finite, blocks, 0.0).sum(axis=(1, 3)) / count
+    coarse[count == 0] = np.inf
+    return coarse
+
+
+def plan_routes(cost, starts, goal, spacing=1.0, max_coarse=512, corridor=4):
+    """Cost-optimal routes from each start to a shared goal
+
+    cost: (n_rows, n_cols) travel cost per unit length (navigation_cost()).
+    starts: (row, col) cells, or an (n, 2) array; goal: (row, col).
+    Grids with more than max_coarse cells per side are solved coarse-to-fine
+    within corridor coarse cells of the coarse routes (the routes are then
+    optimal within that corridor).
+    Returns one dict per start with 'path' ((k, 2) cells), 'cost',
+    'straight_path' (its two end cells) and 'straight_cost'.
+    """
+    cost = np.asarray(cost, dtype=float)
+    starts = np.atleast_2d(np.asarray(starts, dtype=int))
+    goal = tuple(int(g) for g in goal)
+    factor = int(np.ceil(max(cost.shape) / max_coarse))
+
+    mask = None
+    if factor > 1:
+        coarse = _block_mean(cost, factor)
+        field = distance_field(coarse, (goal[0] // factor, goal[1] // factor), spacing * factor)
+        on_route = np.zeros(coarse.shape, dtype=bool)
+        for start in starts // factor:
+            path = trace_path(field, start)
+            on_route[path[:, 0], path[:, 1]] = True
+        # Widen the coarse routes into a corridor and map it to the full grid
+        width = 2 * corridor + 1
+        padded = np.pad(on_route, corridor)
+        wide = np.zeros_like(on_route)
+        for dr in range(width):
+            for dc in range(width):
+                wide |= padded[dr:dr + coarse.shape[0], dc:dc + coarse.shape[1]]
+        mask = np.repeat(np.repeat(wide, factor, axis=0), factor, axis=1)[:cost.shape[0], :cost.shape[1]]
+
+    field = distance_field(cost, goal, spacing, mask)
+    routes = []
+    for start in starts:
+        start = tuple(start)
+        routes.append({
+            'path': trace_path(field, start),
+            'cost': float(field['distance'][start]),
+            'straight_path': np.array([start, goal]),
+            'straight_cost': straight_path_cost(cost, start, goal, spacing),
+        })
+    return routes
+
+
+if __name__ == '__main__':
+    import time
+
+    n = 4096
+    y, x = np.mgrid[0:10:n * 1j, 0:10:n * 1j]
+    features = np.sin(x * 0.8) * np.cos(y * 0.5) + 0.3 * np.sin(y * 1.5) * np.cos(x * 0.3)
+    features[(np.hypot(x - 3, y - 7) < 1.0)] = np.nan  # an obstacle
+    cost = navigation_cost(features, spacing=10 / (n - 1))
+
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, n // 4, (8, 2))
+    start_time = time.perf_counter()
+    routes = plan_routes(cost, starts, (n - 400, n - 200), spacing=10 / (n - 1))
+    elapsed = time.perf_counter() - start_time
+    print(f'{len(routes)} routes on a {n} x {n} grid in {elapsed:.2f} s')
+    for route in routes[:3]:
+        print(f"  from {tuple(route['path'][0].tolist())}: cost {route['cost']:.2f} "
+              f"(straight line {route['straight_cost']:.2f}), {len(route['path'])} cells")
@@ -0,0 +1,182 @@
+"""Selective rasterization for vector (PDF/SVG) figure exports.
+
+Vector exports of the figure scripts carry every contour polygon, scatter
+dot and arrow as a path, which makes SC-BIOM-schlieren.pdf large and slow
+to save and to compile.  apply_policy() marks only the dense layers of a
+figure as rasterized:
+
+  * images and meshes (AxesImage, QuadMesh),
+  * collections with more than max_vertices path vertices (filled contour
+    sets, scatter clouds, large line and polygon collections),
+  * all lines and patches of an axes holding more than max_artists of them
+    (fields of arrows and streamlines).
+
+Text, legends, axes, ticks and small artists stay vector.  In the PDF and SVG
+backends the rasterized layers become embedded images at the savefig dpi,
+and consecutive rasterized artists are merged into one image.
+
+raster_dpi() chooses that dpi from the width the figure is printed at:
+target_dpi at the final size (the 6.5 in \\textwidth of the paper), so a 16 in
+wide figure shrunk onto the page is not rasterized at three times the
+resolution anyone can see.  When images are the only rasterized layers, it
+never exceeds their own resolution.
+
+    info = save_figure(fig, 'figure4.pdf')  # {'path', 'size_bytes', 'save_s', 'dpi', 'rasterized'}
+"""
+import os
+import time
+
+import numpy as np
+from matplotlib.collections import Collection, QuadMesh
+from matplotlib.image import AxesImage
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
+
+VECTOR_FORMATS = ('.pdf', '.svg', '.eps', '.ps')
+
+TEXT_WIDTH_IN = 6.5  # \textwidth of papers/SCH/paper (letter paper, 1 in margins)
+
+DEFAULT_POLICY = {
+    'max_vertices': 5000,   # per collection
+    'max_artists': 150,     # lines + patches per axes
+    'target_dpi': 300,      # at the printed size
+    'min_dpi': 100,
+    'max_dpi': 600,
+    'display_width': TEXT_WIDTH_IN,
+}
+
+# Per-figure overrides of DEFAULT_POLICY, keyed by 'module.function', e.g.
+# {'figures5.create_figure_1_schlieren_principle': {'max_artists': 1000}} to
+# keep an arrow-heavy schematic fully vector
+POLICIES = {}
+
+
+def policy_for(name=None, **overrides):
+    """DEFAULT_POLICY updated with POLICIES[name] and the overrides"""
+    return dict(DEFAULT_POLICY, **POLICIES.get(name, {}), **overrides)
+
+
+def _vertex_count(artist):
+    paths = artist.get_paths()
+    vertices = sum(len(path.vertices) for path in paths)
+    offsets = artist.get_offsets()
+    if len(offsets) > 1 and len(paths) <= 1:
+        # Markers: one path drawn at every offset
+        vertices = max(vertices, 1) * len(offsets)
+    return vertices
+
+
+def _axes_artists(ax):
+    """Data artists of an axes (the axes patch, spines and axis lines are not children here)"""
+    return [a for a in ax.get_children() if a.get_visible() and a is not ax.patch]
+
+
+def dense_artists(fig, policy=None):
+    """Artists of fig that apply_policy() would rasterize"""
+    policy = policy or DEFAULT_POLICY
+    dense = []
+    for ax in fig.axes:
+        children = _axes_artists(ax)
+        strokes = [a for a in children if isinstance(a, (Line2D, Patch))]
+        if len(strokes) > policy['max_artists']:
+            dense.extend(strokes)
+        for artist in children:
+            if isinstance(artist, (AxesImage, QuadMesh)):
+                dense.append(artist)
+            elif isinstance(artist, Collection) and _vertex_count(artist) > policy['max_vertices']:
+                dense.append(artist)
+    return dense
+
+
+def raster_dpi(fig, policy=None, rasterized=()):
+    """dpi for the rasterized layers: target_dpi at the printed width, clamped to [min_dpi, max_dpi]"""
+    policy = policy or DEFAULT_POLICY
+    width = fig.get_figwidth()
+    scale = min(1.0, policy['display_width'] / width) if policy['display_width'] else 1.0
+    dpi = policy['target_dpi'] * scale
+    images = [a for a in rasterized if isinstance(a, AxesImage)]
+    if images and len(images) == len(rasterized):
+        # Only images: no point resampling them above their own resolution
+        native = []
+        for image in images:
+            columns = image.get_array().shape[1]
+            shown = image.get_window_extent().width / fig.dpi  # inches at figure size
+            native.append(columns / max(shown, 1e-6))
+        dpi = min(dpi, max(native))
+    return int(np.clip(round(dpi), policy['min_dpi'], policy['max_dpi']))
+
+
+def apply_policy(fig, policy=None):
+    """Mark the dense artists of fig as rasterized; returns (rasterized artists, dpi)"""
+    policy = policy or DEFAULT_POLICY
+    dense = dense_artists(fig, policy)
+    for artist in dense:
+        artist.set_rasterized(True)
+    return dense, raster_dpi(fig, policy, dense)
+
+
+def save_figure(fig, path, name=None, policy=None, **savefig_kwargs):
+    """Save fig, applying the output policy for vector formats; returns size and timing
+
+    name selects a POLICIES entry ('module.function'); policy overrides it
+    entirely.  For vector formats the savefig dpi (which only affects the
+    rasterized layers) is replaced by the one chosen by raster_dpi().
+    Raster formats are saved as they are.
+    """
+    info = {'path': path, 'rasterized': 0, 'dpi': savefig_kwargs.get('dpi')}
+    if path.lower().endswith(VECTOR_FORMATS):
+        dense, dpi = apply_policy(fig, policy or policy_for(name))
+        savefig_kwargs['dpi'] = dpi
+        info.update(rasterized=len(dense), dpi=dpi)
+    start = time.perf_counter()
+    fig.savefig(path, **savefig_kwargs)
+    info['save_s'] = time.perf_counter() - start
+    info['size_bytes'] = os.path.getsize(path)
+    return info
+
+
+def _dense_example():
+    """A figure with the kind of layers the policy is for: fine contour fills, a dot cloud, many arrows"""
+    import matplotlib.pyplot as plt
+
+    rng = np.random.default_rng(0)
+    fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 5))
+    y, x = np.mgrid[-3:3:400j, -3:3:400j]
+    ax1.contourf(x, y, np.sin(3 * x) * np.cos(2 * y) + 0.2 * x * y, levels=60, cmap='RdBu_r')
+    ax2.scatter(*rng.normal(size=(2, 30000)), s=2, alpha=0.5)
+    for (x0, y0), (dx, dy) in zip(rng.uniform(0, 1, (400, 2)), rng.normal(0, 0.03, (400, 2))):
+        ax3.arrow(x0, y0, dx, dy, head_width=0.01)
+    return fig
+
+
+if __name__ == '__main__':
+    import sys
+    import tempfile
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import research
+    import figures5
+
+    figures = {name: getattr(module, name.split('.')[1])
+               for module in (research, figures5) for name in
+               (f'{module.__name__}.{f}' for f in dir(module) if f.startswith('create_'))
+               if name != 'research.create_all_figures'}
+    figures['dense example'] = _dense_example
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'figure':<48} {'all-vector':>18} {'policy':>18}")
+        for name, create in figures.items():
+            fig = create()
+            start = time.perf_counter()
+            fig.savefig(os.path.join(tmp, 'plain.pdf'), bbox_inches='tight')
+            plain = {'save_s': time.perf_counter() - start,
+                     'size_bytes': os.path.getsize(os.path.join(tmp, 'plain.pdf'))}
+            plt.close('all')
+            mixed = save_figure(create(), os.path.join(tmp, 'mixed.pdf'), name, bbox_inches='tight')
+            plt.close('all')
+            print(f"{name:<48} {plain['size_bytes'] / 1e3:8.0f} kB {plain['save_s']:5.2f} s "
+                  f"{mixed['size_bytes'] / 1e3:8.0f} kB {mixed['save_s']:5.2f} s "
+                  f"({mixed['rasterized']} layers @ {mixed['dpi']} dpi)")
@@ -0,0 +1,60 @@
+"""Color palettes of the figure scripts, without seaborn.
+
+The figures used seaborn only to pick colors (sns.set_palette and
+sns.color_palette), and importing it costs over a second on a cold start.
+color_palette() returns the same colors: seaborn's own palettes (husl,
+muted, pastel, ...) are stored as the hex lists seaborn 0.13 produces, and
+matplotlib colormaps are sampled the way seaborn samples them.
+
+    plt.rcParams['axes.prop_cycle'] = color_cycle('muted')
+    colors = color_palette('viridis', 4)
+"""
+from itertools import cycle, islice
+
+import matplotlib
+import numpy as np
+from cycler import cycler
+
+# seaborn.color_palette(name).as_hex() for the palettes seaborn defines itself
+PALETTES = {
+    'husl': ['#f77189', '#bb9832', '#50b131', '#36ada4', '#3ba3ec', '#e866f4'],
+    'muted': ['#4878d0', '#ee854a', '#6acc64', '#d65f5f', '#956cb4',
+              '#8c613c', '#dc7ec0', '#797979', '#d5bb67', '#82c6e2'],
+    'pastel': ['#a1c9f4', '#ffb482', '#8de5a1', '#ff9f9b', '#d0bbff',
+               '#debb9b', '#fab0e4', '#cfcfcf', '#fffea3', '#b9f2f0'],
+}
+
+DEFAULT_N_COLORS = 6  # seaborn's length for palettes sampled from a colormap
+
+
+def color_palette(name, n_colors=None):
+    """n_colors hex colors of a named palette or matplotlib colormap, as seaborn gives them
+
+    Fixed palettes (PALETTES and qualitative colormaps such as Set2) repeat
+    when more colors are asked for than they have.  Continuous colormaps are
+    sampled at n_colors evenly spaced interior points, leaving out both ends.
+    """
+    if name in PALETTES:
+        colors = PALETTES[name]
+    else:
+        cmap = matplotlib.colormaps[name]
+        if isinstance(cmap, matplotlib.colors.ListedColormap) and cmap.N <= 20:
+            colors = [matplotlib.colors.to_hex(c) for c in cmap.colors]
+        else:
+            n_colors = n_colors or DEFAULT_N_COLORS
+            colors = [matplotlib.colors.to_hex(c) for c in cmap(np.linspace(0, 1, n_colors + 2)[1:-1])]
+    return list(islice(cycle(colors), n_colors or len(colors)))
+
+
+def color_cycle(name, n_colors=None):
+    """axes.prop_cycle of a palette, what sns.set_palette(name) installs"""
+    return cycler(color=color_palette(name, n_colors))
+
+
+if __name__ == '__main__':
+    import seaborn as sns
+
+    for name, n in [('viridis', None), ('viridis', 4), ('husl', None), ('muted', None),
+                    ('pastel', None), ('Set2', 3), ('Set2', 12), ('muted', 12)]:
+        assert color_palette(name, n) == sns.color_palette(name, n_colors=n).as_hex(), (name, n)
+    print('Palettes match seaborn', sns.__version__)
@@ -0,0 +1,262 @@
+"""Reconstruct a scalar field (e.g. density) from its measured gradient.
+
+This is step 5 of the BOS process in research.create_bos_system(): given
+(∂ρ/∂x, ∂ρ/∂y) on a grid, find ρ.  Both solvers use the same least-squares
+discretization: every pair of neighbouring grid points should differ by the
+average of their two gradient samples times the grid spacing.  Its normal
+equations are the 5-point Poisson problem  L ρ = b.
+
+* integrate_gradient: rectangular domains, solved exactly with a DCT-II
+  (Neumann) or DST-I (Dirichlet) transform.
+* integrate_gradient_masked: arbitrary masked domains, solved with conjugate
+  gradients preconditioned by a geometric multigrid V-cycle.
+
+Boundary conditions:
+  'neumann'   the gradient data alone determine ρ, up to a constant, which is
+              fixed by making the mean equal to boundary_value (per connected
+              region for masked domains)
+  'dirichlet' ρ = boundary_value just outside the domain (rectangle or mask)
+"""
+import numpy as np
+from scipy import fft, ndimage
+
+BOUNDARIES = ('neumann', 'dirichlet')
+
+
+def _edge_targets(gx, gy, dx, dy):
+    # Expected differences along horizontal (i, j)->(i, j+1) and vertical (i, j)->(i+1, j) edges
+    tx = 0.5 * (gx[:, :-1] + gx[:, 1:]) * dx
+    ty = 0.5 * (gy[:-1, :] + gy[1:, :]) * dy
+    return tx, ty
+
+
+def _rhs(gx, gy, dx, dy, mask=None, dirichlet=False):
+    """b = (flux in) - (flux out) of the edge targets at every node"""
+    tx, ty = _edge_targets(gx, gy, dx, dy)
+    if mask is not None:
+        # Only edges joining two nodes of the domain carry data
+        tx = np.where(mask[:, :-1] & mask[:, 1:], tx, 0.0)
+        ty = np.where(mask[:-1, :] & mask[1:, :], ty, 0.0)
+    b = np.zeros_like(gx, dtype=float)
+    b[:, 1:] += tx
+    b[:, :-1] -= tx
+    b[1:, :] += ty
+    b[:-1, :] -= ty
+    if dirichlet:
+        # Edges to the fixed ghost values just outside the domain use one-sided samples
+        inside = np.ones(gx.shape, dtype=bool) if mask is None else mask
+        pad = np.pad(inside, 1, constant_values=False)
+        left_out = inside & ~pad[1:-1, :-2]
+        right_out = inside & ~pad[1:-1, 2:]
+        up_out = inside & ~pad[:-2, 1:-1]
+        down_out = inside & ~pad[2:, 1:-1]
+        b += np.where(left_out, gx * dx, 0.0) - np.where(right_out, gx * dx, 0.0)
+        b += np.where(up_out, gy * dy, 0.0) - np.where(down_out, gy * dy, 0.0)
+    if mask is not None:
+        b = np.where(mask, b, 0.0)
+    return b
+
+
+def integrate_gradient(gx, gy, dx=1.0, dy=1.0, boundary='neumann', boundary_value=0.0):
+    """Integrate a gradient field over a full rectangular grid with a fast transform
+
+    gx, gy: ∂ρ/∂x (along columns) and ∂ρ/∂y (along rows), shape (ny, nx)
+    Runs in O(N log N); about 0.1 s for a megapixel grid.
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError(f"Unknown boundary '{boundary}', use one of {BOUNDARIES}")
+    gx = np.asarray(gx, dtype=float)
+    gy = np.asarray(gy, dtype=float)
+    ny, nx = gx.shape
+    b = _rhs(gx, gy, dx, dy, dirichlet=(boundary == 'dirichlet'))
+
+    if boundary == 'neumann':
+        # DCT-II diagonalizes the graph Laplacian with reflecting boundaries
+        lam = ((2 - 2 * np.cos(np.pi * np.arange(ny) / ny))[:, None] +
+               (2 - 2 * np.cos(np.pi * np.arange(nx) / nx))[None, :])
+        b_hat = fft.dctn(b, type=2, norm='ortho')
+        lam[0, 0] = 1.0
+        b_hat /= lam
+        b_hat[0, 0] = 0.0
+        rho = fft.idctn(b_hat, type=2, norm='ortho')
+    else:
+        # DST-I diagonalizes it with a zero ring just outside the grid
+        lam = ((2 - 2 * np.cos(np.pi * np.arange(1, ny + 1) / (ny + 1)))[:, None] +
+               (2 - 2 * np.cos(np.pi * np.arange(1, nx + 1) / (nx + 1)))[None, :])
+        rho = fft.idstn(fft.dstn(b, type=1, norm='ortho') / lam, type=1, norm='ortho')
+    return rho + boundary_value
+
+
+# --- Multigrid for masked domains ---
+
+def _make_level(mask, dirichlet):
+    pad = np.pad(mask, 1, constant_values=False)
+    n_neighbours = (pad[:-2, 1:-1].astype(np.int8) + pad[2:, 1:-1] + pad[1:-1, :-2] + pad[1:-1, 2:])
+    diag = np.full(mask.shape, 4.0) if dirichlet else n_neighbours.astype(float)
+    diag = np.where(mask, diag, 0.0)
+    inv_diag = np.divide(1.0, diag, out=np.zeros_like(diag), where=diag > 0)
+    # The V-cycle only preconditions CG, so it runs in single precision
+    diag = diag.astype(np.float32)
+    ii, jj = np.indices(mask.shape)
+    level = {'mask': mask, 'diag': diag}
+    # Gauss-Seidel update of one colour: u <- u * keep + (b + Σ neighbours) * weight
+    for color, parity in (('red', 0), ('black', 1)):
+        selected = mask & ((ii + jj) % 2 == parity)
+        level[color + '_weight'] = np.where(selected, inv_diag, 0).astype(np.float32)
+        level[color + '_keep'] = (~selected).astype(np.float32)
+    return level
+
+
+def _build_levels(mask, dirichlet, min_size=8):
+    levels = [_make_level(mask, dirichlet)]
+    while min(mask.shape) > min_size:
+        ny, nx = mask.shape
+        padded = np.pad(mask, ((0, ny % 2), (0, nx % 2)), constant_values=False)
+        mask = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).any(axis=(1, 3))
+        levels.append(_make_level(mask, dirichlet))
+    return levels
+
+
+def _neighbour_sum(padded, out):
+    """Sum of the 4 neighbours of the interior of a zero-bordered array, written to out"""
+    np.add(padded[:-2, 1:-1], padded[2:, 1:-1], out=out)
+    out += padded[1:-1, :-2]
+    out += padded[1:-1, 2:]
+    return out
+
+
+def _apply(level, u):
+    padded = np.pad(u, 1)
+    out = _neighbour_sum(padded, np.empty_like(u))
+    np.subtract(level['diag'] * u, out, out=out)
+    out[~level['mask']] = 0
+    return out
+
+
+def _smooth(level, u, b, sweeps, reverse=False):
+    """Red-black Gauss-Seidel sweeps, updated in place inside one padded buffer"""
+    colors = ('black', 'red') if reverse else ('red', 'black')
+    padded = np.pad(u, 1)
+    inner = padded[1:-1, 1:-1]
+    update = np.empty_like(u)
+    for _ in range(sweeps):
+        for color in colors:
+            _neighbour_sum(padded, update)
+            update += b
+            update *= level[color + '_weight']
+            inner *= level[color + '_keep']
+            inner += update
+    return inner
+
+
+def _restrict(r, coarse_shape):
+    ny, nx = r.shape
+    padded = np.pad(r, ((0, ny % 2), (0, nx % 2)))
+    return padded.reshape(coarse_shape[0], 2, coarse_shape[1], 2).sum(axis=(1, 3))
+
+
+def _prolong(e, fine_level):
+    fine = np.repeat(np.repeat(e, 2, axis=0), 2, axis=1)
+    ny, nx = fine_level['mask'].shape
+    return np.where(fine_level['mask'], fine[:ny, :nx], 0.0)
+
+
+def _vcycle(levels, k, b, sweeps=2):
+    """Symmetric V-cycle approximating A^-1 b on level k (usable as a CG preconditioner)"""
+    level = levels[k]
+    u = np.zeros_like(b)
+    if k == len(levels) - 1:
+        return _smooth(level, _smooth(level, u, b, 25), b, 25, reverse=True)
+    u = _smooth(level, u, b, sweeps)
+    r = b - _apply(level, u)
+    coarse = levels[k + 1]
+    e = _vcycle(levels, k + 1, np.where(coarse['mask'], _restrict(r, coarse['mask'].shape), 0.0), sweeps)
+    u = u + _prolong(e, level)
+    return _smooth(level, u, b, sweeps, reverse=True)
+
+
+def integrate_gradient_masked(gx, gy, mask, dx=1.0, dy=1.0, boundary='neumann',
+                              boundary_value=0.0, tol=1e-8, max_iter=100):
+    """Integrate a gradient field over the True cells of mask with MG-preconditioned CG
+
+    Gradient samples outside the mask are ignored.  Returns ρ with NaN outside
+    the mask.  tol is the relative residual at which CG stops.
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError(f"Unknown boundary '{boundary}', use one of {BOUNDARIES}")
+    mask = np.asarray(mask, dtype=bool)
+    gx = np.where(mask, np.asarray(gx, dtype=float), 0.0)
+    gy = np.where(mask, np.asarray(gy, dtype=float), 0.0)
+    dirichlet = boundary == 'dirichlet'
+    b = _rhs(gx, gy, dx, dy, mask=mask, dirichlet=dirichlet)
+    levels = _build_levels(mask, dirichlet)
+
+    if dirichlet:
+        project = lambda v: v
+    else:
+        # Neumann: the system is singular on every connected region; keep all
+        # vectors orthogonal to the per-region constants
+        labels, n_regions = ndimage.label(mask)
+        if n_regions == 1:
+            count = mask.sum()
+
+            def project(v):
+                v = v - v[mask].sum() / count
+                v[~mask] = 0.0
+                return v
+        else:
+            labels_flat = labels.ravel()
+            counts = np.maximum(np.bincount(labels_flat, minlength=n_regions + 1), 1)
+
+            def project(v):
+                means = np.bincount(labels_flat, weights=v.ravel(), minlength=n_regions + 1) / counts
+                means[0] = 0.0
+                v = v - means[labels]
+                v[~mask] = 0.0
+                return v
+
+    b = project(b)
+    b_norm = np.linalg.norm(b)
+    u = np.zeros_like(b)
+    if b_norm == 0:
+        return np.where(mask, boundary_value, np.nan)
+
+    r = b.copy()
+    z = project(_vcycle(levels, 0, r.astype(np.float32)).astype(float))
+    p = z.copy()
+    rz = np.vdot(r, z)
+    for _ in range(max_iter):
+        Ap = _apply(levels[0], p).astype(float)
+        alpha = rz / np.vdot(p, Ap)
+        u += alpha * p
+        r -= alpha * Ap
+        if np.linalg.norm(r) < tol * b_norm:
+            break
+        z = project(_vcycle(levels, 0, r.astype(np.float32)).astype(float))
+        rz_new = np.vdot(r, z)
+        p = z + (rz_new / rz) * p
+        rz = rz_new
+    return np.where(mask, u + boundary_value, np.nan)
+
+
+if __name__ == '__main__':
+    import time
+
+    # Gaussian density disturbance on a megapixel grid, as a BOS reconstruction would see it
+    ny = nx = 1024
+    y, x = np.mgrid[0:ny, 0:nx] * 0.01  # 10 µm pixels, in mm
+    rho_true = 1.2 - 0.05 * np.exp(-((x - 5)**2 + (y - 5)**2) / 2)
+    gy, gx = np.gradient(rho_true, 0.01)
+    gx += np.random.default_rng(0).normal(0, 1e-3, gx.shape)
+
+    start = time.perf_counter()
+    rho = integrate_gradient(gx, gy, 0.01, 0.01, boundary='dirichlet', boundary_value=1.2)
+    print(f'DCT/DST solver: {time.perf_counter() - start:.3f} s, '
+          f'max error {np.abs(rho - rho_true).max():.2e} kg/m³')
+
+    mask = (x - 5)**2 + (y - 5)**2 < 4.5**2
+    start = time.perf_counter()
+    rho_m = integrate_gradient_masked(gx, gy, mask, 0.01, 0.01, boundary='neumann',
+                                      boundary_value=rho_true[mask].mean(), tol=1e-6)
+    print(f'Multigrid solver (masked disc): {time.perf_counter() - start:.3f} s, '
+          f'max error {np.nanmax(np.abs(rho_m - rho_true)):.2e} kg/m³')
@@ -0,0 +1,358 @@
+"""Streaming pycnocline detectability for large collections of ocean profiles.
+
+Scales create_figure7_revised_for_detects() (figures2.py) from one synthetic
+profile to Argo-sized collections.  Profile files are read chunk by chunk,
+every profile is interpolated onto a common depth grid, and for each chunk
+the pipeline computes
+
+  * in-situ density (EOS-80, seawater_eos.density) and refractive index,
+  * |∂n/∂z| on the depth grid, and
+  * one detection mask per schlieren model (|∂n/∂z| >= threshold),
+
+and writes them to <out>/chunk_NNNNNN.npz, plus one row per profile in
+<out>/summary.csv (strongest gradient, and detected layer thickness and top
+depth per model).  Chunks are processed by a process pool with a bounded
+number of chunks in flight, so memory use does not depend on the collection
+size.
+
+Input formats (by extension):
+  .csv / .csv.gz   long format, one row per level (pandas, read in chunks)
+  .parquet         long format (pyarrow, read in record batches)
+  .nc              Argo profile files with (N_PROF, N_LEVELS) variables (netCDF4)
+Long-format rows must be grouped by profile.  Column / variable names are
+configurable; the defaults follow Argo (PRES in dbar, TEMP in °C, PSAL).
+
+    python profile_pipeline.py --make-sample samples/
+    python profile_pipeline.py samples/ -o results/ -j 4
+"""
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import seawater_eos
+
+# |∂n/∂z| thresholds (m^-1) of the schlieren vision models, as in figures2
+DETECTION_THRESHOLDS = {'amphibian': 1.0e-5, 'bird': 3.0e-5, 'insect': 8.0e-5}
+
+DEFAULT_DEPTH_GRID = np.linspace(0.0, 2000.0, 1001)
+
+DEFAULT_COLUMNS = {'profile': 'profile_id', 'latitude': 'LATITUDE', 'pressure': 'PRES',
+                   'temperature': 'TEMP', 'salinity': 'PSAL'}
+
+FORMATS = {'.csv': 'csv', '.gz': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.nc': 'netcdf'}
+
+
+def pressure_to_depth(p, latitude):
+    """Depth (m) from sea pressure (dbar), UNESCO 1983 (Saunders & Fofonoff)"""
+    x = np.sin(np.radians(latitude))**2
+    g = 9.780318 * (1.0 + (5.2788e-3 + 2.36e-5 * x) * x) + 1.092e-6 * p
+    return ((((-1.82e-15 * p + 2.279e-10) * p - 2.2512e-5) * p + 9.72659) * p) / g
+
+
+# --- Readers: each yields chunks as dicts of numpy arrays ---
+
+def _iter_long(batches, columns):
+    """Regroup row batches so that no profile is split across two chunks"""
+    carry = None
+    for batch in batches:
+        if carry is not None:
+            batch = {k: np.concatenate([carry[k], batch[k]]) for k in batch}
+        ids = batch['profile']
+        if len(ids) == 0:
+            continue
+        # Rows of the last profile may continue in the next batch
+        last_start = len(ids) - np.argmax(ids[::-1] != ids[-1]) if np.any(ids != ids[-1]) else 0
+        carry = {k: v[last_start:] for k, v in batch.items()}
+        if last_start:
+            yield {k: v[:last_start] for k, v in batch.items()}
+    if carry is not None and len(carry['profile']):
+        yield carry
+
+
+def read_csv_chunks(path, rows_per_chunk=1_000_000, columns=DEFAULT_COLUMNS):
+    import pandas as pd
+    names = {v: k for k, v in columns.items()}
+    reader = pd.read_csv(path, usecols=list(columns.values()), chunksize=rows_per_chunk)
+    batches = ({names[c]: frame[c].to_numpy() for c in frame.columns} for frame in reader)
+    yield from _iter_long(batches, columns)
+
+
+def read_parquet_chunks(path, rows_per_chunk=1_000_000, columns=DEFAULT_COLUMNS):
+    import pyarrow.parquet as pq
+    names = {v: k for k, v in columns.items()}
+    batches = ({names[c]: batch.column(c).to_numpy(zero_copy_only=False) for c in batch.schema.names}
+               for batch in pq.ParquetFile(path).iter_batches(rows_per_chunk, columns=list(columns.values())))
+    yield from _iter_long(batches, columns)
+
+
+def read_netcdf_chunks(path, profiles_per_chunk=2000, columns=DEFAULT_COLUMNS):
+    import netCDF4
+    with netCDF4.Dataset(path) as ds:
+        n_prof = ds.dimensions['N_PROF'].size
+        base = os.path.basename(path)
+        for lo in range(0, n_prof, profiles_per_chunk):
+            hi = min(lo + profiles_per_chunk, n_prof)
+            chunk = {key: np.ma.filled(ds.variables[columns[key]][lo:hi].astype(float), np.nan)
+                     for key in ('latitude', 'pressure', 'temperature', 'salinity')}
+            chunk['profile'] = np.array([f'{base}:{i}' for i in range(lo, hi)])
+            yield chunk
+
+
+READERS = {'csv': read_csv_chunks, 'parquet': read_parquet_chunks, 'netcdf': read_netcdf_chunks}
+
+
+def iter_chunks(paths, rows_per_chunk=1_000_000, profiles_per_chunk=2000, columns=DEFAULT_COLUMNS):
+    """Chunks from every supported file in paths (files or directories)"""
+    for path in expand_paths(paths):
+        fmt = FORMATS[os.path.splitext(path)[1].lower()]
+        size = profiles_per_chunk if fmt == 'netcdf' else rows_per_chunk
+        yield from READERS[fmt](path, size, columns)
+
+
+def expand_paths(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(p for p in glob.glob(os.path.join(path, '*'))
+                            if os.path.splitext(p)[1].lower() in FORMATS)
+        else:
+            files.append(path)
+    return files
+
+
+# --- Per-chunk processing ---
+
+def _long_to_padded(chunk):
+    """Long-format rows (grouped by profile) -> (profiles, levels) arrays padded with NaN"""
+    ids = chunk['profile']
+    new = np.r_[True, ids[1:] != ids[:-1]]
+    starts = np.flatnonzero(new)
+    codes = np.cumsum(new) - 1
+    level = np.arange(len(ids)) - starts[codes]
+    shape = (len(starts), level.max() + 1)
+    padded = {'profile': ids[starts], 'latitude': np.asarray(chunk['latitude'], dtype=float)[starts]}
+    for key in ('pressure', 'temperature', 'salinity'):
+        values = np.full(shape, np.nan)
+        values[codes, level] = chunk[key]
+        padded[key] = values
+    return padded
+
+
+def interpolate_profiles(depth, values, grid, max_gap=None):
+    """Linearly interpolate many ragged profiles onto a common depth grid at once
+
+    depth: (m, L) sample depths, NaN for missing levels; values: list of
+    (m, L) arrays.  A level is used only if depth and all values are finite.
+    Grid points outside a profile's depth range, or inside a gap larger than
+    max_gap metres, are NaN.  Returns a list of (m, len(grid)) arrays.
+    """
+    if depth.shape[1] < 2:
+        # Keep room for a bracketing pair in every row
+        depth, *values = (np.pad(a, ((0, 0), (0, 1)), constant_values=np.nan) for a in [depth] + values)
+    m, n_levels = depth.shape
+    valid = np.isfinite(depth)
+    for v in values:
+        valid &= np.isfinite(v)
+    n_valid = valid.sum(axis=1)
+
+    # Sort each profile by depth with missing levels at the end
+    key = np.where(valid, depth, np.inf)
+    order = np.argsort(key, axis=1, kind='stable')
+    d = np.take_along_axis(key, order, axis=1)
+    values = [np.take_along_axis(v, order, axis=1) for v in values]
+
+    # One global searchsorted: offset every row so the flattened depths stay sorted
+    width = max(np.max(np.where(np.isfinite(d), d, 0.0)), grid[-1]) + 2.0
+    rows = np.arange(m)[:, None]
+    d_flat = (np.where(np.isfinite(d), d, width - 1.0) + rows * width).ravel()
+    j = np.searchsorted(d_flat, (grid[None, :] + rows * width).ravel(), side='right')
+    j = j.reshape(m, len(grid)) - rows * n_levels
+    j = np.clip(j, 1, np.maximum(n_valid - 1, 1)[:, None])
+
+    # Flat indices of the bracketing samples, shared by all value arrays
+    hi_idx = (j + rows * n_levels).ravel()
+    lo_idx = hi_idx - 1
+    d_flat = d.ravel()
+    d_lo = d_flat[lo_idx].reshape(j.shape)
+    with np.errstate(invalid='ignore'):  # rows with < 2 levels give inf - inf, masked below
+        span = d_flat[hi_idx].reshape(j.shape) - d_lo
+    w = np.divide(grid[None, :] - d_lo, span, out=np.zeros_like(span), where=span > 0)
+    last = np.take_along_axis(d, np.maximum(n_valid - 1, 0)[:, None], axis=1)
+    outside = (grid[None, :] < d[:, :1]) | (grid[None, :] > last) | (n_valid < 2)[:, None]
+    if max_gap is not None:
+        outside |= span > max_gap
+
+    result = []
+    for v in values:
+        v_flat = v.ravel()
+        v_lo = v_flat[lo_idx].reshape(j.shape)
+        with np.errstate(invalid='ignore'):
+            out = v_lo + w * (v_flat[hi_idx].reshape(j.shape) - v_lo)
+        out[outside] = np.nan
+        result.append(out)
+    return result
+
+
+def _first_true_depth(mask, grid):
+    first = np.argmax(mask, axis=-1)
+    return np.where(mask.any(axis=-1), grid[first], np.nan)
+
+
+def process_chunk(chunk, index, out_dir, depth_grid=DEFAULT_DEPTH_GRID,
+                  thresholds=DETECTION_THRESHOLDS, max_gap=None):
+    """Grid, derive and threshold one chunk; writes its .npz and returns the summary columns"""
+    if np.ndim(chunk['pressure']) == 1:
+        chunk = _long_to_padded(chunk)
+    depth = pressure_to_depth(chunk['pressure'], chunk['latitude'][:, None])
+    T, S, P = interpolate_profiles(depth, [chunk['temperature'], chunk['salinity'], chunk['pressure']],
+                                   depth_grid, max_gap)
+
+    rho = seawater_eos.density(S, T, P)
+    n = seawater_eos.refractive_index(S, T)
+    dn_dz = np.abs(np.gradient(n, depth_grid, axis=1))
+    models = list(thresholds)
+    masks = np.stack([dn_dz >= thresholds[m] for m in models], axis=1)
+
+    np.savez(os.path.join(out_dir, f'chunk_{index:06d}.npz'),
+             profile_id=np.asarray(chunk['profile']).astype(str), latitude=chunk['latitude'],
+             depth=depth_grid, temperature=T.astype(np.float32), salinity=S.astype(np.float32),
+             density=rho.astype(np.float32), refractive_index=n, dn_dz=dn_dz.astype(np.float32),
+             detected=masks, models=np.array(models))
+
+    filled = np.where(np.isfinite(dn_dz), dn_dz, -np.inf)
+    peak = filled.argmax(axis=1)
+    has_data = np.isfinite(dn_dz).any(axis=1)
+    cell = np.gradient(depth_grid)
+    summary = {
+        'profile_id': np.asarray(chunk['profile']).astype(str),
+        'chunk': np.full(len(peak), index),
+        'latitude': chunk['latitude'],
+        'max_depth_m': np.where(has_data, depth_grid[-1 - np.isfinite(T)[:, ::-1].argmax(axis=1)], np.nan),
+        'max_dn_dz': np.where(has_data, filled.max(axis=1), np.nan),
+        'depth_of_max_m': np.where(has_data, depth_grid[peak], np.nan),
+    }
+    for k, model in enumerate(models):
+        summary[f'{model}_thickness_m'] = (masks[:, k] * cell).sum(axis=1)
+        summary[f'{model}_top_m'] = _first_true_depth(masks[:, k], depth_grid)
+    return summary
+
+
+def run_pipeline(paths, out_dir, workers=None, depth_grid=DEFAULT_DEPTH_GRID,
+                 thresholds=DETECTION_THRESHOLDS, max_gap=None, rows_per_chunk=1_000_000,
+                 profiles_per_chunk=2000, columns=DEFAULT_COLUMNS, max_in_flight=None):
+    """Process every profile in paths; returns (n_profiles, n_chunks)"""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    chunks = iter_chunks(paths, rows_per_chunk, profiles_per_chunk, columns)
+    args = (out_dir, depth_grid, thresholds, max_gap)
+    n_profiles = n_chunks = 0
+
+    with open(os.path.join(out_dir, 'summary.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+
+        def write(summary):
+            nonlocal n_profiles, n_chunks
+            if n_chunks == 0:
+                writer.writerow(summary)
+            writer.writerows(zip(*summary.values()))
+            n_profiles += len(summary['profile_id'])
+            n_chunks += 1
+
+        if workers == 1:
+            for index, chunk in enumerate(chunks):
+                write(process_chunk(chunk, index, *args))
+            return n_profiles, n_chunks
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for index, chunk in enumerate(chunks):
+                # Reading stays at most max_in_flight chunks ahead of the workers
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(future.result())
+                pending.add(pool.submit(process_chunk, chunk, index, *args))
+            for future in wait(pending)[0]:
+                write(future.result())
+    return n_profiles, n_chunks
+
+
+def make_sample_collection(directory, n_files=4, profiles_per_file=2500, fmt='csv', seed=0):
+    """Write synthetic Argo-like profiles (irregular levels, random pycnoclines)"""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for k in range(n_files):
+        n_levels = rng.integers(80, 400, profiles_per_file)
+        prof = np.repeat(np.arange(profiles_per_file), n_levels)
+        level = np.arange(len(prof)) - np.repeat(np.cumsum(n_levels) - n_levels, n_levels)
+        depth_max = rng.uniform(500, 2000, profiles_per_file)[prof]
+        # Jittered levels, denser near the surface and increasing within each profile
+        p = depth_max * ((level + rng.uniform(0, 1, len(prof))) / n_levels[prof])**1.5
+
+        # Sharp thermo-/haloclines as in figures2, with random position and strength
+        t_mid, t_width = rng.uniform(30, 150, profiles_per_file), rng.uniform(3, 40, profiles_per_file)
+        s_mid, s_width = rng.uniform(40, 200, profiles_per_file), rng.uniform(5, 60, profiles_per_file)
+        t_top, t_deep = rng.uniform(10, 30, profiles_per_file), rng.uniform(2, 6, profiles_per_file)
+        s_top, s_deep = rng.uniform(33, 35, profiles_per_file), rng.uniform(34.5, 35.8, profiles_per_file)
+        i = prof
+        # 1 / (1 + exp(x)) written with tanh, which cannot overflow
+        temp = t_deep[i] + (t_top[i] - t_deep[i]) * 0.5 * (1 - np.tanh((p - t_mid[i]) / (t_width[i] / 2)))
+        sal = s_top[i] + (s_deep[i] - s_top[i]) * 0.5 * (1 + np.tanh((p - s_mid[i]) / (s_width[i] / 2)))
+        data = {'profile_id': np.char.add(f'f{k}_', prof.astype(str)),
+                'LATITUDE': rng.uniform(-60, 60, profiles_per_file)[prof],
+                'PRES': p.round(1), 'TEMP': (temp + rng.normal(0, 0.002, len(p))).round(3),
+                'PSAL': (sal + rng.normal(0, 0.002, len(p))).round(3)}
+
+        import pandas as pd
+        frame = pd.DataFrame(data)
+        path = os.path.join(directory, f'profiles_{k:03d}.{fmt}')
+        if fmt == 'csv':
+            frame.to_csv(path, index=False)
+        elif fmt == 'parquet':
+            frame.to_parquet(path, index=False)
+        else:
+            raise ValueError(f"Unsupported sample format '{fmt}', use 'csv' or 'parquet'")
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('inputs', nargs='*', help='profile files or directories')
+    parser.add_argument('-o', '--out-dir', default='profile_results')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--max-depth', type=float, default=2000.0, help='depth grid extent (m)')
+    parser.add_argument('--dz', type=float, default=2.0, help='depth grid spacing (m)')
+    parser.add_argument('--max-gap', type=float, default=None,
+                        help='leave gaps between samples larger than this (m) empty')
+    parser.add_argument('--rows-per-chunk', type=int, default=1_000_000)
+    parser.add_argument('--make-sample', metavar='DIR',
+                        help='write a synthetic sample collection to DIR and exit')
+    args = parser.parse_args(argv)
+
+    if args.make_sample:
+        paths = make_sample_collection(args.make_sample)
+        print(f'Wrote {len(paths)} sample files to {args.make_sample}')
+        return
+    if not args.inputs:
+        parser.error('no input files or directories given')
+
+    grid = np.arange(0.0, args.max_depth + args.dz / 2, args.dz)
+    start = time.perf_counter()
+    n_profiles, n_chunks = run_pipeline(args.inputs, args.out_dir, args.workers, grid,
+                                        max_gap=args.max_gap, rows_per_chunk=args.rows_per_chunk)
+    elapsed = time.perf_counter() - start
+    print(f'{n_profiles} profiles in {n_chunks} chunks in {elapsed:.1f} s '
+          f'({n_profiles / max(elapsed, 1e-9):.0f} profiles/s) -> {args.out_dir}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Rainbow (colour) schlieren: deflection angle <-> colour through a filter.
+
+The rainbow filter of research.create_rainbow_schlieren() sits in the focal
+plane of the second lens, where a ray deflected by (ε_x, ε_y) lands at
+(u, v) = f·(ε_x, ε_y).  The colour it passes encodes that position:
+
+* 'radial' filter: hue = direction of (u, v), saturation = |(u, v)| / radius
+  (saturates at the filter radius) - both deflection components are encoded.
+* 'stripe' filter: hue varies linearly across the filter along `orientation`
+  (a continuous version of the R-G-B strips in the figure) - only the
+  component along that direction is encoded.
+
+Decoding uses a lookup table indexed by the quantized RGB value, built once
+per filter by inverting its colour map, so a whole frame (or a stack of
+video frames) decodes with a single gather.
+"""
+import numpy as np
+from matplotlib.colors import hsv_to_rgb, rgb_to_hsv
+
+FILTER_KINDS = ('radial', 'stripe')
+
+
+def make_filter(kind='radial', radius=1e-3, orientation=0.0, hue_span=0.8):
+    """Rainbow filter description; radius (m) is the filter half-width in the focal plane
+
+    hue_span limits the stripe filter's hue range so that both ends stay distinct.
+    """
+    if kind not in FILTER_KINDS:
+        raise ValueError(f"Unknown filter kind '{kind}', use one of {FILTER_KINDS}")
+    return {'kind': kind, 'radius': radius, 'orientation': orientation, 'hue_span': hue_span}
+
+
+def filter_color(filt, u, v):
+    """RGB (..., 3) in [0, 1] transmitted at focal-plane position (u, v)"""
+    u, v = np.broadcast_arrays(np.asarray(u, dtype=float), np.asarray(v, dtype=float))
+    hsv = np.empty(u.shape + (3,))
+    if filt['kind'] == 'radial':
+        hsv[..., 0] = (np.arctan2(v, u) - filt['orientation']) / (2 * np.pi) % 1.0
+        hsv[..., 1] = np.clip(np.hypot(u, v) / filt['radius'], 0.0, 1.0)
+    else:
+        along = u * np.cos(filt['orientation']) + v * np.sin(filt['orientation'])
+        hsv[..., 0] = filt['hue_span'] * np.clip(0.5 + along / (2 * filt['radius']), 0.0, 1.0)
+        hsv[..., 1] = 1.0
+    hsv[..., 2] = 1.0
+    return hsv_to_rgb(hsv)
+
+
+def encode_deflection(eps_x, eps_y, focal_length, filt):
+    """Colour recorded for deflection angles (ε_x, ε_y) in radians; returns (..., 3)"""
+    return filter_color(filt, focal_length * np.asarray(eps_x), focal_length * np.asarray(eps_y))
+
+
+def build_decode_lut(filt, focal_length, bits=7, min_saturation=0.5):
+    """Lookup table mapping quantized RGB -> (ε_x, ε_y)
+
+    The table has shape (2**bits,)*3 + (2,), float32.  Hue and saturation do
+    not depend on brightness, so every table entry is the filter position with
+    the hue/saturation of that RGB bin.  A stripe filter only measures the
+    deflection along its normal, so it decodes to the projection of (ε_x, ε_y)
+    on that direction; colours it cannot produce (saturation below
+    min_saturation, hue outside its span) map to NaN.
+    """
+    levels = 2**bits
+    centers = (np.arange(levels, dtype=np.float32) + 0.5) / levels
+    r, g, b = np.meshgrid(centers, centers, centers, indexing='ij')
+    hsv = rgb_to_hsv(np.stack([r, g, b], axis=-1))
+    hue, sat = hsv[..., 0], hsv[..., 1]
+
+    theta = filt['orientation']
+    if filt['kind'] == 'radial':
+        direction = 2 * np.pi * hue + theta
+        along = sat * filt['radius']
+        eps = np.stack([along * np.cos(direction), along * np.sin(direction)], axis=-1)
+    else:
+        along = (hue / filt['hue_span'] - 0.5) * 2 * filt['radius']
+        eps = np.stack([along * np.cos(theta), along * np.sin(theta)], axis=-1)
+        half_bin = 0.5 / levels
+        invalid = (sat < min_saturation) | (hue > filt['hue_span'] + half_bin)
+        eps[invalid] = np.nan
+    return (eps / focal_length).astype(np.float32)
+
+
+def decode_colors(rgb, lut, normalize_brightness=False):
+    """Decode colour images (..., 3) back to deflection angles (ε_x, ε_y)
+
+    rgb may be uint8 (0-255) or float (0-1).  The lookup is already
+    independent of brightness; normalize_brightness rescales each colour so
+    its brightest channel is 1 first, which keeps the full table resolution
+    for dark (underexposed) pixels at some extra cost.
+    """
+    levels = lut.shape[0]
+    bits = int(np.log2(levels))
+    rgb = np.asarray(rgb)
+    if rgb.dtype == np.uint8 and not normalize_brightness:
+        q = rgb >> np.uint8(8 - bits)
+    else:
+        scale = 1 / 255 if rgb.dtype == np.uint8 else 1.0
+        rgb = rgb.astype(np.float32) * np.float32(scale)
+        if normalize_brightness:
+            rgb /= np.maximum(rgb.max(axis=-1, keepdims=True), 1e-6)
+        q = np.minimum(rgb * levels, levels - 1).astype(np.uint8)
+    # One flat index per pixel, one gather for the whole stack
+    flat = q[..., 0].astype(np.int32) << (2 * bits)
+    flat |= q[..., 1].astype(np.int32) << bits
+    flat |= q[..., 2]
+    eps = np.take(lut.reshape(-1, 2), flat, axis=0)
+    return eps[..., 0], eps[..., 1]
+
+
+if __name__ == '__main__':
+    import time
+
+    # A short 1080p "video" of a swirling deflection field through a radial filter
+    focal_length = 0.5
+    filt = make_filter('radial', radius=2e-3)
+    start = time.perf_counter()
+    lut = build_decode_lut(filt, focal_length)
+    print(f'LUT {lut.shape[:3]} built in {time.perf_counter() - start:.2f} s')
+
+    yy, xx = np.mgrid[-1:1:1080j, -1.8:1.8:1920j]
+    frames = []
+    for t in range(8):
+        phase = 0.3 * t
+        eps_x = 3e-3 * np.sin(2 * xx + phase) * np.exp(-yy**2)
+        eps_y = 3e-3 * np.cos(3 * yy - phase) * np.exp(-xx**2 / 2)
+        frames.append((eps_x, eps_y))
+    true_x = np.stack([f[0] for f in frames])
+    true_y = np.stack([f[1] for f in frames])
+    video = (encode_deflection(true_x, true_y, focal_length, filt) * 255).round().astype(np.uint8)
+
+    start = time.perf_counter()
+    dec_x, dec_y = decode_colors(video, lut)
+    elapsed = time.perf_counter() - start
+    err = np.hypot(dec_x - true_x, dec_y - true_y)
+    print(f'decoded {video.shape[0]} frames of {video.shape[1:3]} in {elapsed:.2f} s '
+          f'({video.shape[0] / elapsed:.1f} fps); median error {np.nanmedian(err):.1e} rad '
+          f'of {np.hypot(true_x, true_y).max():.1e} rad max deflection')
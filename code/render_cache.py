@@ -0,0 +1,154 @@
+"""Content-addressed cache for rendered figures.
+
+A figure is identified by a hash of
+  * the source of its create_* function, the module-level helpers it calls
+    and the module's top-level statements (imports, constants, style block),
+  * the full source of any sibling module in code/ that the figure module
+    imports, directly or through other sibling modules,
+  * the parameters it is rendered with (savefig options, call arguments),
+  * the active matplotlib rcParams, and
+  * the Python / numpy / matplotlib / scipy versions.
+On a hit the stored file is copied to the output path instead of redrawing.
+"""
+import ast
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from importlib import metadata
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(CODE_DIR, '.figure_cache')
+
+VERSIONED_PACKAGES = ('numpy', 'matplotlib', 'scipy')
+
+# rcParams that do not change the rendered output
+_RC_IGNORED = {'backend', 'backend_fallback', 'interactive', 'webagg.port', 'webagg.address',
+               'webagg.port_retries', 'webagg.open_in_browser', 'figure.max_open_warning'}
+
+
+def _is_main_guard(node):
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__')
+
+
+def _local_imports(node):
+    """Names of sibling modules in code/ imported by an import statement"""
+    if isinstance(node, ast.Import):
+        names = [alias.name for alias in node.names]
+    elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+        names = [node.module]
+    else:
+        return []
+    return [n for n in names if os.path.exists(os.path.join(CODE_DIR, n + '.py'))]
+
+
+def _sibling_closure(modules):
+    """The given sibling modules plus every sibling module they import, transitively"""
+    pending, seen = list(modules), set()
+    while pending:
+        module = pending.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        with open(os.path.join(CODE_DIR, module + '.py'), encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            pending.extend(_local_imports(node))
+    return seen
+
+
+def source_signature(module_path, func_name):
+    """Hash of everything in the module source that can affect func_name's output"""
+    with open(module_path, encoding='utf-8') as f:
+        source = f.read()
+    tree = ast.parse(source)
+    defs = {node.name: node for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef))}
+    if func_name not in defs:
+        raise KeyError(f'{func_name} is not defined in {module_path}')
+
+    digest = hashlib.sha256()
+    local_modules = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) or _is_main_guard(node):
+            continue
+        local_modules.update(_local_imports(node))
+        digest.update(ast.get_source_segment(source, node).encode())
+
+    # The function itself plus every module-level def it (transitively) references
+    pending, seen = [func_name], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        node = defs[name]
+        digest.update(ast.get_source_segment(source, node).encode())
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and child.id in defs:
+                pending.append(child.id)
+            local_modules.update(_local_imports(child))
+
+    for module in sorted(_sibling_closure(local_modules)):
+        with open(os.path.join(CODE_DIR, module + '.py'), 'rb') as f:
+            digest.update(module.encode() + f.read())
+    return digest.hexdigest()
+
+
+def rc_fingerprint():
+    """Stable text form of the output-relevant matplotlib rcParams"""
+    import matplotlib
+    return repr(sorted((k, repr(v)) for k, v in matplotlib.rcParams.items() if k not in _RC_IGNORED))
+
+
+def library_versions():
+    versions = {'python': sys.version.split()[0]}
+    for package in VERSIONED_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def cache_key(module_path, func_name, params=None):
+    """Content hash identifying one rendering of func_name with the given parameters"""
+    payload = {
+        'source': source_signature(module_path, func_name),
+        'params': params or {},
+        'rc': hashlib.sha256(rc_fingerprint().encode()).hexdigest(),
+        'versions': library_versions(),
+    }
+    text = json.dumps(payload, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def cache_path(key, ext, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, key[:2], key + ext)
+
+
+def fetch(key, ext, out_path, cache_dir=DEFAULT_CACHE_DIR):
+    """Copy a cached artifact to out_path; returns False on a cache miss"""
+    stored = cache_path(key, ext, cache_dir)
+    if not os.path.exists(stored):
+        return False
+    shutil.copyfile(stored, out_path)
+    return True
+
+
+def store(key, ext, artifact_path, cache_dir=DEFAULT_CACHE_DIR):
+    """Add a rendered file to the cache (atomically, so parallel workers can share it)"""
+    stored = cache_path(key, ext, cache_dir)
+    os.makedirs(os.path.dirname(stored), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(stored), suffix=ext)
+    os.close(fd)
+    shutil.copyfile(artifact_path, tmp)
+    os.replace(tmp, stored)
+    return stored
+
+
+def clear(cache_dir=DEFAULT_CACHE_DIR):
+    shutil.rmtree(cache_dir, ignore_errors=True)
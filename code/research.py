@@ -6,23 +6,26 @@ from matplotlib.colors import LinearSegmentedColormap
 import matplotlib.lines as mlines
 
 # Set up the plotting style for professional scientific figures
-plt.rcParams.update({
-    'font.size': 10,
-    'font.family': 'DejaVu Sans',
-    'axes.linewidth': 1.2,
-    'lines.linewidth': 1.5,
-    'axes.labelsize': 11,
-    'axes.titlesize': 12,
-    'legend.fontsize': 9,
-    'xtick.labelsize': 9,
-    'ytick.labelsize': 9,
-    'figure.dpi': 150,
-    'savefig.dpi': 300,
-    'savefig.bbox': 'tight'
-})
+def _set_style():
+    """Apply the figure style (called by the create_* functions, not at import)"""
+    plt.rcParams.update({
+        'font.size': 10,
+        'font.family': 'DejaVu Sans',
+        'axes.linewidth': 1.2,
+        'lines.linewidth': 1.5,
+        'axes.labelsize': 11,
+        'axes.titlesize': 12,
+        'legend.fontsize': 9,
+        'xtick.labelsize': 9,
+        'ytick.labelsize': 9,
+        'figure.dpi': 150,
+        'savefig.dpi': 300,
+        'savefig.bbox': 'tight'
+    })
 
 def create_light_deflection_principle():
     """Create Figure 1: Fundamental Principle of Light Deflection"""
+    _set_style()
     fig, ax = plt.subplots(1, 1, figsize=(12, 8))
     
     # Define y positions for the three scenarios
@@ -88,6 +91,7 @@ def create_light_deflection_principle():
 
 def create_classical_schlieren():
     """Create Figure 2: Classical (Toepler) Schlieren System"""
+    _set_style()
     fig, ax = plt.subplots(1, 1, figsize=(14, 8))
     
     # Component positions
@@ -172,6 +176,7 @@ def create_classical_schlieren():
 
 def create_rainbow_schlieren():
     """Create Figure 3: Rainbow Schlieren System"""
+    _set_style()
     fig, ax = plt.subplots(1, 1, figsize=(14, 8))
     
     # Component positions (similar to classical)
@@ -266,6 +271,7 @@ def create_rainbow_schlieren():
 
 def create_bos_system():
     """Create Figure 4: Background Oriented Schlieren (BOS) System"""
+    _set_style()
     fig, ax = plt.subplots(1, 1, figsize=(14, 8))
     
     # Component positions
@@ -380,6 +386,7 @@ def create_bos_system():
 
 def create_comparison_table():
     """Create Figure 5: Comparison Table of Schlieren Methods"""
+    _set_style()
     fig, ax = plt.subplots(1, 1, figsize=(16, 10))
     
     # Data for comparison table
@@ -498,6 +505,7 @@ def create_all_figures():
 # Additional utility function for creating a comprehensive summary figure
 def create_schlieren_summary():
     """Create a comprehensive summary figure showing all principles"""
+    _set_style()
     fig = plt.figure(figsize=(20, 24))
     
     # Create subplots
@@ -0,0 +1,185 @@
+"""Streaming animation export for evolving schlieren scenes.
+
+render_animation() takes any iterable of refractive-index (or density)
+fields, renders each through the knife-edge model of synthetic_schlieren.py
+and streams the frames to ffmpeg (video) or to a numbered PNG sequence.
+
+The figure is built once on an Agg canvas.  Its static parts (axes,
+ticks, colorbar, title) are drawn once and saved as a background; every frame
+restores that background and redraws only the image and the time stamp
+(blitting).  Frames go straight from the canvas buffer to the encoder, so
+memory does not grow with the number of frames and nothing goes through
+pyplot's figure registry.
+
+rising_plumes() is a simple evolving scene: warm puffs released from a few
+sources rise, spread and fade while meandering sideways.
+"""
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+
+from synthetic_schlieren import schlieren_image
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov', '.avi', '.webm', '.gif')
+
+
+def rising_plumes(n_frames, shape=(256, 256), extent=0.02, n_sources=3, dt=0.02,
+                  rise_speed=0.01, release_interval=0.05, delta_n=-3e-5, seed=0):
+    """Generator of (ny, nx) refractive-index fields of puffs rising from n_sources
+
+    extent is the side length in m of the square domain; puffs are released
+    every release_interval s from each source, rise at rise_speed m/s and
+    grow and fade with age.
+    """
+    rng = np.random.default_rng(seed)
+    ny, nx = shape
+    x = np.linspace(-extent / 2, extent / 2, nx, dtype=np.float32)
+    y = np.linspace(0, extent, ny, dtype=np.float32)
+    sources = np.linspace(-extent / 3, extent / 3, n_sources)
+    lifetime = extent / rise_speed
+    # Puff state: source, birth time, meander phase and frequency
+    max_puffs = n_sources * int(np.ceil(lifetime / release_interval)) + n_sources
+    puff_x0 = np.zeros(max_puffs)
+    puff_born = np.full(max_puffs, -np.inf)
+    puff_phase = np.zeros(max_puffs)
+    puff_freq = np.zeros(max_puffs)
+    slot = 0
+    next_release = 0.0
+    for frame in range(n_frames):
+        t = frame * dt
+        while next_release <= t:
+            for x0 in sources:
+                puff_x0[slot], puff_born[slot] = x0 + rng.normal(0, extent / 200), next_release
+                puff_phase[slot], puff_freq[slot] = rng.uniform(0, 2 * np.pi), rng.uniform(2, 5)
+                slot = (slot + 1) % max_puffs
+            next_release += release_interval
+        age = t - puff_born
+        alive = (age >= 0) & (age < lifetime)
+        age, x0 = age[alive], puff_x0[alive]
+        cy = rise_speed * age
+        cx = x0 + extent / 40 * (1 + age / lifetime * 3) * np.sin(puff_freq[alive] * age + puff_phase[alive])
+        width = extent / 60 * (1 + 4 * age / lifetime)
+        strength = delta_n * (1 - age / lifetime) / (1 + 4 * age / lifetime)
+        # Separable Gaussians: (puffs, ny) x (puffs, nx)
+        gy = np.exp(-(y[None, :] - cy[:, None])**2 / (2 * width[:, None]**2)).astype(np.float32)
+        gx = np.exp(-(x[None, :] - cx[:, None])**2 / (2 * width[:, None]**2)).astype(np.float32)
+        yield 1.0003 + (gy * strength[:, None].astype(np.float32)).T @ gx
+
+
+class _FfmpegSink:
+    def __init__(self, path, size, fps, codec):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise RuntimeError('ffmpeg was not found on PATH; write a PNG sequence instead')
+        cmd = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+               '-s', f'{size[0]}x{size[1]}', '-r', str(fps), '-i', '-',
+               '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        if not path.endswith('.gif'):
+            cmd += ['-c:v', codec, '-pix_fmt', 'yuv420p']
+        self.process = subprocess.Popen(cmd + [path], stdin=subprocess.PIPE)
+
+    def write(self, rgba):
+        self.process.stdin.write(rgba.tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError(f'ffmpeg exited with status {self.process.returncode}')
+
+
+class _PngSink:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.index = 0
+        os.makedirs(os.path.dirname(pattern) or '.', exist_ok=True)
+
+    def write(self, rgba):
+        # Low compression: PNG encoding is otherwise the slowest step per frame
+        imsave(self.pattern % self.index, rgba, pil_kwargs={'compress_level': 1})
+        self.index += 1
+
+    def close(self):
+        pass
+
+
+def render_animation(fields, out, dx, dt=0.02, fps=30, figsize=(6, 5), dpi=100, cmap='gray',
+                     title='Synthetic schlieren', codec='libx264', **optics):
+    """Render a sequence of fields to a video file or PNG sequence at constant memory
+
+    fields: iterable of (ny, nx) arrays (e.g. rising_plumes()); dx is the
+    grid spacing in m and dt the time between fields in s.  out: a video path
+    (VIDEO_EXTENSIONS, encoded by ffmpeg) or a printf-style PNG pattern such as
+    'frames/frame_%05d.png'.  optics are passed to
+    synthetic_schlieren.schlieren_image() (path_length, kind, cutoff, ...).
+    Returns a dict with the number of frames, elapsed seconds and frames/s.
+    """
+    start = time.perf_counter()
+    fields = iter(fields)
+    first = next(fields)
+    ny, nx = first.shape
+    extent = [0, nx * dx * 1e3, 0, ny * dx * 1e3]
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    image = ax.imshow(schlieren_image(first, dx, **optics), extent=extent, origin='lower',
+                      cmap=cmap, vmin=0, vmax=1, animated=True)
+    stamp = ax.text(0.02, 0.96, '', transform=ax.transAxes, color='yellow', va='top', animated=True)
+    ax.set_xlabel('x (mm)')
+    ax.set_ylabel('y (mm)')
+    ax.set_title(title)
+    fig.colorbar(image, ax=ax, label='Relative intensity')
+    # Static background without the animated artists
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+
+    if out.lower().endswith(VIDEO_EXTENSIONS):
+        sink = _FfmpegSink(out, canvas.get_width_height(), fps, codec)
+    else:
+        sink = _PngSink(out)
+    n_frames = 0
+    try:
+        field = first
+        while field is not None:
+            image.set_data(schlieren_image(field, dx, **optics))
+            stamp.set_text(f't = {n_frames * dt:.2f} s')
+            canvas.restore_region(background)
+            ax.draw_artist(image)
+            ax.draw_artist(stamp)
+            sink.write(np.asarray(canvas.buffer_rgba()))
+            n_frames += 1
+            field = next(fields, None)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - start
+    return {'out': out, 'n_frames': n_frames, 'elapsed': elapsed, 'fps': n_frames / elapsed}
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    dx = 0.02 / 256
+    optics = dict(path_length=0.05, focal_length=0.5, source_size=1e-3, source='gaussian')
+    with tempfile.TemporaryDirectory() as tmp:
+        out = (os.path.join(tmp, 'plumes.mp4') if shutil.which('ffmpeg')
+               else os.path.join(tmp, 'frames', 'frame_%05d.png'))
+        result = render_animation(rising_plumes(300), out, dx, **optics)
+        print(f"{result['n_frames']} frames -> {os.path.basename(out)} in {result['elapsed']:.2f} s "
+              f"({result['fps']:.0f} frames/s)")
+
+        # Reference: a new figure per frame
+        import matplotlib.pyplot as plt
+        start = time.perf_counter()
+        for i, field in enumerate(rising_plumes(30)):
+            fig, ax = plt.subplots(figsize=(6, 5), dpi=100)
+            im = ax.imshow(schlieren_image(field, dx, **optics), origin='lower', cmap='gray', vmin=0, vmax=1)
+            fig.colorbar(im, ax=ax)
+            fig.savefig(os.path.join(tmp, f'naive_{i:05d}.png'))
+            plt.close(fig)
+        print(f'figure per frame: {30 / (time.perf_counter() - start):.0f} frames/s')
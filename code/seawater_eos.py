@@ -0,0 +1,175 @@
+"""Seawater equation of state (UNESCO EOS-80) for large ocean grids.
+
+density(S, T, p) is the full EOS-80 density with the secant bulk modulus
+pressure correction
+
+    ρ(S, T, p) = ρ(S, T, 0) / (1 - p / K(S, T, p))
+
+(S: practical salinity, T: temperature in °C, p: sea pressure in dbar;
+the polynomials take pressure in bar).  Every polynomial is evaluated with
+Horner's scheme into a handful of preallocated block buffers, and inputs are
+streamed through np.nditer in blocks, so memory use does not grow with the
+grid: a (2000, 1000, 100) grid needs the output array plus a few MB.  Scalar
+or lower-dimensional inputs broadcast without being expanded.
+
+figures2.calculate_seawater_density_ies80_simplified() is the p = 0 case (with
+a slightly different pure-water constant).
+"""
+import numpy as np
+
+# Coefficients in ascending powers of T
+RHO_W = (999.842594, 6.793952e-2, -9.095290e-3, 1.001685e-4, -1.120083e-6, 6.536332e-9)
+RHO_S = (8.24493e-1, -4.0899e-3, 7.6438e-5, -8.2467e-7, 5.3875e-9)
+RHO_S15 = (-5.72466e-3, 1.0227e-4, -1.6546e-6)
+RHO_S2 = 4.8314e-4
+
+K_W = (19652.21, 148.4206, -2.327105, 1.360477e-2, -5.155288e-5)
+K_S = (54.6746, -0.603459, 1.09987e-2, -6.1670e-5)
+K_S15 = (7.944e-2, 1.6483e-2, -5.3009e-4)
+A_W = (3.239908, 1.43713e-3, 1.16092e-4, -5.77905e-7)
+A_S = (2.2838e-3, -1.0981e-5, -1.6078e-6)
+A_S15 = 1.91075e-4
+B_W = (8.50935e-5, -6.12293e-6, 5.2787e-8)
+B_S = (-9.9348e-7, 2.0816e-8, 9.1697e-10)
+
+# Refractive index at 532 nm (linearized fit, as used in figures2)
+N_0 = 1.33374
+N_S = 1.831e-4
+N_T = -2.105e-6
+N_T2 = -3.89e-8
+
+DEFAULT_BLOCK = 1 << 18
+
+
+def _horner(t, coeffs, out):
+    """out = Σ coeffs[i] t^i, evaluated in place"""
+    out.fill(coeffs[-1])
+    for c in coeffs[-2::-1]:
+        out *= t
+        out += c
+    return out
+
+
+def _add_horner(t, coeffs, factor, acc, tmp):
+    """acc += factor * Σ coeffs[i] t^i"""
+    _horner(t, coeffs, tmp)
+    tmp *= factor
+    acc += tmp
+
+
+def _density_block(s, t, p, out, work):
+    """EOS-80 density of one 1D block, written to out; work holds scratch buffers"""
+    n = len(out)
+    sr, s15, tmp, k, coef = (work[name][:n] for name in ('sr', 's15', 'tmp', 'k', 'coef'))
+    np.sqrt(s, out=sr)
+    np.multiply(s, sr, out=s15)
+
+    # ρ(S, T, 0)
+    _horner(t, RHO_W, out)
+    _add_horner(t, RHO_S, s, out, tmp)
+    _add_horner(t, RHO_S15, s15, out, tmp)
+    np.multiply(s, s, out=tmp)
+    tmp *= RHO_S2
+    out += tmp
+    if p is None:
+        return out
+
+    # Secant bulk modulus K = K0 + A p + B p², with p in bar
+    pb = work['pb'][:n]
+    np.multiply(p, 0.1, out=pb)
+    _horner(t, K_W, k)
+    _add_horner(t, K_S, s, k, tmp)
+    _add_horner(t, K_S15, s15, k, tmp)
+
+    _horner(t, A_W, coef)
+    _add_horner(t, A_S, s, coef, tmp)
+    np.multiply(s15, A_S15, out=tmp)
+    coef += tmp
+    coef *= pb
+    k += coef
+
+    _horner(t, B_W, coef)
+    _add_horner(t, B_S, s, coef, tmp)
+    coef *= pb
+    coef *= pb
+    k += coef
+
+    # ρ = ρ0 / (1 - p / K)
+    np.divide(pb, k, out=k)
+    np.subtract(1, k, out=k)
+    out /= k
+    return out
+
+
+def _stream(kernel, inputs, dtype, out, block_size, buffers):
+    """Run a 1D block kernel over broadcast inputs with np.nditer"""
+    dtype = np.dtype(dtype)
+    present = [x for x in inputs if x is not None]
+    shape = np.broadcast_shapes(*(np.shape(x) for x in present))
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f'out has shape {out.shape}, expected {shape}')
+    work = {name: np.empty(block_size, dtype=dtype) for name in buffers}
+    it = np.nditer(present + [out], flags=['external_loop', 'buffered', 'zerosize_ok'],
+                   op_flags=[['readonly']] * len(present) + [['writeonly']],
+                   op_dtypes=[dtype] * (len(present) + 1), casting='same_kind',
+                   buffersize=block_size)
+    with it:
+        for blocks in it:
+            args = iter(blocks[:-1])
+            kernel(*[None if x is None else next(args) for x in inputs], blocks[-1], work)
+    return out
+
+
+def density(S, T, p=None, dtype=np.float64, out=None, block_size=DEFAULT_BLOCK):
+    """EOS-80 seawater density in kg/m³
+
+    S: practical salinity, T: temperature (°C, IPTS-68), p: sea pressure in
+    dbar (None or 0 for the surface).  Inputs broadcast against each other.
+    dtype: float64, or float32 for half the memory traffic (rounding error
+    up to ~3e-4 kg/m³).  out: optional preallocated array (e.g. a memmap) of
+    the broadcast shape; its dtype may differ from dtype.
+    """
+    if p is not None and np.ndim(p) == 0 and p == 0:
+        p = None
+    return _stream(_density_block, [S, T, p], dtype, out, block_size,
+                   ('sr', 's15', 'tmp', 'k', 'coef', 'pb'))
+
+
+def _index_block(s, t, out, work):
+    n = len(out)
+    tmp = work['tmp'][:n]
+    _horner(t, (N_0, N_T, N_T2), out)
+    np.multiply(s, N_S, out=tmp)
+    out += tmp
+    return out
+
+
+def refractive_index(S, T, dtype=np.float64, out=None, block_size=DEFAULT_BLOCK):
+    """Refractive index of seawater at 532 nm; same conventions as density()"""
+    return _stream(_index_block, [S, T], dtype, out, block_size, ('tmp',))
+
+
+if __name__ == '__main__':
+    import time
+
+    # UNESCO (1981) check values; pressure 1000 bar = 10000 dbar
+    for S, T, p, expected in [(0, 5, 0, 999.96675), (35, 5, 0, 1027.67547),
+                              (35, 25, 10000, 1062.53817)]:
+        print(f'S={S}, T={T}, p={p} dbar: {density(S, T, p):.5f} (expected {expected})')
+
+    # Synthetic global grid: 1/4 degree, 50 levels (~46 million points)
+    lat = np.linspace(-80, 80, 640)[:, None, None]
+    lon = np.linspace(0, 360, 1440, endpoint=False)[None, :, None]
+    depth = np.linspace(0, 5000, 50)[None, None, :]
+    T = (28 * np.cos(np.radians(lat))**2 * np.exp(-depth / 800) + 2 + 0 * lon).astype(np.float32)
+    S = np.float32(34.5) + np.float32(0.5) * np.sin(np.radians(lon)).astype(np.float32)
+    p = depth * 1.01  # approximate dbar
+
+    for dtype in (np.float64, np.float32):
+        out = np.empty(T.shape, dtype=dtype)
+        start = time.perf_counter()
+        density(S, T, p, dtype=dtype, out=out)
+        print(f'{np.dtype(dtype).name}: {T.size / 1e6:.0f} M points in {time.perf_counter() - start:.2f} s, '
+              f'ρ range {out.min():.2f} - {out.max():.2f} kg/m³')
@@ -0,0 +1,265 @@
+"""Tabulated seawater density and refractive index.
+
+build_table() evaluates a quantity once on a dense regular (S, T) or
+(S, T, p) grid and stores it as a .npy file in a cache directory; later
+calls with the same grid (and unchanged source of the tabulated function)
+open it memory-mapped instead of recomputing.  'density' and
+'refractive_index' are EOS-80 from seawater_eos; 'figures2_density' and
+'figures2_refractive_index' tabulate figures2's own surface polynomials
+(its density uses the older pure-water constant 999.83952, 3.1e-3 kg/m³
+below EOS-80), for use as their table= backend.  interpolate() then evaluates the table
+at arbitrary points with vectorized bi- or trilinear interpolation.
+
+Error bound: on a grid of spacing h_i, multilinear interpolation of a smooth
+function is off by at most  Σ_i h_i²/8 · max|∂²f/∂x_i²| .  The second
+derivatives are estimated from the tabulated values when the table is built
+and the resulting bound (plus storage rounding) is kept in table['error_bound'].
+The S^1.5 terms of the density are not smooth at S = 0, so in the first
+salinity cell the error is measured on a dense sampling instead.  Either
+way the bound is against the tabulated function itself.
+
+A lookup costs a few gathers per point, comparable to the fused polynomials
+of seawater_eos (which stay faster for EOS-80 itself); the table pays off for
+repeated analyses that should share one fixed, precomputed grid.
+"""
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import render_cache
+import seawater_eos
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TABLE_DIR = os.path.join(CODE_DIR, '.table_cache')
+
+# Axes as (start, stop, num) - practical salinity, °C, dbar
+DEFAULT_S_AXIS = (0.0, 42.0, 421)
+DEFAULT_T_AXIS = (-2.0, 40.0, 421)
+DEFAULT_P_AXIS = (0.0, 11000.0, 111)
+
+# Bump when the stored table or its metadata (e.g. error_bound) changes meaning
+TABLE_FORMAT = 2
+
+
+def _figures2(func_name):
+    """A figures2 surface function with the out= convention of seawater_eos"""
+    def fn(S, T, out=None):
+        import figures2
+
+        values = getattr(figures2, func_name)(S, T)
+        if out is None:
+            return values
+        out[...] = values
+        return out
+    return fn
+
+
+QUANTITIES = {
+    'density': seawater_eos.density,
+    'refractive_index': seawater_eos.refractive_index,
+    'figures2_density': _figures2('calculate_seawater_density_ies80_simplified'),
+    'figures2_refractive_index': _figures2('calculate_refractive_index_seawater'),
+}
+
+# Source each quantity is computed from, as (file, function or None for the whole file)
+_SOURCES = {
+    'density': ('seawater_eos.py', None),
+    'refractive_index': ('seawater_eos.py', None),
+    'figures2_density': ('figures2.py', 'calculate_seawater_density_ies80_simplified'),
+    'figures2_refractive_index': ('figures2.py', 'calculate_refractive_index_seawater'),
+}
+
+
+def _axis_values(axis):
+    start, stop, num = axis
+    return np.linspace(start, stop, int(num))
+
+
+def _axis_step(axis):
+    start, stop, num = axis
+    return (stop - start) / (num - 1)
+
+
+def _table_key(quantity, axes, dtype):
+    filename, func_name = _SOURCES[quantity]
+    path = os.path.join(CODE_DIR, filename)
+    if func_name is None:
+        with open(path, 'rb') as f:
+            source_hash = hashlib.sha256(f.read()).hexdigest()
+    else:
+        source_hash = render_cache.source_signature(path, func_name)
+    payload = {'quantity': quantity, 'axes': [list(map(float, a)) for a in axes],
+               'dtype': np.dtype(dtype).name, 'source': source_hash, 'format': TABLE_FORMAT}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:20]
+
+
+def _fill(values, quantity, axes):
+    """Evaluate the quantity on the grid one salinity slice at a time"""
+    fn = QUANTITIES[quantity]
+    s_values, t_values = _axis_values(axes[0]), _axis_values(axes[1])
+    for i, s in enumerate(s_values):
+        if len(axes) == 3:
+            fn(s, t_values[:, None], _axis_values(axes[2])[None, :], out=values[i])
+        else:
+            fn(s, t_values, out=values[i])
+
+
+def _first_cell_error(values, quantity, axes, samples=128):
+    """Largest interpolation error in the first salinity cell, from a dense sampling
+
+    The density polynomials have S^1.5 terms whose curvature is unbounded at
+    S = 0, so second differences underestimate the error there.  The cell is
+    sampled at 129 salinities (including S = 4h/9, where the linear
+    interpolant of S^1.5 over [0, h] is furthest off) times the T (and p)
+    nodes and cell midpoints.
+    """
+    fn = QUANTITIES[quantity]
+    table = {'values': values, 'axes': axes}
+    s0, h = axes[0][0], _axis_step(axes[0])
+    others = []
+    for axis in axes[1:]:
+        nodes = _axis_values(axis)
+        others.append(np.sort(np.concatenate([nodes, 0.5 * (nodes[1:] + nodes[:-1])])))
+    t = others[0][:, None] if len(axes) == 3 else others[0]
+    p = others[1][None, :] if len(axes) == 3 else None
+    worst = 0.0
+    for u in np.union1d(np.linspace(0, 1, samples + 1), [4 / 9]):
+        s = s0 + u * h
+        exact = fn(s, t) if p is None else fn(s, t, p)
+        worst = max(worst, np.abs(exact - interpolate(table, s, t, p)).max())
+    return worst
+
+
+def _error_bound(values, quantity, axes):
+    """Σ_i h_i²/8 · max|f_ii| from second differences, again one slice at a time
+
+    In the first salinity cell the error is measured (_first_cell_error),
+    with 1% added for maxima that fall between the samples.
+    """
+    curvature = np.zeros(len(axes))
+    for i in range(values.shape[0]):
+        plane = np.asarray(values[i], dtype=float)
+        for axis in range(1, len(axes)):
+            if plane.shape[axis - 1] > 2:
+                d2 = np.abs(np.diff(plane, 2, axis=axis - 1)).max()
+                curvature[axis] = max(curvature[axis], d2)
+        if 0 < i < values.shape[0] - 1:
+            d2 = np.abs(np.asarray(values[i - 1], dtype=float) - 2 * plane + values[i + 1]).max()
+            curvature[0] = max(curvature[0], d2)
+    # Second differences are h² f''; the bound per axis is (h² f'') / 8
+    smooth = curvature.sum() / 8
+    first_cell = 1.01 * _first_cell_error(values, quantity, axes)
+    rounding = np.finfo(values.dtype).eps * np.abs(np.asarray(values[-1])).max()
+    return float(max(smooth, first_cell) + rounding)
+
+
+def build_table(quantity='density', s_axis=DEFAULT_S_AXIS, t_axis=DEFAULT_T_AXIS, p_axis=None,
+                dtype=np.float64, cache_dir=DEFAULT_TABLE_DIR):
+    """Tabulate a quantity on a regular grid, reusing a cached table when possible
+
+    p_axis: None for a surface (S, T) table, or (start, stop, num) in dbar for
+    an (S, T, p) density table.  Returns a dict with the memory-mapped
+    'values', the 'axes', 'quantity' and 'error_bound'.
+    """
+    if quantity not in QUANTITIES:
+        raise ValueError(f"Unknown quantity '{quantity}', use one of {sorted(QUANTITIES)}")
+    if p_axis is not None and quantity != 'density':
+        raise ValueError(f"'{quantity}' does not depend on pressure; use p_axis=None")
+    axes = [tuple(s_axis), tuple(t_axis)] + ([tuple(p_axis)] if p_axis is not None else [])
+    key = _table_key(quantity, axes, dtype)
+    path = os.path.join(cache_dir, f'{quantity}-{key}.npy')
+    meta_path = path[:-4] + '.json'
+
+    if not (os.path.exists(path) and os.path.exists(meta_path)):
+        os.makedirs(cache_dir, exist_ok=True)
+        shape = tuple(int(a[2]) for a in axes)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.npy')
+        os.close(fd)
+        values = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype, shape=shape)
+        _fill(values, quantity, axes)
+        values.flush()
+        meta = {'quantity': quantity, 'axes': axes, 'error_bound': _error_bound(values, quantity, axes)}
+        del values
+        # Publish atomically so concurrent builders never see a partial table
+        os.replace(tmp, path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return {'values': np.load(path, mmap_mode='r'), 'axes': [tuple(a) for a in meta['axes']],
+            'quantity': meta['quantity'], 'error_bound': meta['error_bound'], 'path': path}
+
+
+def interpolate(table, S, T, p=None, out=None, block_size=seawater_eos.DEFAULT_BLOCK):
+    """Bi- or trilinear interpolation of a table at (S, T[, p])
+
+    Inputs broadcast against each other; points outside the table are NaN.
+    """
+    axes = table['axes']
+    coords = [S, T] + ([p] if p is not None else [])
+    if len(coords) != len(axes):
+        raise ValueError(f"Table has {len(axes)} axes, got {len(coords)} coordinates")
+    shape = np.broadcast_shapes(*(np.shape(c) for c in coords))
+    if out is None:
+        out = np.empty(shape)
+    values = table['values'].reshape(-1)
+    grid_shape = table['values'].shape
+    strides = [int(np.prod(grid_shape[k + 1:])) for k in range(len(axes))]
+    corners = list(itertools.product((0, 1), repeat=len(axes)))
+
+    it = np.nditer(coords + [out], flags=['external_loop', 'buffered', 'zerosize_ok'],
+                   op_flags=[['readonly']] * len(coords) + [['writeonly']],
+                   op_dtypes=[np.float64] * (len(coords) + 1), casting='same_kind',
+                   buffersize=block_size)
+    with it:
+        for blocks in it:
+            *xs, o = blocks
+            base = np.zeros(len(o), dtype=np.intp)
+            valid = np.ones(len(o), dtype=bool)
+            fracs = []
+            for x, axis, stride in zip(xs, axes, strides):
+                num = int(axis[2])
+                f = (x - axis[0]) * (1 / _axis_step(axis))
+                valid &= (f >= 0) & (f <= num - 1)
+                # fmax/fmin also send NaN coordinates to a valid cell
+                i = np.fmin(np.fmax(np.floor(f), 0), num - 2).astype(np.intp)
+                base += i * stride
+                f -= i
+                fracs.append(f)
+            # Gather the 2^d cell corners, then collapse one axis at a time with lerps
+            level = [values[base + sum(bit * stride for bit, stride in zip(corner, strides))]
+                     for corner in corners]
+            for frac in reversed(fracs):
+                level = [lo + frac * (hi - lo) for lo, hi in zip(level[::2], level[1::2])]
+            o[...] = level[0]
+            o[~valid] = np.nan
+    return out
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    table = build_table('density', p_axis=DEFAULT_P_AXIS)
+    print(f"{table['values'].shape} density table ready in {time.perf_counter() - start:.2f} s "
+          f"({table['path']}); error bound {table['error_bound']:.1e} kg/m³")
+
+    rng = np.random.default_rng(0)
+    n = 5_000_000
+    S = rng.uniform(30, 38, n)
+    T = rng.uniform(-1, 30, n)
+    p = rng.uniform(0, 6000, n)
+    start = time.perf_counter()
+    direct = seawater_eos.density(S, T, p)
+    t_direct = time.perf_counter() - start
+    start = time.perf_counter()
+    tabulated = interpolate(table, S, T, p)
+    t_table = time.perf_counter() - start
+    print(f'{n / 1e6:.0f} M points: polynomial {t_direct:.2f} s, table {t_table:.2f} s, '
+          f'max difference {np.abs(direct - tabulated).max():.1e} kg/m³')
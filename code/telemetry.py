@@ -0,0 +1,360 @@
+"""Per-panel render telemetry for the figure functions.
+
+The multi-panel figures (figures3.create_figure3, figures4.create_figure4,
+...) build their panels inline, one fig.add_subplot() after the other.
+While record() is active, Figure.add_subplot is wrapped so that every new
+panel starts a new segment of the build.  Each segment gets:
+
+    time_s        wall time from this panel's add_subplot to the next one
+    artists       artists added to the figure during the segment
+    peak_bytes    tracemalloc peak above the memory in use when it started
+    retained_bytes  memory still held at its end
+
+Twin axes (twinx/twiny) and colorbar axes stay in the panel they belong
+to, and code before the first panel is reported as 'setup'.  Figures that
+create all their axes up front (plt.subplots) can mark panels explicitly,
+which also works outside record() at no cost:
+
+    with telemetry.panel('A) Profiles'):
+        ...
+
+The draw and savefig phases are timed in total and per panel, by timing
+each axes' draw call, so a slow panel shows up whether it is slow to
+build or slow to render.
+
+profile_figure() runs one create_* function through build, draw and
+savefig and returns the report as a dict.  The create_* functions import
+pyplot, their style and their simulation modules on the first call, so by
+default it calls the function once untimed by the panels first (reported
+as warmup_s); otherwise that one-time import cost lands in 'setup' or in
+whichever panel first uses a module.  write_report() saves it as JSON
+and as folded stacks ('figure;phase;panel <microseconds>' per line), the
+input format of flamegraph.pl, speedscope and inferno:
+
+    python telemetry.py figure3 figure4 -o telemetry/
+    flamegraph.pl telemetry/telemetry.folded > panels.svg
+"""
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_active = None  # the _Recorder of the record() block in progress
+_BETWEEN = 'between panels'
+
+
+def _artist_count(fig):
+    count = len(fig.get_children())
+    for ax in fig.axes:
+        count += len(ax.get_children())
+    return count
+
+
+def _panel_label(ax, index):
+    title = ax.get_title() or ax.get_title('left') or ax.get_title('right')
+    return title.strip() or f'axes {index}'
+
+
+class _Recorder:
+    def __init__(self, name, memory):
+        self.name = name
+        self.memory = memory
+        self.figure = None
+        self.segments = []
+        self.current = None
+        self.explicit = 0       # depth of panel() blocks
+        self.axes_segment = {}  # panel axes -> index of its segment
+        self.extra_axes = {}    # twin/colorbar axes -> the panel axes they belong to
+
+    def start(self, label, axes=()):
+        self.stop()
+        if self.memory:
+            tracemalloc.reset_peak()
+        self.current = {
+            'label': label,
+            'axes': list(axes),
+            'start': time.perf_counter(),
+            'memory': tracemalloc.get_traced_memory()[0] if self.memory else 0,
+            'artists': _artist_count(self.figure) if self.figure is not None else 0,
+        }
+
+    def stop(self):
+        segment, self.current = self.current, None
+        if segment is None:
+            return
+        elapsed = time.perf_counter() - segment['start']
+        if segment['label'] is None:
+            segment['label'] = _panel_label(segment['axes'][0], len(self.segments))
+        current, peak = tracemalloc.get_traced_memory() if self.memory else (0, 0)
+        artists = _artist_count(self.figure) if self.figure is not None else 0
+        if segment['label'] == _BETWEEN and artists == segment['artists'] and elapsed < 1e-3:
+            return
+        self.segments.append({
+            'label': segment['label'],
+            'time_s': elapsed,
+            'artists': artists - segment['artists'],
+            'peak_bytes': max(peak - segment['memory'], 0),
+            'retained_bytes': current - segment['memory'],
+        })
+        for ax in segment['axes']:
+            self.axes_segment[ax] = len(self.segments) - 1
+            self.extra_axes.pop(ax, None)
+
+    def new_axes(self, fig, ax, spec, label):
+        """Called after Figure.add_subplot: start a panel unless ax belongs to an existing one"""
+        if self.figure is None:
+            self.figure = fig
+        if fig is not self.figure or self.explicit:
+            return
+        panels = list(self.axes_segment)
+        if self.current is not None:
+            panels.extend(self.current['axes'])
+        owner = next((p for p in panels if spec is not None and _same_spec(p, spec)), None)
+        if owner is None and label == '<colorbar>' and self.current is not None and self.current['axes']:
+            owner = self.current['axes'][0]
+        if owner is not None or label == '<colorbar>':
+            self.extra_axes[ax] = owner
+            return
+        self.start(None, [ax])
+
+    def segment_of(self, ax):
+        """Index of the build segment an axes belongs to (None if unknown)"""
+        return self.axes_segment.get(self.extra_axes.get(ax, ax))
+
+
+def _same_spec(ax, spec):
+    own = ax.get_subplotspec() if hasattr(ax, 'get_subplotspec') else None
+    if own is None:
+        return False
+    return (own.get_gridspec() is spec.get_gridspec() and own.num1 == spec.num1
+            and own.num2 == spec.num2)
+
+
+@contextmanager
+def panel(label):
+    """Mark a block of figure code as one panel (a no-op unless record() is active)"""
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    recorder.start(label)
+    figure = recorder.figure
+    before = {ax: len(ax.get_children()) for ax in figure.axes} if figure is not None else {}
+    recorder.explicit += 1
+    try:
+        yield
+    finally:
+        recorder.explicit -= 1
+        # The panel owns every axes created or drawn into inside the block,
+        # including axes made earlier by plt.subplots
+        if recorder.figure is not None:
+            recorder.current['axes'] = [ax for ax in recorder.figure.axes
+                                        if before.get(ax) != len(ax.get_children())]
+        recorder.start(_BETWEEN)
+
+
+@contextmanager
+def record(name, memory=True):
+    """Segment the figure built inside the block into panels; yields the recorder
+
+    Only one record() block can be active at a time.
+    """
+    global _active
+    from matplotlib.figure import Figure
+
+    if _active is not None:
+        raise RuntimeError('telemetry.record() blocks cannot be nested')
+    recorder = _Recorder(name, memory)
+    original = Figure.add_subplot
+
+    def add_subplot(fig, *args, **kwargs):
+        ax = original(fig, *args, **kwargs)
+        spec = ax.get_subplotspec() if hasattr(ax, 'get_subplotspec') else None
+        recorder.new_axes(fig, ax, spec, kwargs.get('label'))
+        return ax
+
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    Figure.add_subplot = add_subplot
+    _active = recorder
+    recorder.start('setup')
+    try:
+        yield recorder
+    finally:
+        recorder.stop()
+        _active = None
+        Figure.add_subplot = original
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def _timed_phase(recorder, phase, fig, action):
+    """Run action() (a draw or savefig of fig), timing each axes' draw; returns the phase record"""
+    times = {}
+
+    def wrap(ax):
+        draw = ax.draw
+
+        def timed_draw(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return draw(*args, **kwargs)
+            finally:
+                times[ax] = times.get(ax, 0.0) + time.perf_counter() - start
+        return timed_draw
+
+    for ax in fig.axes:
+        ax.draw = wrap(ax)
+    if recorder.memory:
+        tracemalloc.reset_peak()
+    memory = tracemalloc.get_traced_memory()[0] if recorder.memory else 0
+    start = time.perf_counter()
+    try:
+        action()
+    finally:
+        elapsed = time.perf_counter() - start
+        for ax in fig.axes:
+            del ax.draw
+    peak = tracemalloc.get_traced_memory()[1] - memory if recorder.memory else 0
+
+    panels = {}
+    for ax, seconds in times.items():
+        index = recorder.segment_of(ax)
+        label = recorder.segments[index]['label'] if index is not None else 'other axes'
+        panels[label] = panels.get(label, 0.0) + seconds
+    return {
+        'phase': phase,
+        'time_s': elapsed,
+        'peak_bytes': max(peak, 0),
+        # Whatever is not inside an axes: figure texts, legends, layout, encoding
+        'panels': dict(panels, **{'(figure)': max(elapsed - sum(panels.values()), 0.0)}),
+    }
+
+
+def profile_figure(create, name=None, out=None, savefig_kwargs=None, memory=True, warmup=True):
+    """Build, draw and save one figure with per-panel telemetry; returns the report dict
+
+    create: a create_* function (called without arguments).  out: path for
+    savefig (default: an in-memory PNG).  memory=False skips tracemalloc,
+    which otherwise slows the build down.  warmup: build the figure once
+    before the profiled run, so imports and caches are not booked to panels.
+    """
+    import matplotlib.pyplot as plt
+
+    name = name or f'{create.__module__}.{create.__name__}'
+    savefig_kwargs = savefig_kwargs or {'dpi': 300, 'bbox_inches': 'tight'}
+    warmup_s = None
+    if warmup:
+        start = time.perf_counter()
+        plt.close(create())
+        warmup_s = time.perf_counter() - start
+    start = time.perf_counter()
+    with record(name, memory) as recorder:
+        fig = create()
+    build_s = time.perf_counter() - start
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        phases = [
+            _timed_phase(recorder, 'draw', fig, fig.canvas.draw),
+            _timed_phase(recorder, 'savefig', fig,
+                         lambda: fig.savefig(out if out else io.BytesIO(), **savefig_kwargs)),
+        ]
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        plt.close(fig)
+    return {
+        'figure': name,
+        'warmup_s': warmup_s,
+        'build_s': build_s,
+        'panels': recorder.segments,
+        'draw': phases[0],
+        'savefig': phases[1],
+        'total_s': build_s + sum(phase['time_s'] for phase in phases),
+        'artists': _artist_count(fig),
+    }
+
+
+def folded_stacks(report):
+    """Flame-graph lines 'figure;phase;panel microseconds' for a profile_figure() report"""
+    clean = lambda s: ' '.join(str(s).replace(';', ',').split())
+    figure = clean(report['figure'])
+    lines = []
+    for segment in report['panels']:
+        lines.append(f"{figure};build;{clean(segment['label'])} {round(segment['time_s'] * 1e6)}")
+    for phase in (report['draw'], report['savefig']):
+        for label, seconds in phase['panels'].items():
+            lines.append(f"{figure};{phase['phase']};{clean(label)} {round(seconds * 1e6)}")
+    return [line for line in lines if not line.endswith(' 0')]
+
+
+def write_report(report, out_dir):
+    """Write <figure>.json and <figure>.folded into out_dir; returns the two paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.join(out_dir, report['figure'])
+    with open(stem + '.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    with open(stem + '.folded', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(folded_stacks(report)) + '\n')
+    return stem + '.json', stem + '.folded'
+
+
+def print_report(report):
+    print(f"\n{report['figure']}: {report['total_s']:.2f} s "
+          f"(build {report['build_s']:.2f} s, draw {report['draw']['time_s']:.2f} s, "
+          f"savefig {report['savefig']['time_s']:.2f} s), {report['artists']} artists")
+    if report.get('warmup_s') is not None:
+        print(f"  first (cold) build, untraced: {report['warmup_s']:.2f} s")
+    print(f"  {'panel':<50} {'build':>7} {'draw':>7} {'savefig':>7} {'artists':>8} {'peak MiB':>9}")
+    for segment in report['panels']:
+        label = segment['label']
+        print(f"  {label[:50]:<50} {segment['time_s']:7.3f} "
+              f"{report['draw']['panels'].get(label, 0.0):7.3f} "
+              f"{report['savefig']['panels'].get(label, 0.0):7.3f} "
+              f"{segment['artists']:8d} {segment['peak_bytes'] / 2**20:9.1f}")
+    print(f"  {'(figure: layout, legends, encoding)':<50} {'':>7} "
+          f"{report['draw']['panels']['(figure)']:7.3f} {report['savefig']['panels']['(figure)']:7.3f}")
+
+
+def main(argv=None):
+    import argparse
+
+    import build_figures
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('figures', nargs='*', metavar='NAME',
+                        help='figures to profile, as in build_figures.py (default: all)')
+    parser.add_argument('-o', '--out-dir', default='telemetry', help='directory for the JSON and folded files')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc (faster, no memory figures)')
+    parser.add_argument('--no-warmup', action='store_true',
+                        help='profile the first, cold call (imports are booked to the panels that trigger them)')
+    args = parser.parse_args(argv)
+
+    jobs = build_figures.select_figures(build_figures.discover_figures(), args.figures)
+    if not jobs:
+        parser.error(f'no figure matches {args.figures}')
+    folded = []
+    for module, func_name, _ in jobs:
+        mod = build_figures._load_module(module)
+        report = profile_figure(getattr(mod, func_name), f'{module}.{func_name}',
+                                savefig_kwargs=build_figures.SAVEFIG_KWARGS, memory=not args.no_memory,
+                                warmup=not args.no_warmup)
+        write_report(report, args.out_dir)
+        folded.extend(folded_stacks(report))
+        print_report(report)
+    path = os.path.join(args.out_dir, 'telemetry.folded')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(folded) + '\n')
+    print(f'\nWrote {len(jobs)} reports and {path}')
+    return 0
+
+
+if __name__ == '__main__':
+    os.environ['MPLBACKEND'] = 'Agg'
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Monte Carlo uncertainty and Sobol sensitivity of the detection threshold.
+
+Panel B of figures3.create_figure3() evaluates
+
+    Δρ_min = Δθ_min / (K · A · L)
+
+for fixed K, A and L.  sobol_analysis() instead draws all four inputs from
+distributions and reports the spread of Δρ_min together with first-order
+(Saltelli 2010) and total-order (Jansen) Sobol indices:
+
+    S_i  = E[f_B (f_ABi - f_A)] / V          ST_i = E[(f_A - f_ABi)²] / (2V)
+
+where A and B are independent sample matrices and AB_i is A with column i
+taken from B (k + 2 model evaluations per sample).
+
+Samples are generated in batches from independently scrambled Sobol (or
+Latin hypercube / plain random) sequences.  Each batch only contributes a
+row of sums, so memory does not depend on the number of samples, and the
+batches are independent replicates: bootstrapping over them gives the
+confidence intervals.  Batches are spread over worker processes, each with
+its own stream from numpy's SeedSequence.spawn().
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import qmc
+
+# name -> (distribution, a, b):
+#   'uniform' / 'loguniform': bounds a, b;  'normal' / 'lognormal': mean and std (of log for lognormal)
+INPUTS = {
+    'delta_theta_min': ('loguniform', 1e-7, 1e-4),  # rad, Panel B range
+    'K': ('uniform', 2.2e-4, 2.4e-4),               # m³/kg, Gladstone-Dale constant of air
+    'A': ('loguniform', 5.0, 125.0),                # amplification, Panel A range
+    'L': ('uniform', 0.5e-3, 5e-3),                 # m, path length
+}
+
+METHODS = ('sobol', 'lhs', 'random')
+OUTPUTS = ('log10', 'linear')
+
+# Output histogram used for the quantiles; its range comes from a pilot sample
+HIST_BINS = 20000
+PILOT_SIZE = 4096
+
+
+def detection_threshold(delta_theta_min, K, A, L):
+    """Δρ_min in kg/m³ (Panel B of Figure 3)"""
+    return delta_theta_min / (K * A * L)
+
+
+def transform(u, inputs=INPUTS):
+    """Map unit-hypercube samples (n, k) to a dict of input columns"""
+    columns = {}
+    for j, (name, (dist, a, b)) in enumerate(inputs.items()):
+        x = u[:, j]
+        if dist == 'uniform':
+            columns[name] = a + (b - a) * x
+        elif dist == 'loguniform':
+            columns[name] = a * (b / a)**x
+        elif dist == 'normal':
+            columns[name] = a + b * ndtri(x)
+        elif dist == 'lognormal':
+            columns[name] = np.exp(a + b * ndtri(x))
+        else:
+            raise ValueError(f"Unknown distribution '{dist}' for input '{name}'")
+    return columns
+
+
+def sample_unit(n, d, method='sobol', rng=None):
+    """n points in [0, 1)^d; Sobol points are scrambled, so every call is an independent replicate"""
+    rng = np.random.default_rng(rng)
+    if method == 'sobol':
+        m = int(np.ceil(np.log2(n)))
+        return qmc.Sobol(d, scramble=True, seed=rng).random_base2(m)[:n]
+    if method == 'lhs':
+        return qmc.LatinHypercube(d, seed=rng).random(n)
+    if method == 'random':
+        return rng.random((n, d))
+    raise ValueError(f"Unknown sampling method '{method}', use one of {METHODS}")
+
+
+def _evaluate(model, inputs, u, output, shift):
+    f = model(**transform(u, inputs))
+    if output == 'log10':
+        f = np.log10(f)
+    return f - shift
+
+
+def _run_batches(model, inputs, seeds, batch_size, method, output, shift, edges):
+    """Per-batch sums for the Sobol estimators, plus a histogram of all (shifted) outputs"""
+    k = len(inputs)
+    stats = np.empty((len(seeds), 5 + 2 * k))
+    hist = np.zeros(len(edges) - 1, dtype=np.int64)
+    for b, seed in enumerate(seeds):
+        u = sample_unit(batch_size, 2 * k, method, np.random.default_rng(seed))
+        ua, ub = u[:, :k], u[:, k:]
+        fa = _evaluate(model, inputs, ua, output, shift)
+        fb = _evaluate(model, inputs, ub, output, shift)
+        row = [batch_size, fa.sum(), fb.sum(), (fa * fa).sum(), (fb * fb).sum()]
+        first, total = [], []
+        for i in range(k):
+            uab = ua.copy()
+            uab[:, i] = ub[:, i]
+            fab = _evaluate(model, inputs, uab, output, shift)
+            first.append((fb * (fab - fa)).sum())
+            total.append(((fa - fab)**2).sum())
+        stats[b] = row + first + total
+        for f in (fa, fb):
+            # Values beyond the pilot range are counted in the end bins
+            hist += np.histogram(np.clip(f, edges[0], edges[-1]), edges)[0]
+    return stats, hist
+
+
+def _indices(sums, k):
+    """First/total-order indices from (..., 5 + 2k) summed statistics"""
+    n = sums[..., 0:1]
+    mean = (sums[..., 1:2] + sums[..., 2:3]) / (2 * n)
+    var = (sums[..., 3:4] + sums[..., 4:5]) / (2 * n) - mean**2
+    first = sums[..., 5:5 + k] / n / var
+    total = sums[..., 5 + k:5 + 2 * k] / (2 * n) / var
+    return first, total, mean[..., 0], var[..., 0]
+
+
+def sobol_analysis(model=detection_threshold, inputs=INPUTS, n_samples=1 << 20, batch_size=1 << 16,
+                   method='sobol', output='log10', workers=None, seed=0, n_bootstrap=1000,
+                   confidence=0.95):
+    """Uncertainty and Sobol indices of model over the input distributions
+
+    n_samples is rounded up to whole batches; the model is evaluated
+    (k + 2) * n_samples times.  output='log10' analyses log10 of the model
+    (natural for a product of positive factors), 'linear' the value itself.
+    model must be a module-level function taking the inputs as keyword
+    arrays when workers > 1.
+    Returns a dict with 'names', 'first_order', 'total_order' and their
+    '*_ci' (k, 2) bootstrap intervals, plus 'mean', 'std', 'quantiles'
+    (2.5/50/97.5 %) of the analysed output and sample counts.
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown output '{output}', use one of {OUTPUTS}")
+    k = len(inputs)
+    n_batches = max(1, -(-n_samples // batch_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_batches + 1)
+    # Centre the outputs on the median input to keep the running sums well conditioned
+    shift = float(_evaluate(model, inputs, np.full((1, k), 0.5), output, 0.0)[0])
+    pilot = _evaluate(model, inputs, sample_unit(PILOT_SIZE, k, 'random', seeds[-1]), output, shift)
+    pad = 0.5 * (pilot.max() - pilot.min())
+    edges = np.linspace(pilot.min() - pad, pilot.max() + pad, HIST_BINS + 1)
+
+    workers = min(workers or os.cpu_count() or 1, n_batches)
+    args = (batch_size, method, output, shift, edges)
+    if workers == 1:
+        stats, hist = _run_batches(model, inputs, seeds[:n_batches], *args)
+    else:
+        groups = np.array_split(np.arange(n_batches), workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_batches, [model] * workers, [inputs] * workers,
+                                  [[seeds[i] for i in g] for g in groups],
+                                  *([a] * workers for a in args)))
+        stats = np.concatenate([p[0] for p in parts])
+        hist = sum(p[1] for p in parts)
+
+    first, total, mean, var = _indices(stats.sum(axis=0), k)
+    # Bootstrap over batches (independent replicates)
+    rng = np.random.default_rng(seeds[-1].spawn(1)[0])
+    resampled = stats[rng.integers(0, n_batches, (n_bootstrap, n_batches))].sum(axis=1)
+    boot_first, boot_total, _, _ = _indices(resampled, k)
+    alpha = (1 - confidence) / 2 * 100
+    cdf = np.cumsum(hist) / hist.sum()
+    centers = 0.5 * (edges[1:] + edges[:-1]) + shift
+    return {
+        'names': list(inputs),
+        'first_order': first,
+        'total_order': total,
+        'first_order_ci': np.percentile(boot_first, [alpha, 100 - alpha], axis=0).T,
+        'total_order_ci': np.percentile(boot_total, [alpha, 100 - alpha], axis=0).T,
+        'mean': mean + shift,
+        'std': np.sqrt(var),
+        'quantiles': dict(zip((2.5, 50, 97.5), centers[np.searchsorted(cdf, [0.025, 0.5, 0.975])])),
+        'n_samples': n_batches * batch_size,
+        'n_model_evals': n_batches * batch_size * (k + 2),
+    }
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    result = sobol_analysis(n_samples=1 << 23)
+    elapsed = time.perf_counter() - start
+    print(f"{result['n_samples'] / 1e6:.1f} M samples ({result['n_model_evals'] / 1e6:.0f} M model "
+          f"evaluations) in {elapsed:.1f} s")
+    q = result['quantiles']
+    print(f"log10 Δρ_min [kg/m³]: mean {result['mean']:.3f}, std {result['std']:.3f}, "
+          f"95% range {q[2.5]:.2f} .. {q[97.5]:.2f}")
+    print(f"{'input':16s} {'S_i':>22s} {'ST_i':>22s}")
+    for i, name in enumerate(result['names']):
+        s, (s_lo, s_hi) = result['first_order'][i], result['first_order_ci'][i]
+        t, (t_lo, t_hi) = result['total_order'][i], result['total_order_ci'][i]
+        print(f'{name:16s} {s:6.3f} [{s_lo:6.3f}, {s_hi:6.3f}] {t:6.3f} [{t_lo:6.3f}, {t_hi:6.3f}]')